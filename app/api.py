@@ -0,0 +1,478 @@
+import asyncio
+import json
+import math
+import os
+import re
+from dataclasses import asdict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from logic.bin_storage import append_events, now_iso, summarize_events
+from logic.demand_engine import BATCH_COLUMNS, DemandInputs, estimate_portions, estimate_portions_batch
+from logic.encodings import REGISTRY, EncodingRegistry
+from logic.ingest import IngestPipeline, Reading
+from logic.pickup_runs import plan_pickups
+from logic.pickups import OPEN_STATUSES, TransitionError, create_request, load_index as load_pickup_index, transition
+from logic.properties import REGISTRY as PROPERTIES
+from logic.recycler import choose_partner, schedule_requests
+from logic.routing_rules import evaluate_events, load_rules, load_table
+from logic.savings import estimate_savings
+from logic.smart_bin import evaluate_bins
+
+# Headless ASGI service for bins, POS systems and other machine clients.
+# Plain ASGI (no framework dependency); serve it with any ASGI server:
+#     cd app && uvicorn api:app --workers 4
+# Handlers are async; anything that touches storage or does real work runs
+# in a worker thread (asyncio.to_thread) so the event loop only parses and
+# routes. Smart Bin events are appended through bin_storage, whose single
+# writer thread batches them, so ingest workers can scale independently of
+# the Streamlit UI. Raw sensor readings (/readings) go through the asyncio
+# ingestion pipeline (logic/ingest.py): the request returns once they are
+# queued and waits while the queue is full.
+
+MAX_BODY_BYTES = int(os.environ.get("FOODSAVE_API_MAX_BODY", str(8 * 1024 * 1024)))
+MAX_BATCH = 10000
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class Request:
+    def __init__(self, method: str, path: str, query: Dict[str, List[str]], body: bytes, params: Dict[str, str]):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.body = body
+        self.params = params
+
+    def arg(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        values = self.query.get(name)
+        return values[0] if values else default
+
+    def json(self) -> Any:
+        if not self.body:
+            raise ApiError(400, "Request body must be JSON")
+        try:
+            return json.loads(self.body)
+        except ValueError as exc:
+            raise ApiError(400, f"Invalid JSON: {exc}") from None
+
+
+Handler = Callable[[Request], Awaitable[Any]]
+_ROUTES: List[Tuple[str, "re.Pattern[str]", Handler]] = []
+
+
+def route(method: str, pattern: str):
+    # "{name}" matches one path segment and is passed in request.params
+    regex = re.compile("^" + re.sub(r"\{(\w+)\}", r"(?P<\1>[^/]+)", pattern) + "$")
+
+    def register(fn: Handler) -> Handler:
+        _ROUTES.append((method, regex, fn))
+        return fn
+
+    return register
+
+
+def _object(payload: Any) -> Dict[str, Any]:
+    if not isinstance(payload, dict):
+        raise ApiError(400, "Expected a JSON object")
+    return payload
+
+
+def _items(payload: Any, key: str) -> List[Any]:
+    items = payload.get(key) if isinstance(payload, dict) else payload
+    if not isinstance(items, list):
+        raise ApiError(400, f"Expected a JSON list or an object with a {key!r} list")
+    if len(items) > MAX_BATCH:
+        raise ApiError(413, f"At most {MAX_BATCH} items per request")
+    return items
+
+
+def _property(request: Request):
+    try:
+        return PROPERTIES.get(request.params["property_id"])
+    except KeyError as exc:
+        raise ApiError(404, str(exc.args[0])) from None
+
+
+# --- demand / savings ---
+
+def _demand_inputs(payload: Any) -> DemandInputs:
+    p = _object(payload)
+    return DemandInputs(
+        target_meal=str(p["target_meal"]),
+        expected_guests=int(p["expected_guests"]),
+        occupancy_rate=float(p["occupancy_rate"]),
+        weather=str(p["weather"]),
+        day_type=str(p["day_type"]),
+        event_level=str(p["event_level"]),
+    )
+
+
+@route("GET", "/health")
+async def health(request: Request) -> Any:
+    return {"status": "ok"}
+
+
+def _encodings(request: Request) -> EncodingRegistry:
+    # ?property_id=... scores with that property's encodings.json
+    property_id = request.arg("property_id")
+    if not property_id:
+        return REGISTRY
+    try:
+        return PROPERTIES.get(property_id).encodings()
+    except KeyError as exc:
+        raise ApiError(404, str(exc.args[0])) from None
+
+
+@route("POST", "/demand")
+async def demand(request: Request) -> Any:
+    inp = _demand_inputs(request.json())
+    return asdict(await asyncio.to_thread(estimate_portions, inp, _encodings(request)))
+
+
+@route("POST", "/demand/batch")
+async def demand_batch(request: Request) -> Any:
+    items = _items(request.json(), "inputs")
+    explain = request.arg("explain", "false").lower() == "true"
+    registry = _encodings(request)
+
+    def run() -> List[Dict[str, Any]]:
+        if not items:
+            return []
+        rows = [asdict(_demand_inputs(i)) for i in items]
+        out = estimate_portions_batch({c: [r[c] for r in rows] for c in BATCH_COLUMNS}, registry=registry)
+        return [asdict(out.output(i, explain)) for i in range(len(out))]
+
+    return {"outputs": await asyncio.to_thread(run)}
+
+
+def _savings(payload: Any) -> Dict[str, Any]:
+    p = _object(payload)
+    return asdict(estimate_savings(
+        recommended_portions=int(p["recommended_portions"]),
+        baseline_portions=int(p["baseline_portions"]),
+        cost_thb_per_portion=float(p["cost_thb_per_portion"]),
+    ))
+
+
+@route("POST", "/savings")
+async def savings(request: Request) -> Any:
+    return _savings(request.json())
+
+
+@route("POST", "/savings/batch")
+async def savings_batch(request: Request) -> Any:
+    items = _items(request.json(), "inputs")
+    return {"outputs": await asyncio.to_thread(lambda: [_savings(i) for i in items])}
+
+
+# --- Smart Bin ---
+
+def _evaluate(payload: Any) -> Dict[str, Any]:
+    p = _object(payload)
+    return asdict(evaluate_bins([str(p["predicted_item"])], [str(p["chosen_bin"])], load_table()).result(0))
+
+
+@route("POST", "/bins/evaluate")
+async def bins_evaluate(request: Request) -> Any:
+    return _evaluate(request.json())
+
+
+@route("POST", "/bins/evaluate/batch")
+async def bins_evaluate_batch(request: Request) -> Any:
+    items = [_object(i) for i in _items(request.json(), "readings")]
+    messages = request.arg("messages", "false").lower() == "true"
+
+    def run() -> Dict[str, Any]:
+        res = evaluate_bins(
+            [str(i["predicted_item"]) for i in items], [str(i["chosen_bin"]) for i in items], load_table()
+        )
+        out = {
+            "is_correct_bin": res.is_correct_bin.tolist(),
+            "required_bin": res.required_bins().tolist(),
+        }
+        if messages:
+            out["messages"] = [res.message(i) for i in range(len(res))]
+        return out
+
+    return await asyncio.to_thread(run)
+
+
+@route("GET", "/routing/rules")
+async def routing_rules(request: Request) -> Any:
+    version = request.arg("version")
+    try:
+        return asdict(load_rules(int(version) if version else None))
+    except KeyError as exc:
+        raise ApiError(404, str(exc.args[0])) from None
+
+
+def _timestamp(value: Any) -> str:
+    # client timestamps decide which day segment an event lands in, so only
+    # well-formed ISO datetimes get through, normalized to YYYY-MM-DDTHH:MM:SS
+    if value is None or value == "":
+        return now_iso()
+    try:
+        return datetime.fromisoformat(str(value)).isoformat()
+    except ValueError:
+        raise ApiError(400, f"Invalid timestamp: {value!r} (expected ISO 8601)") from None
+
+
+def _weight_kg(value: Any) -> float:
+    # events and raw readings alike: a finite, non-negative number of kg
+    try:
+        kg = float(value)
+    except (TypeError, ValueError):
+        raise ApiError(400, f"Invalid weight_kg: {value!r} (expected a number)") from None
+    if not math.isfinite(kg) or kg < 0:
+        raise ApiError(400, f"Invalid weight_kg: {value!r} (must be >= 0)")
+    return kg
+
+
+def _bin_events(items: List[Any]) -> List[Dict[str, Any]]:
+    # same shape app.py logs; bin correctness is evaluated server-side
+    rows = []
+    for payload in items:
+        p = _object(payload)
+        rows.append({
+            "timestamp": _timestamp(p.get("timestamp")),
+            "item": str(p["item"]),
+            "confidence": float(p.get("confidence", 1.0)),
+            "weight_kg": _weight_kg(p["weight_kg"]),
+            "bin_used": str(p["bin_used"]),
+        })
+    required_bins, correct = evaluate_events(
+        [r["item"] for r in rows], [r["bin_used"] for r in rows], [r["timestamp"][:10] for r in rows]
+    )
+    for r, required, ok in zip(rows, required_bins, correct):
+        r["recommended_bin"] = required
+        r["is_correct_bin"] = ok
+    return rows
+
+
+@route("POST", "/properties/{property_id}/events")
+async def ingest_event(request: Request) -> Any:
+    prop = _property(request)
+    event = _bin_events([request.json()])[0]
+    await asyncio.to_thread(append_events, prop.bin_events_path, [event])
+    return {"accepted": 1, "event": event}
+
+
+@route("POST", "/properties/{property_id}/events/bulk")
+async def ingest_events(request: Request) -> Any:
+    prop = _property(request)
+    items = _items(request.json(), "events")
+    events = _bin_events(items)
+    if events:
+        await asyncio.to_thread(append_events, prop.bin_events_path, events)
+    return {"accepted": len(events)}
+
+
+_PIPELINE: Optional[IngestPipeline] = None
+
+
+async def _pipeline() -> IngestPipeline:
+    global _PIPELINE
+    if _PIPELINE is None:
+        _PIPELINE = await IngestPipeline().start()
+    return _PIPELINE
+
+
+@route("POST", "/properties/{property_id}/readings")
+async def ingest_readings(request: Request) -> Any:
+    prop = _property(request)
+    items = _items(request.json(), "readings")
+    readings = []
+    for i in items:
+        p = _object(i)
+        readings.append(Reading(
+            bin_id=str(p["bin_id"]),
+            events_path=prop.bin_events_path,
+            item=str(p["item"]),
+            bin_used=str(p["bin_used"]),
+            weight_kg=_weight_kg(p["weight_kg"]),
+            timestamp=_timestamp(p.get("timestamp")),
+        ))
+    pipeline = await _pipeline()
+    for r in readings:
+        await pipeline.submit(r)
+    return {"queued": len(readings), "backlog": pipeline.backlog()}
+
+
+@route("GET", "/properties/{property_id}/summary")
+async def event_summary(request: Request) -> Any:
+    prop = _property(request)
+    s = await asyncio.to_thread(summarize_events, prop.bin_events_path, request.arg("since"), request.arg("until"))
+    return asdict(s)
+
+
+@route("GET", "/properties")
+async def list_properties(request: Request) -> Any:
+    return {"properties": [asdict(p) for p in PROPERTIES.list()]}
+
+
+# --- recyclers ---
+
+@route("GET", "/properties/{property_id}/pickups")
+async def list_pickups(request: Request) -> Any:
+    # ?status=REQUESTED,ACCEPTED (default: open) &partner_id=R1
+    prop = _property(request)
+    statuses = (request.arg("status") or ",".join(OPEN_STATUSES)).split(",")
+    index = await asyncio.to_thread(load_pickup_index, prop.recycler_requests_path)
+    return {"pickups": [asdict(r) for r in index.with_status(*statuses, partner_id=request.arg("partner_id"))]}
+
+
+@route("POST", "/properties/{property_id}/pickups")
+async def create_pickup(request: Request) -> Any:
+    prop = _property(request)
+    p = _object(request.json())
+    partner = choose_partner(str(p["waste_stream"])) if not p.get("partner_id") else None
+    req = await asyncio.to_thread(
+        create_request,
+        prop.recycler_requests_path,
+        waste_stream=str(p["waste_stream"]),
+        estimated_kg=float(p["estimated_kg"]),
+        partner_id=str(p.get("partner_id") or partner.id),
+        partner_name=str(p.get("partner_name") or (partner.name if partner else "")),
+        eta_window=str(p.get("eta_window") or (partner.eta_window if partner else "")),
+        note=str(p.get("note", "")),
+        property_id=prop.property_id,
+    )
+    return asdict(req)
+
+
+@route("POST", "/properties/{property_id}/pickups/{request_id}/transition")
+async def transition_pickup(request: Request) -> Any:
+    prop = _property(request)
+    p = _object(request.json())
+    kg = p.get("kg")
+    try:
+        req = await asyncio.to_thread(
+            transition, prop.recycler_requests_path, request.params["request_id"], str(p["status"]),
+            float(kg) if kg is not None else None,
+        )
+    except KeyError as exc:
+        if exc.args and str(exc.args[0]).startswith("Unknown pickup request"):
+            raise ApiError(404, str(exc.args[0])) from None
+        raise
+    except TransitionError as exc:
+        # the request exists but its current state doesn't allow this move
+        raise ApiError(409, str(exc)) from None
+    return asdict(req)
+
+
+@route("POST", "/recyclers/choose")
+async def recyclers_choose(request: Request) -> Any:
+    p = _object(request.json())
+    return asdict(choose_partner(str(p["waste_stream"])))
+
+
+@route("POST", "/recyclers/schedule")
+async def recyclers_schedule(request: Request) -> Any:
+    items = [_object(i) for i in _items(request.json(), "requests")]
+    try:
+        assignments = await asyncio.to_thread(schedule_requests, items)
+    except ValueError as exc:
+        raise ApiError(400, str(exc)) from None
+    return {"assignments": [asdict(a) for a in assignments]}
+
+
+@route("GET", "/recyclers/runs")
+async def recyclers_runs(request: Request) -> Any:
+    since, until = request.arg("since"), request.arg("until")
+    plan = await asyncio.to_thread(plan_pickups, since, until)
+    return {"runs": [asdict(r) for r in plan.runs], "unassigned": [asdict(a) for a in plan.unassigned()]}
+
+
+# --- ASGI plumbing ---
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise ApiError(400, "Client disconnected")
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            raise ApiError(413, f"Request body larger than {MAX_BODY_BYTES} bytes")
+        chunks.append(chunk)
+        if not message.get("more_body", False):
+            return b"".join(chunks)
+
+
+async def _send_json(send, status: int, payload: Any) -> None:
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def _match(method: str, path: str) -> Tuple[Optional[Handler], Dict[str, str]]:
+    allowed = False
+    for m, regex, fn in _ROUTES:
+        hit = regex.match(path)
+        if hit is None:
+            continue
+        if m == method:
+            return fn, hit.groupdict()
+        allowed = True
+    if allowed:
+        raise ApiError(405, f"Method {method} not allowed for {path}")
+    raise ApiError(404, f"Not found: {path}")
+
+
+async def app(scope, receive, send) -> None:
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await _pipeline()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if _PIPELINE is not None:
+                    await _PIPELINE.stop()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    if scope["type"] != "http":
+        return
+
+    method = scope["method"]
+    path = scope["path"].rstrip("/") or "/"
+    try:
+        handler, params = _match(method, path)
+        body = await _read_body(receive) if method in ("POST", "PUT") else b""
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        result = await handler(Request(method, path, query, body, params))
+        await _send_json(send, 200, result)
+    except ApiError as exc:
+        await _send_json(send, exc.status, {"error": exc.message})
+    except KeyError as exc:
+        await _send_json(send, 400, {"error": f"Missing field: {exc.args[0]}"})
+    except (TypeError, ValueError) as exc:
+        await _send_json(send, 400, {"error": str(exc)})
+
+
+def main():
+    # run from app/: python api.py [port]
+    import sys
+
+    try:
+        import uvicorn
+    except ImportError as exc:
+        raise ImportError("Serving the API needs an ASGI server: pip install uvicorn") from exc
+    uvicorn.run("api:app", host="0.0.0.0", port=int(sys.argv[1]) if len(sys.argv) > 1 else 8000)
+
+
+if __name__ == "__main__":
+    main()
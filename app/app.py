@@ -2,17 +2,33 @@ import os
 import pandas as pd
 import streamlit as st
 
-from logic.demand_engine import DemandInputs, estimate_portions
-from logic.savings import estimate_savings
-from logic.green_star import evaluate_green_star
-from logic.history import generate_fake_history
-from logic.demo_ml import train_and_predict_demo_ml
-from logic.bin_storage import append_event, load_events, now_iso
-from logic.smart_bin import ITEM_TO_BIN, BINS, classify_demo, evaluate_bin
-from logic.recycler import get_demo_partners, choose_partner
+from dataclasses import asdict, replace
+from logic import compute
+from logic.demand_engine import DemandInputs
+from logic.demo_ml import DemoMLResult, train_and_predict_demo_ml
+from logic.train_model import load_latest_model, predict_model, save_feedback
+from logic.routing_rules import load_table
+from logic.smart_bin import classify_demo, evaluate_bins
+from logic.pickup_runs import plan_pickups
+from logic.pickups import (
+    ACCEPTED,
+    COLLECTED,
+    OPEN_STATUSES,
+    REQUESTED,
+    STATUSES,
+    TRANSITIONS,
+    WEIGHED,
+    create_request,
+    load_index as load_pickup_index,
+    reconcile,
+    transition,
+)
+from logic.recycler import choose_partner, get_partner_index
 from datetime import date, timedelta
 from datetime import datetime
-from logic.bin_storage import append_event, load_events, save_events, now_iso
+from logic.bin_storage import append_event, delete_day
+from logic.properties import REGISTRY as PROPERTIES, group_frame
+from logic.rollups import track_events
 
 st.set_page_config(
     page_title="FoodSave.AI — Hotel Edition",
@@ -47,26 +63,29 @@ h1, h2, h3 {
 """, unsafe_allow_html=True)
 
 
-if "green_star_streak" not in st.session_state:
-    st.session_state.green_star_streak = 0
 if "active_day" not in st.session_state:
     st.session_state.active_day = date.today().isoformat()
 
-BASE_DIR = os.path.dirname(__file__)
-DATA_PATH = os.path.join(BASE_DIR, "data", "sample_menu_costs.csv")
-BIN_EVENTS_PATH = os.path.join(BASE_DIR, "data", "bin_events.json")
-RECYCLER_REQ_PATH = os.path.join(BASE_DIR, "data", "recycler_requests.json")
+# each property (hotel) has its own partition of logs, rollups and menu costs
+property_ids = PROPERTIES.ids()
+PROPERTY_ID = st.sidebar.selectbox(
+    "Property",
+    property_ids,
+    index=0,
+    format_func=lambda pid: PROPERTIES.get(pid).name,
+    disabled=len(property_ids) == 1,
+)
+active_property = PROPERTIES.get(PROPERTY_ID)
 
+DATA_PATH = active_property.menu_costs_path
+BIN_EVENTS_PATH = active_property.bin_events_path
+RECYCLER_REQ_PATH = active_property.recycler_requests_path
 
-def load_menu_costs(path: str) -> pd.DataFrame:
-    if os.path.exists(path):
-        return pd.read_csv(path)
-    return pd.DataFrame(
-        {"item": ["Breakfast Buffet", "Lunch Buffet", "Dinner Buffet"], "cost_thb_per_portion": [65, 95, 120]}
-    )
+# daily rollups (proof kg + End-of-Day results + streak), kept in step with the Smart Bin log
+rollups = track_events(BIN_EVENTS_PATH, PROPERTY_ID, active_property.rollups_path)
 
 
-menu_df = load_menu_costs(DATA_PATH)
+menu_df = compute.load_menu_costs(DATA_PATH)
 menu_items = menu_df["item"].tolist()
 
 
@@ -195,25 +214,41 @@ inp = DemandInputs(
     event_level=event_level,
 )
 
-baseline_out = estimate_portions(inp)
+encodings = active_property.encodings()
+baseline_out = compute.demand(inp, encodings)
 
-demo_ml = train_and_predict_demo_ml(
-    expected_guests=int(expected_guests),
-    occupancy_rate=float(occupancy_rate),
-    weather=weather,
-    day_type=day_type,
-    event_level=event_level,
-    baseline_portions=int(baseline_out.baseline_portions),
-)
+history_model = load_latest_model()
+
+if history_model is not None:
+    demo_ml = DemoMLResult(
+        ok=True,
+        predicted_portions=predict_model(
+            history_model, int(expected_guests), float(occupancy_rate), weather, day_type, event_level
+        ),
+        note=f"ML ON (trained on {history_model.n_rows} days of {history_model.source}, model v{history_model.version})",
+        demo_r2=history_model.holdout_r2,
+        demo_mae=history_model.holdout_mae,
+    )
+    ml_score_label = "Holdout score (history)"
+else:
+    demo_ml = train_and_predict_demo_ml(
+        expected_guests=int(expected_guests),
+        occupancy_rate=float(occupancy_rate),
+        weather=weather,
+        day_type=day_type,
+        event_level=event_level,
+        baseline_portions=int(baseline_out.baseline_portions),
+        registry=encodings,
+    )
+    ml_score_label = "Demo score (synthetic)"
 
-ml_out = estimate_portions(inp)
-ml_out.recommended_portions = demo_ml.predicted_portions
+ml_out = replace(baseline_out, recommended_portions=demo_ml.predicted_portions)
 
 out = ml_out if use_demo_ml else baseline_out
 
 st.caption(demo_ml.note if use_demo_ml else "ML OFF — using baseline engine (rules).")
 
-savings = estimate_savings(
+savings = compute.savings(
     recommended_portions=out.recommended_portions,
     baseline_portions=out.baseline_portions,
     cost_thb_per_portion=cost_thb_per_portion,
@@ -222,21 +257,11 @@ savings = estimate_savings(
 # --- Proof data from Smart Bin (measured) — FILTERED BY ACTIVE DAY ---
 active_day = st.session_state.active_day
 
-
-bin_events_all = load_events(BIN_EVENTS_PATH)
-
-today_events = [
-    e for e in bin_events_all
-    if e.get("timestamp", "").startswith(active_day)
-]
-
-if len(today_events) > 0:
-    bin_df = pd.DataFrame(today_events)
-    measured_waste_kg = float(bin_df["weight_kg"].sum())
-    wrong_bin_kg = float(bin_df.loc[bin_df["is_correct_bin"] == False, "weight_kg"].sum())
-else:
-    measured_waste_kg = 0.0
-    wrong_bin_kg = 0.0
+# running totals from the Smart Bin summary sidecar: no full-log parse per rerun
+bin_summary = compute.event_summary(BIN_EVENTS_PATH)
+today_rollup = rollups.get(PROPERTY_ID, active_day)
+measured_waste_kg = today_rollup.measured_kg
+wrong_bin_kg = today_rollup.wrong_bin_kg
 
 
 # Demo threshold (tune if needed)
@@ -244,14 +269,14 @@ proof_threshold_kg = max(2.0, 0.015 * float(out.recommended_portions))
 
 
 
-streak_days = int(st.session_state.green_star_streak)
+streak_days = rollups.current_streak(PROPERTY_ID, before=active_day)
 demo_days = int(days_used) if (jury_mode and days_used is not None) else streak_days
 
 # Star logic: jury_mode sadece "simulate star" için
-effective_days = int(st.session_state.green_star_streak)
+effective_days = streak_days
 
 
-star = evaluate_green_star(
+star = compute.green_star(
     estimated_waste_reduction_pct=savings.estimated_waste_reduction_pct,
     days_used_in_a_row=effective_days,
 )
@@ -268,14 +293,19 @@ with a:
 with b:
     st.markdown("### Demo ML")
     st.metric("Recommended Portions", f"{ml_out.recommended_portions}", delta=f"{ml_out.recommended_portions - baseline_out.baseline_portions:+d} vs baseline")
-    st.caption(f"Demo score (synthetic): R²={demo_ml.demo_r2:.2f} • MAE={demo_ml.demo_mae:.1f} portions")
+    st.caption(f"{ml_score_label}: R²={demo_ml.demo_r2:.2f} • MAE={demo_ml.demo_mae:.1f} portions")
 
 top = st.columns([1, 1, 1], gap="large")
 with top[0]:
     kpi("Recommended Portions", f"{out.recommended_portions}", f"Baseline: {out.baseline_portions}")
 with top[1]:
     monthly_savings = savings.estimated_savings_thb * 30.0
-    kpi("Estimated Monthly Savings", f"฿{monthly_savings:,.0f}", "Ingredients only (demo estimate)")
+    p5, _, p95 = compute.savings_bands(out.recommended_portions, out.baseline_portions, cost_thb_per_portion)
+    kpi(
+        "Estimated Monthly Savings",
+        f"฿{monthly_savings:,.0f}",
+        f"Ingredients only (demo estimate) • 90% band ฿{p5 * 30.0:,.0f}–฿{p95 * 30.0:,.0f}",
+    )
 with top[2]:
     kpi("Avoided Waste", f"{savings.estimated_avoided_waste_kg:.2f} kg/day", "Based on portion equivalent (demo)")
 
@@ -300,7 +330,7 @@ st.write("")
 st.write("")
 st.markdown("## Last 7 Days — Learning Trend (Demo)")
 
-history_rows = generate_fake_history(
+history_rows = compute.fake_history(
     today_baseline=out.baseline_portions,
     today_recommended=out.recommended_portions,
     today_avoided_kg=savings.estimated_avoided_waste_kg,
@@ -369,21 +399,21 @@ with cB:
 st.divider()
 st.markdown("## Smart Bin (Demo) — Camera + Scale Logging")
 if st.button("🗑️ Clear Smart Bin Logs (Active Day)", use_container_width=True):
-    active_day = st.session_state.active_day
-    all_events = load_events(BIN_EVENTS_PATH)
-    kept = [e for e in all_events if not e.get("timestamp", "").startswith(active_day)]
-    save_events(BIN_EVENTS_PATH, kept)
+    delete_day(BIN_EVENTS_PATH, st.session_state.active_day)
     st.rerun()
 left, right = st.columns([1.05, 0.95], gap="large")
 
 with left:
     st.markdown("### Log a disposal event (demo)")
-    selected_item = st.selectbox("What was thrown away?", list(ITEM_TO_BIN.keys()), index=0)
-    chosen_bin = st.selectbox("Which bin is being used?", BINS, index=0)
+    # the rules in effect on the active (possibly demo) day the event is logged under
+    routing = load_table(day=st.session_state.active_day)
+    selected_item = st.selectbox("What was thrown away?", list(routing.items), index=0)
+    chosen_bin = st.selectbox("Which bin is being used?", list(routing.bins), index=0)
     weight_kg = st.number_input("Measured weight (kg)", min_value=0.0, max_value=50.0, value=0.25, step=0.05)
 
     pred_item, conf = classify_demo(selected_item)
-    rule = evaluate_bin(pred_item, chosen_bin)
+    routed = evaluate_bins([pred_item], [chosen_bin], routing)
+    rule = routed.result(0)
 
     st.write(f"**Camera detected:** {pred_item} (confidence: {conf:.2f})")
     if rule.is_correct_bin:
@@ -399,7 +429,7 @@ with left:
             "confidence": conf,
             "weight_kg": float(weight_kg),
             "bin_used": chosen_bin,
-            "recommended_bin": ITEM_TO_BIN.get(pred_item, "Landfill"),
+            "recommended_bin": str(routed.required_bins()[0]),
             "is_correct_bin": rule.is_correct_bin,
         })
         st.rerun()
@@ -407,15 +437,13 @@ with left:
 
 with right:
     st.markdown("### Today’s waste breakdown (demo log)")
-    events = load_events(BIN_EVENTS_PATH)
-    if len(events) == 0:
+    if bin_summary.count == 0:
         st.info("No Smart Bin events yet. Add one on the left.")
     else:
-        df = pd.DataFrame(events)
-        st.dataframe(df.tail(10), use_container_width=True)
+        st.dataframe(pd.DataFrame(compute.recent_events(BIN_EVENTS_PATH, 10)), use_container_width=True)
 
-        total = df["weight_kg"].sum()
-        wrong = df.loc[df["is_correct_bin"] == False, "weight_kg"].sum()
+        total = bin_summary.total_kg
+        wrong = bin_summary.wrong_bin_kg
 
         c1, c2 = st.columns(2)
         with c1:
@@ -423,34 +451,28 @@ with right:
         with c2:
             st.metric("Wrong-bin waste", f"{wrong:.2f} kg")
 
-        by_item = df.groupby("item")["weight_kg"].sum().sort_values(ascending=False)
+        by_item = pd.Series(bin_summary.kg_by_item, name="weight_kg", dtype=float).sort_values(ascending=False)
         st.bar_chart(by_item)
 st.markdown("## Recycler Redirect (Demo)")
 
-partners = get_demo_partners()
+partners = get_partner_index().partners
 partner_labels = [f"{p.name}  • accepts: {', '.join(p.accepts)}  • ETA: {p.eta_window}" for p in partners]
 
 left, right = st.columns([1.05, 0.95], gap="large")
 
 with left:
     if st.button("🗑️ Clear Pickup Requests (Active Day)", use_container_width=True):
-        active_day = st.session_state.active_day
-        all_reqs = load_events(RECYCLER_REQ_PATH)
-        kept = [r for r in all_reqs if not r.get("timestamp", "").startswith(active_day)]
-        save_events(RECYCLER_REQ_PATH, kept)
+        delete_day(RECYCLER_REQ_PATH, st.session_state.active_day)
         st.rerun()
     st.markdown("### Create a pickup request")
     
 
     # Pull totals from Smart Bin logs
-    bin_events = load_events(BIN_EVENTS_PATH)
-    if len(bin_events) == 0:
+    if bin_summary.count == 0:
         st.info("No Smart Bin events yet. Add Smart Bin events first to generate a redirect request.")
     else:
-        dfb = pd.DataFrame(bin_events)
-
-        total_waste = float(dfb["weight_kg"].sum())
-        wrong_bin = float(dfb.loc[dfb["is_correct_bin"] == False, "weight_kg"].sum())
+        total_waste = bin_summary.total_kg
+        wrong_bin = bin_summary.wrong_bin_kg
 
         st.metric("Total measured waste (from Smart Bin)", f"{total_waste:.2f} kg")
         st.metric("Wrong-bin waste", f"{wrong_bin:.2f} kg")
@@ -480,31 +502,96 @@ with left:
         if st.button("Send Pickup Request", type="primary", use_container_width=True):
             demo_ts = f"{st.session_state.active_day}T{datetime.now().strftime('%H:%M:%S')}"
             chosen = partners[partner_idx]
-            append_event(RECYCLER_REQ_PATH, {
-                "timestamp": now_iso(),
-                "waste_stream": waste_stream,
-                "estimated_kg": float(pickup_kg),
-                "partner_id": chosen.id,
-                "partner_name": chosen.name,
-                "eta_window": chosen.eta_window,
-                "note": pickup_note,
-                "status": "REQUESTED",
-            })
+            create_request(
+                RECYCLER_REQ_PATH,
+                waste_stream=waste_stream,
+                estimated_kg=float(pickup_kg),
+                partner_id=chosen.id,
+                partner_name=chosen.name,
+                eta_window=chosen.eta_window,
+                note=pickup_note,
+                property_id=PROPERTY_ID,
+                timestamp=demo_ts,
+            )
             st.success(f"✅ Request sent to **{chosen.name}** (ETA {chosen.eta_window}) for **{pickup_kg:.2f} kg**.")
             st.rerun()
 
 with right:
     st.markdown("### Pickup request log")
 
-    reqs = load_events(RECYCLER_REQ_PATH)
-    if len(reqs) == 0:
+    pickup_index = load_pickup_index(RECYCLER_REQ_PATH)
+    if not pickup_index.requests:
         st.info("No pickup requests yet.")
     else:
-        dfr = pd.DataFrame(reqs)
-        st.dataframe(dfr.tail(10), use_container_width=True)
+        counts = pickup_index.counts()
+        st.caption(" • ".join(f"{status}: {counts[status]}" for status in STATUSES))
+
+        open_queue = pickup_index.with_status(*OPEN_STATUSES)
+        queue_cols = ["request_id", "requested_at", "status", "waste_stream", "estimated_kg", "partner_name", "eta_window"]
+        st.dataframe(pd.DataFrame([asdict(r) for r in open_queue], columns=queue_cols), use_container_width=True)
 
         st.caption("Demo: requests are stored locally. In production, this would go to a backend + partner API/WhatsApp.")
 
+        movable = pickup_index.with_status(REQUESTED, ACCEPTED, COLLECTED)
+        if movable:
+            st.markdown("#### Update a pickup")
+            move_idx = st.selectbox(
+                "Pickup request",
+                list(range(len(movable))),
+                format_func=lambda i: f"{movable[i].request_id} • {movable[i].waste_stream} • {movable[i].status}",
+            )
+            move_req = movable[move_idx]
+            next_status = TRANSITIONS[move_req.status][0]
+            move_kg = None
+            if next_status in (COLLECTED, WEIGHED):
+                move_kg = st.number_input(
+                    f"{'Collected' if next_status == COLLECTED else 'Weighed'} weight (kg)",
+                    min_value=0.0,
+                    max_value=500.0,
+                    value=float(move_req.collected_kg or move_req.estimated_kg),
+                    step=0.5,
+                )
+            if st.button(f"Mark as {next_status}", use_container_width=True):
+                transition(RECYCLER_REQ_PATH, move_req.request_id, next_status, move_kg)
+                st.rerun()
+
+        plan = plan_pickups()
+        own = [a for a in plan.assignments if a.request.get("property_id") == PROPERTY_ID]
+        if own:
+            st.markdown("#### Pickup schedule")
+            st.dataframe(pd.DataFrame([
+                {
+                    "day": a.day,
+                    "waste_stream": a.request.get("waste_stream"),
+                    "estimated_kg": a.request.get("estimated_kg"),
+                    "partner_id": a.partner_id,
+                    "eta_window": a.eta_window,
+                    "status": a.reason,
+                }
+                for a in own
+            ]), use_container_width=True)
+
+        recon = reconcile(RECYCLER_REQ_PATH, BIN_EVENTS_PATH, active_day)
+        if recon:
+            st.markdown("#### Weighed vs Smart Bin (active day)")
+            st.dataframe(pd.DataFrame([asdict(r) for r in recon]), use_container_width=True)
+
+        runs = plan.runs
+        if runs:
+            st.markdown("#### Consolidated pickup runs (all properties)")
+            st.dataframe(pd.DataFrame([
+                {
+                    "partner_id": run.partner_id,
+                    "day": run.day,
+                    "eta_window": run.eta_window,
+                    "stops": " → ".join(run.stops + run.unlocated),
+                    "requests": len(run.requests),
+                    "total_kg": round(run.total_kg, 2),
+                    "distance_km": round(run.distance_km, 1),
+                }
+                for run in runs
+            ]), use_container_width=True)
+
 st.divider()
 st.markdown("## End of Day — What actually happened?")
 
@@ -549,12 +636,27 @@ else:
     st.warning("⚠ Proof check failed (waste too high or too many wrong-bin events).")
 
 if st.button("Submit End-of-Day Result", use_container_width=True):
-    if day_status == "COUNTED":
-        st.session_state.green_star_streak += 1
-    elif day_status == "NEUTRAL":
-        st.session_state.green_star_streak = st.session_state.green_star_streak
-    else:
-        st.session_state.green_star_streak = 0
+    if history_model is not None and history_model.precision is not None:
+        save_feedback(
+            history_model.version,
+            PROPERTY_ID,
+            active_day,
+            expected_guests=int(expected_guests),
+            occupancy_rate=float(occupancy_rate),
+            weather=weather,
+            day_type=day_type,
+            event_level=event_level,
+            actual_cooked=int(actual_cooked),
+        )
+
+    rollups.record_eod(
+        PROPERTY_ID,
+        active_day,
+        recommended=int(recommended),
+        baseline=int(baseline),
+        actual=int(actual_cooked),
+        day_status=day_status,
+    )
 
     st.session_state.active_day = (date.fromisoformat(st.session_state.active_day) + timedelta(days=1)).isoformat()
     st.rerun()
@@ -592,7 +694,7 @@ st.caption(
     "In production, this data is stored and used to improve future recommendations."
 )
 
-streak = int(st.session_state.green_star_streak)
+streak = streak_days
 
 st.markdown("### Green Star ⭐ Progress")
 progress = min(1.0, streak / 7.0)
@@ -602,3 +704,16 @@ if streak >= 7:
     st.success("⭐ Green Star ACTIVE — consistent, data-backed waste reduction!")
 else:
     st.info(f"Keep going. {7 - streak} more counted day(s) to activate Green Star.")
+
+if len(property_ids) > 1:
+    st.divider()
+    st.markdown("## Group Overview (all properties)")
+    group_df = group_frame()
+    g1, g2, g3 = st.columns(3)
+    with g1:
+        st.metric("Group measured waste", f"{group_df['waste_kg'].sum():.2f} kg")
+    with g2:
+        st.metric("Group wrong-bin waste", f"{group_df['wrong_bin_kg'].sum():.2f} kg")
+    with g3:
+        st.metric("Group savings (End-of-Day)", f"฿{group_df['savings_thb'].sum():,.0f}")
+    st.dataframe(group_df, use_container_width=True)
@@ -0,0 +1,19 @@
+import pytest
+
+from logic import bin_storage
+
+# Run from app/: python -m pytest -q
+# This file sits in app/ so pytest puts app/ on sys.path and tests import
+# `logic.*` the same way app.py and api.py do.
+
+
+@pytest.fixture(autouse=True)
+def jsonl_backend(monkeypatch):
+    # every test starts on the default backend; tests that need SQLite switch
+    # it themselves and monkeypatch restores it afterwards
+    monkeypatch.setattr(bin_storage, "STORAGE_BACKEND", "jsonl")
+
+
+@pytest.fixture
+def events_path(tmp_path):
+    return str(tmp_path / "bin_events.json")
@@ -0,0 +1,155 @@
+import os
+import shutil
+from typing import List, Optional, Sequence
+
+import pandas as pd
+
+# Columnar archive tier. Closed days of a Smart Bin event log and months of
+# training_history.csv are written as Parquet partitions:
+#     <archive_dir>/<name>/day=YYYY-MM-DD/part-0.parquet
+# where <name> is the source path relative to app/data without its extension
+# ("bin_events", "properties/<id>/bin_events"), so every property's log gets
+# its own partitions.
+#     <archive_dir>/<name>/month=YYYY-MM/part-0.parquet
+# Readers pick partitions by directory name (date predicate pushdown) and
+# load only the requested columns, memory-mapped. Needs pyarrow, which
+# streamlit already depends on.
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+ARCHIVE_DIR = os.path.join(DATA_DIR, "archive")
+PART_FILE = "part-0.parquet"
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise ImportError("The Parquet archive needs pyarrow: pip install pyarrow") from exc
+    return pq
+
+
+def archive_name(path: str) -> str:
+    stem = os.path.splitext(os.path.abspath(path))[0]
+    try:
+        rel = os.path.relpath(stem, DATA_DIR)
+    except ValueError:  # another drive on Windows
+        rel = ".."
+    if rel.startswith(".."):
+        # logs kept outside app/data: key them by their absolute path
+        rel = os.path.join("_abs", os.path.splitdrive(stem)[1].lstrip(os.sep))
+    return rel.replace(os.sep, "/")
+
+
+def partition_dir(name: str, key: str, value: str, archive_dir: str = ARCHIVE_DIR) -> str:
+    return os.path.join(archive_dir, name, f"{key}={value}")
+
+
+def list_partitions(name: str, key: str = "day", archive_dir: str = ARCHIVE_DIR) -> List[str]:
+    root = os.path.join(archive_dir, name)
+    if not os.path.isdir(root):
+        return []
+    prefix = key + "="
+    return sorted(
+        d[len(prefix):] for d in os.listdir(root)
+        if d.startswith(prefix) and os.path.exists(os.path.join(root, d, PART_FILE))
+    )
+
+
+def write_partition(df: pd.DataFrame, name: str, key: str, value: str, archive_dir: str = ARCHIVE_DIR) -> str:
+    _require_pyarrow()
+    out_dir = partition_dir(name, key, value, archive_dir)
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, PART_FILE)
+    tmp = path + ".tmp"
+    df.to_parquet(tmp, engine="pyarrow", index=False)
+    os.replace(tmp, path)
+    return path
+
+
+def drop_partition(name: str, key: str, value: str, archive_dir: str = ARCHIVE_DIR) -> None:
+    shutil.rmtree(partition_dir(name, key, value, archive_dir), ignore_errors=True)
+
+
+def read_partitions(
+    name: str,
+    key: str = "day",
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    columns: Optional[Sequence[str]] = None,
+    archive_dir: str = ARCHIVE_DIR,
+) -> pd.DataFrame:
+    # since/until compare against the partition value (YYYY-MM-DD or YYYY-MM);
+    # for month partitions pass the month prefix of a date range
+    pq = _require_pyarrow()
+    values = [
+        v for v in list_partitions(name, key, archive_dir)
+        if (since is None or v >= since) and (until is None or v <= until)
+    ]
+    frames = []
+    for v in values:
+        path = os.path.join(partition_dir(name, key, v, archive_dir), PART_FILE)
+        available = pq.read_schema(path).names
+        cols = None if columns is None else [c for c in columns if c in available]
+        frames.append(pq.read_table(path, columns=cols, memory_map=True).to_pandas())
+    if not frames:
+        return pd.DataFrame(columns=list(columns) if columns is not None else None)
+    return pd.concat(frames, ignore_index=True)
+
+
+def archive_training_history(csv_path: str, archive_dir: str = ARCHIVE_DIR, date_column: str = "date") -> List[str]:
+    # keep_default_na=False: event_level "None" is a category, not a missing value
+    df = pd.read_csv(csv_path, keep_default_na=False)
+    name = archive_name(csv_path)
+    months = df[date_column].astype(str).str.slice(0, 7)
+    return [
+        write_partition(part.reset_index(drop=True), name, "month", month, archive_dir)
+        for month, part in df.groupby(months)
+    ]
+
+
+def read_training_history(
+    csv_name: str = "training_history",
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    columns: Optional[Sequence[str]] = None,
+    archive_dir: str = ARCHIVE_DIR,
+    date_column: str = "date",
+) -> pd.DataFrame:
+    cols = None if columns is None else list(dict.fromkeys([date_column, *columns]))
+    df = read_partitions(
+        csv_name, "month",
+        since=since[:7] if since else None,
+        until=until[:7] if until else None,
+        columns=cols,
+        archive_dir=archive_dir,
+    )
+    if df.empty:
+        return df
+    d = df[date_column].astype(str)
+    mask = pd.Series(True, index=df.index)
+    if since is not None:
+        mask &= d >= since
+    if until is not None:
+        mask &= d <= until
+    df = df[mask].reset_index(drop=True)
+    return df if columns is None or date_column in columns else df.drop(columns=[date_column])
+
+
+def main():
+    # run from app/: python -m logic.archive
+    from logic.bin_storage import archive_closed_days
+
+    from logic.properties import REGISTRY
+
+    # the pickup request log stays live: its lifecycle fold reads only the
+    # live log, and open requests can span any number of days
+    for prop in REGISTRY.list():
+        days = archive_closed_days(prop.bin_events_path)
+        print("Archived", archive_name(prop.bin_events_path), "days:", len(days))
+    parts = archive_training_history(os.path.join(DATA_DIR, "training_history.csv"))
+    print("Archived training_history.csv months:", len(parts))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,43 @@
 import json
 import os
-from datetime import datetime
-from typing import Any, Dict, List
+import threading
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import pandas as pd
+
+from logic import archive
+from logic.event_log import get_log, lock_path
+from logic.event_summary import EventSummary, SummaryIndex, event_day, read_index, summary_path, write_index
+from logic.event_writer import start_writer
+from logic.file_lock import lock_for
+from logic.sqlite_store import get_sqlite_store
+
+# Events are stored as day-segmented JSONL under "<stem>.log/" next to the
+# given path (see logic/event_log.py), or in "<stem>.sqlite3" when
+# FOODSAVE_STORAGE=sqlite. The .json path is kept as the public handle so
+# callers don't depend on the backend. Appends from every session go through
+# one writer thread (logic/event_writer.py) that commits them in batches.
+# Every mutation also updates the per-day running totals in
+# "<stem>.summary.json" under the same lock (see SummaryIndex), which is what
+# summarize_events() reads.
+
+BACKENDS = ("jsonl", "sqlite")
+STORAGE_BACKEND = os.environ.get("FOODSAVE_STORAGE", "jsonl").lower()
+
+
+def set_backend(name: str) -> None:
+    global STORAGE_BACKEND
+    name = name.lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown storage backend: {name} (expected one of {', '.join(BACKENDS)})")
+    STORAGE_BACKEND = name
+
+def _store(path: str):
+    _ensure_file(path)
+    if STORAGE_BACKEND == "sqlite":
+        return get_sqlite_store(path)
+    return get_log(path)
 
 def _ensure_file(path: str) -> None:
     os.makedirs(os.path.dirname(path), exist_ok=True)
@@ -9,22 +45,165 @@ def _ensure_file(path: str) -> None:
         with open(path, "w", encoding="utf-8") as f:
             json.dump([], f)
 
+def _lock(path: str):
+    return lock_for(lock_path(path))
+
+_SUMMARY_COLUMNS = ["timestamp", "item", "weight_kg", "is_correct_bin"]
+
+def _rebuild_index(path: str, archive_dir: Optional[str] = None) -> SummaryIndex:
+    index = SummaryIndex()
+    index.apply(_store(path).iter_range())
+    archive_dir = archive_dir or archive.ARCHIVE_DIR
+    name = archive.archive_name(path)
+    if archive.list_partitions(name, "day", archive_dir):
+        df = archive.read_partitions(name, "day", columns=_SUMMARY_COLUMNS, archive_dir=archive_dir)
+        index.apply_archived(df.astype(object).where(df.notna(), None).to_dict("records"))
+    return index
+
+def _with_index(path: str, mutate: Callable[[SummaryIndex], None], archive_dir: Optional[str] = None) -> None:
+    # caller holds _lock(path)
+    index = read_index(path)
+    if index is None:
+        index = _rebuild_index(path, archive_dir)
+    else:
+        mutate(index)
+    write_index(path, index)
+
+def _commit(path: str, events: List[Dict[str, Any]]) -> None:
+    with _lock(path):
+        _store(path).append_many(events)
+        _with_index(path, lambda index: index.apply(events))
+
+def _reindex(path: str) -> None:
+    with _lock(path):
+        write_index(path, _rebuild_index(path))
+
+_INDEX_CACHE: Dict[str, tuple] = {}
+_INDEX_CACHE_LOCK = threading.Lock()
+
+def load_summary_index(path: str) -> SummaryIndex:
+    _store(path)
+    sidecar = summary_path(path)
+    if not os.path.exists(sidecar):
+        _reindex(path)
+    st = os.stat(sidecar)
+    sig = (st.st_mtime_ns, st.st_size)
+    with _INDEX_CACHE_LOCK:
+        hit = _INDEX_CACHE.get(sidecar)
+        if hit is not None and hit[0] == sig:
+            return hit[1]
+    index = read_index(path)
+    if index is None:
+        _reindex(path)
+        index = read_index(path) or SummaryIndex()
+    with _INDEX_CACHE_LOCK:
+        _INDEX_CACHE[sidecar] = (sig, index)
+    return index
+
+def index_version(path: str) -> tuple:
+    # changes on every committed mutation, from any process: O(1) change token
+    load_summary_index(path)
+    st = os.stat(summary_path(path))
+    return (STORAGE_BACKEND, st.st_mtime_ns, st.st_size)
+
 def load_events(path: str) -> List[Dict[str, Any]]:
-    _ensure_file(path)
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return _store(path).read_all()
+
+def iter_events(path: str, since: Optional[str] = None, until: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    return _store(path).iter_range(since, until)
+
+def load_events_for_day(path: str, day: str) -> List[Dict[str, Any]]:
+    return _store(path).read_day(day)
+
+def load_events_range(path: str, since: Optional[str] = None, until: Optional[str] = None) -> List[Dict[str, Any]]:
+    return _store(path).read_range(since, until)
+
+def load_recent_events(path: str, limit: int = 10) -> List[Dict[str, Any]]:
+    return _store(path).read_recent(limit)
+
+def delete_day(path: str, day: str) -> None:
+    with _lock(path):
+        _store(path).delete_day(day)
+        _with_index(path, lambda index: index.drop_day(day))
 
 def append_event(path: str, event: Dict[str, Any]) -> None:
-    _ensure_file(path)
-    events = load_events(path)
-    events.append(event)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(events, f, indent=2)
+    append_events(path, [event])
+
+def append_events(path: str, events: Iterable[Dict[str, Any]]) -> None:
+    events = list(events)
+    # reject bad timestamps here, before they can fail a shared writer batch
+    for e in events:
+        event_day(e)
+    _WRITER.write(path, events)
 
 def now_iso() -> str:
     return datetime.now().isoformat(timespec="seconds")
 
 def save_events(path: str, events) -> None:
-    _ensure_file(path)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(events, f, indent=2)
+    with _lock(path):
+        _store(path).rewrite(events)
+        write_index(path, _rebuild_index(path))
+
+def list_days(path: str) -> List[str]:
+    return _store(path).days()
+
+def archive_closed_days(path: str, before: Optional[str] = None, archive_dir: str = archive.ARCHIVE_DIR) -> List[str]:
+    # roll every live day older than `before` (default: today) into the
+    # Parquet archive, then drop it from the live log. Each day is read,
+    # written and deleted under the log lock, so a late append to that day
+    # either lands before the read or after the delete, never in between.
+    # The sidecar keeps the day's totals, flagged as archived, so summaries
+    # and rollups don't change. Only for event logs read through
+    # read_events_frame: the pickup request log is folded from the live log.
+    before = before or date.today().isoformat()
+    name = archive.archive_name(path)
+    archived = []
+    for day in list_days(path):
+        if day >= before:
+            continue
+        with _lock(path):
+            events = load_events_for_day(path, day)
+            if events:
+                df = pd.DataFrame(events)
+                if day in archive.list_partitions(name, "day", archive_dir):
+                    # late events for an already archived day: merge, don't clobber
+                    old = archive.read_partitions(name, "day", since=day, until=day, archive_dir=archive_dir)
+                    df = pd.concat([old, df], ignore_index=True)
+                archive.write_partition(df, name, "day", day, archive_dir)
+            _store(path).delete_day(day)
+            _with_index(path, lambda index: index.archive_day(day), archive_dir)
+        archived.append(day)
+    return archived
+
+EVENT_COLUMNS = ["timestamp", "item", "confidence", "weight_kg", "bin_used", "recommended_bin", "is_correct_bin"]
+
+def read_events_frame(
+    path: str,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    columns: Optional[Sequence[str]] = None,
+    archive_dir: str = archive.ARCHIVE_DIR,
+) -> pd.DataFrame:
+    # archived partitions in [since, until] + the live log for the same range
+    name = archive.archive_name(path)
+    frames = []
+    if archive.list_partitions(name, "day", archive_dir):
+        frames.append(archive.read_partitions(name, "day", since, until, columns, archive_dir))
+    live = pd.DataFrame(load_events_range(path, since, until))
+    if not live.empty:
+        if columns is not None:
+            live = live.reindex(columns=list(columns))
+        frames.append(live)
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame(columns=list(columns) if columns is not None else EVENT_COLUMNS)
+    df = pd.concat(frames, ignore_index=True)
+    if "timestamp" in df.columns:
+        df = df.sort_values("timestamp", kind="stable").reset_index(drop=True)
+    return df
+
+def summarize_events(path: str, since: Optional[str] = None, until: Optional[str] = None) -> EventSummary:
+    return load_summary_index(path).total(since, until)
+
+
+_WRITER = start_writer(_commit)
@@ -0,0 +1,149 @@
+import copy
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import astuple
+from datetime import date
+from functools import lru_cache
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+import pandas as pd
+
+from logic.bin_storage import index_version, load_recent_events, summarize_events
+from logic.demand_engine import DemandInputs, DemandOutput, estimate_portions
+from logic.encodings import REGISTRY, EncodingRegistry
+from logic.event_summary import EventSummary
+from logic.green_star import GreenStarResult, evaluate_green_star
+from logic.history import generate_fake_history
+from logic.savings import SavingsOutput, estimate_savings, simulate_savings
+
+# Cached entry points for app.py. Streamlit reruns the whole script on every
+# widget change; these make a rerun only pay for what its inputs changed.
+# Pure logic calls are memoized on their arguments; storage reads are cached
+# on a version token (file mtime / the event log's summary sidecar) so writes
+# from any session or process invalidate them. Results are copied on the way out because
+# callers (and Streamlit) are free to mutate what they get back.
+
+CACHE_SIZE = 256
+
+
+class VersionedCache:
+    def __init__(self, max_entries: int = CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, version: Hashable, load: Callable[[], Any]) -> Any:
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is not None and hit[0] == version:
+                self._entries.move_to_end(key)
+                return hit[1]
+        value = load()
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_DATA = VersionedCache()
+
+
+def _default_menu_costs() -> pd.DataFrame:
+    return pd.DataFrame(
+        {"item": ["Breakfast Buffet", "Lunch Buffet", "Dinner Buffet"], "cost_thb_per_portion": [65, 95, 120]}
+    )
+
+
+def load_menu_costs(path: str) -> pd.DataFrame:
+    if not os.path.exists(path):
+        return _default_menu_costs()
+    df = _DATA.get(("menu", path), os.stat(path).st_mtime_ns, lambda: pd.read_csv(path))
+    return df.copy()
+
+
+def event_summary(path: str, since: Optional[str] = None, until: Optional[str] = None) -> EventSummary:
+    # served from the running-totals sidecar, which bin_storage caches on mtime
+    return summarize_events(path, since, until)
+
+
+def recent_events(path: str, limit: int = 10) -> List[Dict[str, Any]]:
+    rows = _DATA.get(("recent", path, limit), index_version(path), lambda: load_recent_events(path, limit))
+    return copy.deepcopy(rows)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _demand(key: tuple, registry: EncodingRegistry) -> DemandOutput:
+    return estimate_portions(DemandInputs(*key), registry)
+
+
+def demand(inp: DemandInputs, registry: EncodingRegistry = REGISTRY) -> DemandOutput:
+    # registries are cached per file mtime by load_registry, so the object
+    # is a stable cache key until the property's encodings.json changes
+    return copy.deepcopy(_demand(astuple(inp), registry))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _savings(recommended_portions: int, baseline_portions: int, cost_thb_per_portion: float) -> SavingsOutput:
+    return estimate_savings(
+        recommended_portions=recommended_portions,
+        baseline_portions=baseline_portions,
+        cost_thb_per_portion=cost_thb_per_portion,
+    )
+
+
+def savings(recommended_portions: int, baseline_portions: int, cost_thb_per_portion: float) -> SavingsOutput:
+    return copy.deepcopy(_savings(int(recommended_portions), int(baseline_portions), float(cost_thb_per_portion)))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _savings_bands(recommended_portions: int, baseline_portions: int, cost_thb_per_portion: float) -> tuple:
+    bands = simulate_savings(recommended_portions, baseline_portions, cost_thb_per_portion)
+    return tuple(float(v) for v in bands.estimated_savings_thb)
+
+
+def savings_bands(recommended_portions: int, baseline_portions: int, cost_thb_per_portion: float) -> tuple:
+    # daily savings (P5, P50, P95) under assumption uncertainty
+    return _savings_bands(int(recommended_portions), int(baseline_portions), float(cost_thb_per_portion))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _green_star(estimated_waste_reduction_pct: float, days_used_in_a_row: int) -> GreenStarResult:
+    return evaluate_green_star(
+        estimated_waste_reduction_pct=estimated_waste_reduction_pct,
+        days_used_in_a_row=days_used_in_a_row,
+    )
+
+
+def green_star(estimated_waste_reduction_pct: float, days_used_in_a_row: int) -> GreenStarResult:
+    return copy.copy(_green_star(float(estimated_waste_reduction_pct), int(days_used_in_a_row)))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _fake_history(today_baseline: int, today_recommended: int, today_avoided_kg: float, days: int, today: str) -> tuple:
+    # "today" is only part of the key: the rows are dated from date.today()
+    return tuple(generate_fake_history(today_baseline, today_recommended, today_avoided_kg, days=days))
+
+
+def fake_history(
+    today_baseline: int,
+    today_recommended: int,
+    today_avoided_kg: float,
+    days: int = 7,
+) -> List[Dict[str, Any]]:
+    rows = _fake_history(
+        int(today_baseline), int(today_recommended), float(today_avoided_kg), int(days), date.today().isoformat()
+    )
+    return [dict(r) for r in rows]
+
+
+def clear_caches() -> None:
+    _DATA.clear()
+    for fn in (_demand, _savings, _savings_bands, _green_star, _fake_history):
+        fn.cache_clear()
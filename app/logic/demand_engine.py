@@ -1,6 +1,11 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Any, Mapping, Optional
 import math
 
+import numpy as np
+
+from logic.encodings import REGISTRY, EncodingRegistry
+
 
 @dataclass
 class DemandInputs:
@@ -24,45 +29,34 @@ def _clamp(x: float, lo: float, hi: float) -> float:
     return max(lo, min(hi, x))
 
 
-def _weather_factor(weather: str) -> float:
-    w = weather.lower()
-    if w == "rainy":
-        return 0.88
-    if w == "storm":
-        return 0.82
-    if w == "cloudy":
-        return 0.96
-    return 1.00
+def _weather_factor(weather: str, registry: EncodingRegistry = REGISTRY) -> float:
+    return registry["weather"].factor("demand", weather)
+
 
+def _day_factor(day_type: str, registry: EncodingRegistry = REGISTRY) -> float:
+    return registry["day_type"].factor("demand", day_type)
 
-def _day_factor(day_type: str) -> float:
-    d = day_type.lower()
-    if d == "weekend":
-        return 1.08
-    if d == "holiday":
-        return 1.12
-    return 1.00
 
+def _event_factor(event_level: str, registry: EncodingRegistry = REGISTRY) -> float:
+    return registry["event_level"].factor("demand", event_level)
 
-def _event_factor(event_level: str) -> float:
-    e = event_level.lower()
-    if e == "high":
-        return 1.15
-    if e == "medium":
-        return 1.07
-    return 1.00
 
+def _meal_buffer(target_meal: str, registry: EncodingRegistry = REGISTRY) -> float:
+    return registry["meal"].factor("demand", target_meal)
 
-def _meal_buffer(target_meal: str) -> float:
-    m = target_meal.lower()
-    if "breakfast" in m:
-        return 0.95
-    if "lunch" in m:
-        return 0.97
-    return 0.98
 
+def _explain(target_meal, weather, day_type, event_level, baseline, wf, df, ef, buf, multiplier) -> list[str]:
+    return [
+        f"Baseline based on expected guests & occupancy: {baseline} portions",
+        f"Weather factor ({weather}): x{wf:.2f}",
+        f"Day factor ({day_type}): x{df:.2f}",
+        f"Event factor ({event_level}): x{ef:.2f}",
+        f"Risk buffer for {target_meal}: x{buf:.2f}",
+        f"Final multiplier: x{multiplier:.2f}",
+    ]
 
-def estimate_portions(inp: DemandInputs) -> DemandOutput:
+
+def estimate_portions(inp: DemandInputs, registry: EncodingRegistry = REGISTRY) -> DemandOutput:
     explanation: list[str] = []
 
     expected_guests = max(0, int(inp.expected_guests))
@@ -71,10 +65,10 @@ def estimate_portions(inp: DemandInputs) -> DemandOutput:
     baseline = int(round(expected_guests * (0.85 + 0.30 * occupancy)))
     baseline = max(10, baseline)
 
-    wf = _weather_factor(inp.weather)
-    df = _day_factor(inp.day_type)
-    ef = _event_factor(inp.event_level)
-    buf = _meal_buffer(inp.target_meal)
+    wf = _weather_factor(inp.weather, registry)
+    df = _day_factor(inp.day_type, registry)
+    ef = _event_factor(inp.event_level, registry)
+    buf = _meal_buffer(inp.target_meal, registry)
 
     multiplier = wf * df * ef * buf
     multiplier = _clamp(multiplier, 0.70, 1.35)
@@ -82,12 +76,9 @@ def estimate_portions(inp: DemandInputs) -> DemandOutput:
     rec = int(math.ceil(baseline * multiplier))
     rec = max(10, rec)
 
-    explanation.append(f"Baseline based on expected guests & occupancy: {baseline} portions")
-    explanation.append(f"Weather factor ({inp.weather}): x{wf:.2f}")
-    explanation.append(f"Day factor ({inp.day_type}): x{df:.2f}")
-    explanation.append(f"Event factor ({inp.event_level}): x{ef:.2f}")
-    explanation.append(f"Risk buffer for {inp.target_meal}: x{buf:.2f}")
-    explanation.append(f"Final multiplier: x{multiplier:.2f}")
+    explanation.extend(
+        _explain(inp.target_meal, inp.weather, inp.day_type, inp.event_level, baseline, wf, df, ef, buf, multiplier)
+    )
 
     return DemandOutput(
         recommended_portions=rec,
@@ -95,3 +86,83 @@ def estimate_portions(inp: DemandInputs) -> DemandOutput:
         demand_multiplier=multiplier,
         explanation=explanation,
     )
+
+
+BATCH_COLUMNS = ("target_meal", "expected_guests", "occupancy_rate", "weather", "day_type", "event_level")
+_FACTOR_COLUMNS = (("weather", "weather"), ("day_type", "day_type"), ("event_level", "event_level"), ("target_meal", "meal"))
+
+
+@dataclass
+class DemandBatchOutput:
+    recommended_portions: np.ndarray
+    baseline_portions: np.ndarray
+    demand_multiplier: np.ndarray
+    weather_factor: np.ndarray
+    day_factor: np.ndarray
+    event_factor: np.ndarray
+    meal_buffer: np.ndarray
+    inputs: dict[str, np.ndarray] = field(repr=False)
+
+    def __len__(self) -> int:
+        return len(self.recommended_portions)
+
+    def explanation(self, i: int) -> list[str]:
+        return _explain(
+            self.inputs["target_meal"][i],
+            self.inputs["weather"][i],
+            self.inputs["day_type"][i],
+            self.inputs["event_level"][i],
+            int(self.baseline_portions[i]),
+            float(self.weather_factor[i]),
+            float(self.day_factor[i]),
+            float(self.event_factor[i]),
+            float(self.meal_buffer[i]),
+            float(self.demand_multiplier[i]),
+        )
+
+    def output(self, i: int, explain: bool = False) -> DemandOutput:
+        return DemandOutput(
+            recommended_portions=int(self.recommended_portions[i]),
+            baseline_portions=int(self.baseline_portions[i]),
+            demand_multiplier=float(self.demand_multiplier[i]),
+            explanation=self.explanation(i) if explain else [],
+        )
+
+
+def estimate_portions_batch(
+    inputs: Mapping[str, Any],
+    n: Optional[int] = None,
+    registry: EncodingRegistry = REGISTRY,
+) -> DemandBatchOutput:
+    # inputs: a pandas DataFrame or any mapping of BATCH_COLUMNS -> array-like
+    # (labels, or integer codes from logic.encodings); scalars broadcast
+    # against the longest column. Same arithmetic as estimate_portions.
+    cols = {name: np.asarray(inputs[name]) for name in BATCH_COLUMNS}
+    if n is None:
+        n = max(c.size for c in cols.values())
+    cols = {name: np.broadcast_to(c, (n,)) if c.ndim == 0 else c.reshape(-1) for name, c in cols.items()}
+
+    expected_guests = np.maximum(0, np.trunc(cols["expected_guests"].astype(float)))
+    occupancy = np.clip(cols["occupancy_rate"].astype(float), 0.0, 1.0)
+
+    baseline = np.maximum(10, np.round(expected_guests * (0.85 + 0.30 * occupancy)))
+
+    factors = []
+    for col, name in _FACTOR_COLUMNS:
+        enc = registry[name]
+        factors.append(enc.take("demand", enc.codes(cols[col])))
+    wf, df, ef, buf = factors
+
+    multiplier = np.clip(wf * df * ef * buf, 0.70, 1.35)
+    rec = np.maximum(10, np.ceil(baseline * multiplier))
+
+    return DemandBatchOutput(
+        recommended_portions=rec.astype(np.int64),
+        baseline_portions=baseline.astype(np.int64),
+        demand_multiplier=multiplier,
+        weather_factor=wf,
+        day_factor=df,
+        event_factor=ef,
+        meal_buffer=buf,
+        inputs=cols,
+    )
@@ -1,7 +1,22 @@
-import random
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
+from typing import Optional, Tuple
 import numpy as np
 
+from logic.encodings import REGISTRY, EncodingRegistry
+
+MODEL_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "model_cache")
+MODEL_CACHE_SIZE = 64
+MODEL_CACHE_DISK_ENTRIES = 512
+# bump when the synthetic training set or features change, so stale
+# weights on disk are not reused
+MODEL_CACHE_VERSION = 2
+DEMO_TRAINING_ROWS = 240
+
 
 @dataclass
 class DemoMLResult:
@@ -12,19 +27,16 @@ class DemoMLResult:
     demo_mae: float
 
 
-def _encode_weather(w: str) -> float:
-    m = {"Sunny": 1.00, "Cloudy": 0.98, "Rainy": 0.92, "Storm": 0.86}
-    return m.get(w, 1.00)
+def _encode_weather(w: str, registry: EncodingRegistry = REGISTRY) -> float:
+    return registry["weather"].factor("ml", w)
 
 
-def _encode_day(day_type: str) -> float:
-    m = {"Weekday": 1.00, "Weekend": 1.06, "Holiday": 1.10}
-    return m.get(day_type, 1.00)
+def _encode_day(day_type: str, registry: EncodingRegistry = REGISTRY) -> float:
+    return registry["day_type"].factor("ml", day_type)
 
 
-def _encode_event(e: str) -> float:
-    m = {"None": 1.00, "Medium": 1.07, "High": 1.15}
-    return m.get(e, 1.00)
+def _encode_event(e: str, registry: EncodingRegistry = REGISTRY) -> float:
+    return registry["event_level"].factor("ml", e)
 
 
 def _fit_ridge(X: np.ndarray, y: np.ndarray, lam: float = 1.0) -> np.ndarray:
@@ -35,12 +47,61 @@ def _fit_ridge(X: np.ndarray, y: np.ndarray, lam: float = 1.0) -> np.ndarray:
     return w
 
 
+@dataclass
+class RidgeState:
+    # Online form of _fit_ridge: weights plus P = (Xb^T Xb + lam*I)^-1, so a
+    # new observation updates both in O(d^2) (recursive least squares /
+    # Sherman-Morrison) with the same result as refitting on all rows.
+    weights: np.ndarray
+    precision: np.ndarray
+    n_obs: int
+
+
+def ridge_state(X: np.ndarray, y: np.ndarray, lam: float = 1.0) -> RidgeState:
+    Xb = np.hstack([np.ones((X.shape[0], 1)), X])
+    A = Xb.T @ Xb + lam * np.eye(Xb.shape[1])
+    P = np.linalg.inv(A)
+    w = P @ (Xb.T @ y)
+    return RidgeState(weights=w, precision=P, n_obs=int(X.shape[0]))
+
+
+def update_ridge(state: RidgeState, x: np.ndarray, y: float) -> RidgeState:
+    xb = np.concatenate([[1.0], np.asarray(x, dtype=float).ravel()])
+    P = state.precision
+    Px = P @ xb
+    k = Px / (1.0 + xb @ Px)
+    w = state.weights + k * (float(y) - xb @ state.weights)
+    P = P - np.outer(k, Px)
+    return RidgeState(weights=w, precision=P, n_obs=state.n_obs + 1)
+
+
+def downdate_ridge(state: RidgeState, x: np.ndarray, y: float) -> RidgeState:
+    # inverse of update_ridge: removes an observation that was added earlier
+    xb = np.concatenate([[1.0], np.asarray(x, dtype=float).ravel()])
+    P = state.precision
+    Px = P @ xb
+    k = Px / (1.0 - xb @ Px)
+    w = state.weights - k * (float(y) - xb @ state.weights)
+    P = P + np.outer(k, Px)
+    return RidgeState(weights=w, precision=P, n_obs=state.n_obs - 1)
+
+
 def _predict(w: np.ndarray, X: np.ndarray) -> np.ndarray:
     Xb = np.hstack([np.ones((X.shape[0], 1)), X])
     return Xb @ w
 
 
-def train_and_predict_demo_ml(
+@dataclass
+class DemoModel:
+    weights: np.ndarray
+    demo_r2: float
+    demo_mae: float
+
+
+TrainingKey = Tuple[int, float, str, str, str, int, int, int]
+
+
+def training_key(
     expected_guests: int,
     occupancy_rate: float,
     weather: str,
@@ -48,42 +109,65 @@ def train_and_predict_demo_ml(
     event_level: str,
     baseline_portions: int,
     seed: int = 42,
-) -> DemoMLResult:
-    rng = random.Random(seed)
-
-    X = []
-    y = []
-
-    for _ in range(240):
-        eg = max(0, int(expected_guests * (1 + rng.uniform(-0.20, 0.20))))
-        occ = min(1.0, max(0.0, occupancy_rate + rng.uniform(-0.12, 0.12)))
-
-        wf = _encode_weather(weather) * (1 + rng.uniform(-0.04, 0.04))
-        df = _encode_day(day_type) * (1 + rng.uniform(-0.03, 0.03))
-        ef = _encode_event(event_level) * (1 + rng.uniform(-0.03, 0.03))
-
-        target = int(
-            round(
-                max(
-                    10,
-                    baseline_portions
-                    * wf
-                    * df
-                    * ef
-                    * (0.92 + 0.16 * occ)
-                    * (1 + rng.uniform(-0.03, 0.03)),
-                )
-            )
-        )
+    n_rows: int = DEMO_TRAINING_ROWS,
+) -> TrainingKey:
+    return (
+        int(expected_guests),
+        float(occupancy_rate),
+        str(weather),
+        str(day_type),
+        str(event_level),
+        int(baseline_portions),
+        int(seed),
+        int(n_rows),
+    )
 
-        X.append([eg, occ, wf, df, ef])
-        y.append(target)
 
-    Xn = np.array(X, dtype=float)
-    yn = np.array(y, dtype=float)
+def generate_demo_training_set(
+    expected_guests: int,
+    occupancy_rate: float,
+    weather: str,
+    day_type: str,
+    event_level: str,
+    baseline_portions: int,
+    seed: int = 42,
+    n_rows: int = DEMO_TRAINING_ROWS,
+    registry: EncodingRegistry = REGISTRY,
+) -> Tuple[np.ndarray, np.ndarray]:
+    # Same noise model as the original per-row loop, drawn column-wise from
+    # one Generator: a given (inputs, seed, n_rows) always yields the same set.
+    rng = np.random.default_rng(seed)
+    u = rng.uniform(-1.0, 1.0, size=(n_rows, 6))
+
+    eg = np.maximum(0.0, np.trunc(expected_guests * (1 + 0.20 * u[:, 0])))
+    occ = np.clip(occupancy_rate + 0.12 * u[:, 1], 0.0, 1.0)
+    wf = _encode_weather(weather, registry) * (1 + 0.04 * u[:, 2])
+    df = _encode_day(day_type, registry) * (1 + 0.03 * u[:, 3])
+    ef = _encode_event(event_level, registry) * (1 + 0.03 * u[:, 4])
+
+    y = np.round(
+        np.maximum(10.0, baseline_portions * wf * df * ef * (0.92 + 0.16 * occ) * (1 + 0.03 * u[:, 5]))
+    )
+    X = np.column_stack([eg, occ, wf, df, ef])
+    return X, y
+
 
-    idx = np.arange(len(yn))
-    rng.shuffle(idx)
+def fit_demo_model(
+    expected_guests: int,
+    occupancy_rate: float,
+    weather: str,
+    day_type: str,
+    event_level: str,
+    baseline_portions: int,
+    seed: int = 42,
+    n_rows: int = DEMO_TRAINING_ROWS,
+    registry: EncodingRegistry = REGISTRY,
+) -> DemoModel:
+    Xn, yn = generate_demo_training_set(
+        expected_guests, occupancy_rate, weather, day_type, event_level, baseline_portions, seed, n_rows, registry
+    )
+
+    idx = np.random.default_rng(seed + 1).permutation(len(yn))
     split = int(0.8 * len(idx))
     tr, va = idx[:split], idx[split:]
 
@@ -99,24 +183,156 @@ def train_and_predict_demo_ml(
     ss_tot = float(np.sum((yva - np.mean(yva)) ** 2)) + 1e-9
     r2 = 1.0 - (ss_res / ss_tot)
 
-    feat = np.array(
-        [[
-            float(expected_guests),
-            float(occupancy_rate),
-            _encode_weather(weather),
-            _encode_day(day_type),
-            _encode_event(event_level),
-        ]],
-        dtype=float,
+    return DemoModel(weights=w, demo_r2=r2, demo_mae=mae)
+
+
+def predict_portions(
+    model: DemoModel,
+    expected_guests: int,
+    occupancy_rate: float,
+    weather: str,
+    day_type: str,
+    event_level: str,
+    registry: EncodingRegistry = REGISTRY,
+) -> int:
+    w = model.weights
+    pred = (
+        w[0]
+        + w[1] * float(expected_guests)
+        + w[2] * float(occupancy_rate)
+        + w[3] * _encode_weather(weather, registry)
+        + w[4] * _encode_day(day_type, registry)
+        + w[5] * _encode_event(event_level, registry)
     )
+    return max(10, int(round(float(pred))))
+
+
+class ModelCache:
+    # LRU of fitted models in memory, backed by one .npz per key on disk so
+    # a restarted app doesn't refit what it has already seen. The disk tier
+    # is an LRU too (by mtime, touched on every hit), capped at
+    # max_disk_entries files.
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = MODEL_CACHE_DIR,
+        max_entries: int = MODEL_CACHE_SIZE,
+        max_disk_entries: int = MODEL_CACHE_DISK_ENTRIES,
+    ):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self._models: "OrderedDict[tuple, DemoModel]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _file(self, key: tuple) -> str:
+        digest = hashlib.sha1(repr((MODEL_CACHE_VERSION, key)).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"demo_{digest}.npz")
+
+    def _remember(self, key: tuple, model: DemoModel) -> None:
+        self._models[key] = model
+        self._models.move_to_end(key)
+        while len(self._models) > self.max_entries:
+            self._models.popitem(last=False)
+
+    def _load(self, key: tuple) -> Optional[DemoModel]:
+        if self.cache_dir is None:
+            return None
+        path = self._file(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as z:
+                model = DemoModel(
+                    weights=z["weights"],
+                    demo_r2=float(z["demo_r2"]),
+                    demo_mae=float(z["demo_mae"]),
+                )
+            os.utime(path)
+            return model
+        except (OSError, ValueError, KeyError):
+            return None
 
-    pred = float(_predict(w, feat).ravel()[0])
-    pred_int = max(10, int(round(pred)))
+    def _save(self, key: tuple, model: DemoModel) -> None:
+        if self.cache_dir is None:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # unique temp file per writer, so concurrent processes never share one
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, prefix=".demo_", suffix=".tmp.npz")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, weights=model.weights, demo_r2=model.demo_r2, demo_mae=model.demo_mae)
+            os.replace(tmp, self._file(key))
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self._evict()
+
+    def _evict(self) -> None:
+        files = []
+        for name in os.listdir(self.cache_dir):
+            if name.startswith("demo_") and name.endswith(".npz"):
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    files.append((os.stat(path).st_mtime_ns, path))
+                except FileNotFoundError:
+                    continue
+        files.sort()
+        for _, path in files[:max(0, len(files) - self.max_disk_entries)]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # another process evicted it first
+
+    def get(self, training: TrainingKey, registry: EncodingRegistry = REGISTRY) -> DemoModel:
+        # the default registry keeps the plain training key, so models cached
+        # before per-property encodings stay valid
+        key = training if registry is REGISTRY else (*training, registry.fingerprint)
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                self._models.move_to_end(key)
+                return model
+
+        model = self._load(key)
+        if model is None:
+            model = fit_demo_model(*training, registry=registry)
+            self._save(key, model)
+
+        with self._lock:
+            self._remember(key, model)
+        return model
+
+    def clear(self) -> None:
+        with self._lock:
+            self._models.clear()
+
+
+_CACHE = ModelCache()
+
+
+def train_and_predict_demo_ml(
+    expected_guests: int,
+    occupancy_rate: float,
+    weather: str,
+    day_type: str,
+    event_level: str,
+    baseline_portions: int,
+    seed: int = 42,
+    n_rows: int = DEMO_TRAINING_ROWS,
+    registry: EncodingRegistry = REGISTRY,
+) -> DemoMLResult:
+    key = training_key(
+        expected_guests, occupancy_rate, weather, day_type, event_level, baseline_portions, seed, n_rows
+    )
+    model = _CACHE.get(key, registry)
+    pred_int = predict_portions(model, expected_guests, occupancy_rate, weather, day_type, event_level, registry)
 
     return DemoMLResult(
         ok=True,
         predicted_portions=pred_int,
         note="ML ON (demo-trained on synthetic data)",
-        demo_r2=r2,
-        demo_mae=mae,
+        demo_r2=model.demo_r2,
+        demo_mae=model.demo_mae,
     )
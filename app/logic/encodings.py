@@ -0,0 +1,145 @@
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Categorical inputs (weather, day type, event level, meal) as integer codes
+# plus one factor array per consumer: "demand" for the rules engine
+# (demand_engine) and "ml" for the model features (demo_ml / train_model).
+# Index len(labels) is the "unknown label" slot and holds the default factor.
+#
+# A property can override labels/factors with a JSON file of the form
+#     {"weather": {"labels": [...], "factors": {"demand": [...], "ml": [...]},
+#                  "default": {"demand": 1.0, "ml": 1.0}}, ...}
+# in the property's partition as encodings.json (Property.encodings_path),
+# loaded with load_registry(path).
+
+
+@dataclass
+class Encoding:
+    name: str
+    labels: Tuple[str, ...]
+    factors: Dict[str, np.ndarray]
+    match: str = "exact"  # or "contains": first label found inside the value
+    _codes: Dict[str, int] = field(default_factory=dict, repr=False)
+
+    def __post_init__(self) -> None:
+        self.labels = tuple(self.labels)
+        self._keys = tuple(label.lower() for label in self.labels)
+        self._lock = threading.Lock()
+
+    @property
+    def unknown(self) -> int:
+        return len(self.labels)
+
+    def code(self, value: Any) -> int:
+        value = str(value)
+        code = self._codes.get(value)
+        if code is not None:
+            return code
+        v = value.lower()
+        if self.match == "contains":
+            code = next((i for i, k in enumerate(self._keys) if k in v), self.unknown)
+        else:
+            code = next((i for i, k in enumerate(self._keys) if k == v), self.unknown)
+        with self._lock:
+            self._codes[value] = code
+        return code
+
+    def codes(self, values: Iterable[Any]) -> np.ndarray:
+        arr = np.asarray(values)
+        if arr.dtype.kind in "iu":
+            return np.where((arr >= 0) & (arr < self.unknown), arr, self.unknown).astype(np.intp)
+        flat = arr.reshape(-1).tolist()
+        return np.fromiter((self.code(v) for v in flat), dtype=np.intp, count=len(flat)).reshape(arr.shape)
+
+    def factor(self, kind: str, value: Any) -> float:
+        return float(self.factors[kind][self.code(value)])
+
+    def take(self, kind: str, codes: np.ndarray) -> np.ndarray:
+        return np.take(self.factors[kind], codes)
+
+    def table(self, kind: str) -> Dict[str, float]:
+        return {label: float(f) for label, f in zip(self.labels, self.factors[kind])}
+
+
+def _encoding(name: str, labels: Sequence[str], factors: Dict[str, Sequence[float]],
+              default: Dict[str, float], match: str = "exact") -> Encoding:
+    tables = {}
+    for kind, values in factors.items():
+        if len(values) != len(labels):
+            raise ValueError(f"{name}: {kind} has {len(values)} factors for {len(labels)} labels")
+        tables[kind] = np.array(list(values) + [default.get(kind, 1.0)], dtype=float)
+    return Encoding(name=name, labels=tuple(labels), factors=tables, match=match)
+
+
+DEFAULT_SPEC: Dict[str, Dict[str, Any]] = {
+    "weather": {
+        "labels": ["Sunny", "Cloudy", "Rainy", "Storm"],
+        "factors": {"demand": [1.00, 0.96, 0.88, 0.82], "ml": [1.00, 0.98, 0.92, 0.86]},
+        "default": {"demand": 1.00, "ml": 1.00},
+    },
+    "day_type": {
+        "labels": ["Weekday", "Weekend", "Holiday"],
+        "factors": {"demand": [1.00, 1.08, 1.12], "ml": [1.00, 1.06, 1.10]},
+        "default": {"demand": 1.00, "ml": 1.00},
+    },
+    "event_level": {
+        "labels": ["None", "Medium", "High"],
+        "factors": {"demand": [1.00, 1.07, 1.15], "ml": [1.00, 1.07, 1.15]},
+        "default": {"demand": 1.00, "ml": 1.00},
+    },
+    "meal": {
+        "labels": ["Breakfast", "Lunch"],
+        "factors": {"demand": [0.95, 0.97]},
+        "default": {"demand": 0.98},
+        "match": "contains",
+    },
+}
+
+
+class EncodingRegistry:
+    def __init__(self, spec: Dict[str, Dict[str, Any]]):
+        self.spec = spec
+        # identifies the factors in cache keys (e.g. demo_ml's model cache)
+        self.fingerprint = hashlib.sha1(json.dumps(spec, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+        self._encodings = {
+            name: _encoding(name, s["labels"], s["factors"], s.get("default", {}), s.get("match", "exact"))
+            for name, s in spec.items()
+        }
+
+    def __getitem__(self, name: str) -> Encoding:
+        return self._encodings[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._encodings
+
+
+REGISTRY = EncodingRegistry(DEFAULT_SPEC)
+
+_LOADED: Dict[str, Tuple[float, EncodingRegistry]] = {}
+_LOADED_LOCK = threading.Lock()
+
+
+def load_registry(path: Optional[str]) -> EncodingRegistry:
+    # per-property overrides on top of DEFAULT_SPEC; cached on file mtime
+    if not path or not os.path.exists(path):
+        return REGISTRY
+    mtime = os.path.getmtime(path)
+    with _LOADED_LOCK:
+        hit = _LOADED.get(path)
+        if hit is not None and hit[0] == mtime:
+            return hit[1]
+    with open(path, "r", encoding="utf-8") as f:
+        overrides = json.load(f)
+    spec = {name: dict(s) for name, s in DEFAULT_SPEC.items()}
+    for name, s in overrides.items():
+        spec[name] = {**spec.get(name, {}), **s}
+    registry = EncodingRegistry(spec)
+    with _LOADED_LOCK:
+        _LOADED[path] = (mtime, registry)
+    return registry
@@ -0,0 +1,313 @@
+import atexit
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO
+
+from logic.event_summary import event_day, is_day, validate_day
+from logic.file_lock import lock_for
+
+# Append-only JSONL storage: one segment file per day under "<stem>.log/",
+# one event per line. The legacy "<stem>.json" array is folded into the
+# segments by compact() and then left as an empty array. All mutations run
+# under "<stem>.lock" so several processes can share one log.
+
+FSYNC_EVERY = 32
+FSYNC_INTERVAL_S = 1.0
+
+
+def segments_dir(path: str) -> str:
+    stem, _ = os.path.splitext(path)
+    return stem + ".log"
+
+
+def lock_path(path: str) -> str:
+    stem, _ = os.path.splitext(path)
+    return stem + ".lock"
+
+
+def _encode(event: Dict[str, Any]) -> str:
+    return json.dumps(event, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def _parse_lines(f: TextIO) -> Iterator[Dict[str, Any]]:
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            # torn write from a crash (or one still in flight): skipped,
+            # and the next append to the segment starts a fresh line
+            continue
+
+
+def _iter_lines(seg_path: str) -> Iterator[Dict[str, Any]]:
+    with open(seg_path, "r", encoding="utf-8") as f:
+        yield from _parse_lines(f)
+
+
+def _read_lines(seg_path: str) -> List[Dict[str, Any]]:
+    return list(_iter_lines(seg_path))
+
+
+def _ends_without_newline(seg_path: str) -> bool:
+    if not os.path.exists(seg_path) or os.path.getsize(seg_path) == 0:
+        return False
+    with open(seg_path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) != b"\n"
+
+
+def _atomic_write(path: str, text: str) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class EventLog:
+    def __init__(self, path: str, fsync_every: int = FSYNC_EVERY, fsync_interval_s: float = FSYNC_INTERVAL_S):
+        self.path = path
+        self.dir = segments_dir(path)
+        self.fsync_every = fsync_every
+        self.fsync_interval_s = fsync_interval_s
+        self._lock = lock_for(lock_path(path))
+        self._handle: Optional[TextIO] = None
+        self._handle_day: Optional[str] = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._ready = False
+
+    def segment_path(self, day: str) -> str:
+        return os.path.join(self.dir, f"{validate_day(day)}.jsonl")
+
+    def days(self) -> List[str]:
+        self._ensure()
+        return sorted(n[:-6] for n in os.listdir(self.dir) if n.endswith(".jsonl") and is_day(n[:-6]))
+
+    def read_all(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._flush_handle()
+            events: List[Dict[str, Any]] = []
+            for day in self.days():
+                events.extend(_read_lines(self.segment_path(day)))
+            return events
+
+    def read_day(self, day: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._ensure()
+            if self._handle_day == day:
+                self._flush_handle()
+            seg = self.segment_path(day)
+            if not os.path.exists(seg):
+                return []
+            return _read_lines(seg)
+
+    def read_range(self, since: Optional[str] = None, until: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._flush_handle()
+            events: List[Dict[str, Any]] = []
+            for day in self.days():
+                if (since is not None and day < since) or (until is not None and day > until):
+                    continue
+                events.extend(_read_lines(self.segment_path(day)))
+            return events
+
+    def iter_range(self, since: Optional[str] = None, until: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        # streams one line at a time; the lock is only held to list segments,
+        # so a segment deleted (delete_day, archiving) after that is skipped
+        with self._lock:
+            self._flush_handle()
+            days = [
+                d for d in self.days()
+                if (since is None or d >= since) and (until is None or d <= until)
+            ]
+        for day in days:
+            try:
+                f = open(self.segment_path(day), "r", encoding="utf-8")
+            except FileNotFoundError:
+                continue
+            with f:
+                yield from _parse_lines(f)
+
+    def read_recent(self, limit: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._flush_handle()
+            out: List[Dict[str, Any]] = []
+            for day in reversed(self.days()):
+                out = _read_lines(self.segment_path(day)) + out
+                if len(out) >= limit:
+                    break
+            return out[-limit:] if limit > 0 else []
+
+    def version(self, since: Optional[str] = None, until: Optional[str] = None) -> tuple:
+        # cheap change token: stat of the segments in range
+        with self._lock:
+            self._flush_handle()
+            sig = []
+            for day in self.days():
+                if (since is not None and day < since) or (until is not None and day > until):
+                    continue
+                st = os.stat(self.segment_path(day))
+                sig.append((day, st.st_mtime_ns, st.st_size))
+            return tuple(sig)
+
+    def delete_day(self, day: str) -> None:
+        with self._lock:
+            self._ensure()
+            if self._handle_day == day:
+                self._close_handle()
+            seg = self.segment_path(day)
+            if os.path.exists(seg):
+                os.remove(seg)
+
+    def append(self, event: Dict[str, Any]) -> None:
+        self.append_many([event])
+
+    def append_many(self, events: Iterable[Dict[str, Any]]) -> None:
+        by_day: Dict[str, List[str]] = {}
+        for event in events:
+            by_day.setdefault(event_day(event), []).append(_encode(event))
+
+        with self._lock:
+            self._ensure()
+            # current segment last, so the common case keeps its handle open
+            for day in sorted(by_day, key=lambda d: d == self._handle_day):
+                self._rotate(day).write("".join(by_day[day]))
+                self._unsynced += len(by_day[day])
+            self._flush_handle()
+            self._maybe_sync()
+
+    def rewrite(self, events: Iterable[Dict[str, Any]]) -> None:
+        by_day: Dict[str, List[Dict[str, Any]]] = {}
+        for event in events:
+            by_day.setdefault(event_day(event), []).append(event)
+
+        with self._lock:
+            self._ensure()
+            self._close_handle()
+            for day, day_events in by_day.items():
+                _atomic_write(self.segment_path(day), "".join(_encode(e) for e in day_events))
+            for day in self.days():
+                if day not in by_day:
+                    os.remove(self.segment_path(day))
+
+    def compact(self) -> None:
+        with self._lock:
+            self._ensure()
+            self._close_handle()
+            legacy = self._read_legacy()
+
+            by_day: Dict[str, List[Dict[str, Any]]] = {}
+            for event in legacy:
+                by_day.setdefault(event_day(event), []).append(event)
+
+            for day in sorted(set(self.days()) | set(by_day)):
+                seg = self.segment_path(day)
+                existing = _read_lines(seg) if os.path.exists(seg) else []
+                merged = by_day.get(day, []) + existing
+                if not merged:
+                    os.remove(seg)
+                    continue
+                if day in by_day or self._needs_repair(seg, len(existing)):
+                    _atomic_write(seg, "".join(_encode(e) for e in merged))
+
+            if legacy:
+                _atomic_write(self.path, "[]")
+
+    def sync(self) -> None:
+        with self._lock:
+            if self._handle is not None:
+                self._handle.flush()
+                os.fsync(self._handle.fileno())
+            self._unsynced = 0
+            self._last_sync = time.monotonic()
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_handle()
+
+    def _ensure(self) -> None:
+        if self._ready:
+            return
+        os.makedirs(self.dir, exist_ok=True)
+        if not os.path.exists(self.path):
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump([], f)
+        self._ready = True
+        if self._read_legacy():
+            self.compact()
+
+    def _read_legacy(self) -> List[Dict[str, Any]]:
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, list) else []
+
+    def _needs_repair(self, seg_path: str, n_valid: int) -> bool:
+        with open(seg_path, "r", encoding="utf-8") as f:
+            n_lines = sum(1 for line in f if line.strip())
+        return n_lines != n_valid
+
+    def _rotate(self, day: str) -> TextIO:
+        if self._handle is not None and self._handle_day == day and self._handle_is_stale():
+            self._close_handle()
+        if self._handle is None or self._handle_day != day:
+            self._close_handle()
+            seg = self.segment_path(day)
+            torn = _ends_without_newline(seg)
+            self._handle = open(seg, "a", encoding="utf-8")
+            self._handle_day = day
+            if torn:
+                self._handle.write("\n")
+        return self._handle
+
+    def _handle_is_stale(self) -> bool:
+        # another process deleted or replaced the segment since we opened it
+        try:
+            on_disk = os.stat(self.segment_path(self._handle_day))
+        except FileNotFoundError:
+            return True
+        return os.fstat(self._handle.fileno()).st_ino != on_disk.st_ino
+
+    def _flush_handle(self) -> None:
+        if self._handle is not None:
+            self._handle.flush()
+
+    def _maybe_sync(self) -> None:
+        if self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval_s:
+            self.sync()
+
+    def _close_handle(self) -> None:
+        if self._handle is not None:
+            self._handle.flush()
+            if self._unsynced:
+                os.fsync(self._handle.fileno())
+            self._handle.close()
+        self._handle = None
+        self._handle_day = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+
+_LOGS: Dict[str, EventLog] = {}
+_LOGS_LOCK = threading.Lock()
+
+
+def get_log(path: str) -> EventLog:
+    key = os.path.abspath(path)
+    with _LOGS_LOCK:
+        log = _LOGS.get(key)
+        if log is None:
+            log = _LOGS[key] = EventLog(path)
+        return log
+
+
+@atexit.register
+def _close_all() -> None:
+    for log in list(_LOGS.values()):
+        log.close()
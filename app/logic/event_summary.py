@@ -0,0 +1,154 @@
+import json
+import os
+import re
+from dataclasses import asdict, dataclass, field
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional
+
+
+_DAY_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+def is_day(day: str) -> bool:
+    return bool(_DAY_RE.match(day))
+
+
+def validate_day(day: str) -> str:
+    # days name segment files and partitions, so nothing but YYYY-MM-DD
+    if not is_day(day):
+        raise ValueError(f"Invalid day: {day!r} (expected YYYY-MM-DD)")
+    date.fromisoformat(day)
+    return day
+
+
+def event_day(event: Dict[str, Any]) -> str:
+    ts = str(event.get("timestamp") or "")
+    if not ts:
+        return date.today().isoformat()
+    return validate_day(ts[:10])
+
+
+@dataclass
+class EventSummary:
+    count: int = 0
+    total_kg: float = 0.0
+    wrong_bin_kg: float = 0.0
+    kg_by_item: Dict[str, float] = field(default_factory=dict)
+
+    def add(self, event: Dict[str, Any]) -> None:
+        kg = float(event.get("weight_kg", 0.0) or 0.0)
+        self.count += 1
+        self.total_kg += kg
+        if event.get("is_correct_bin") is False:
+            self.wrong_bin_kg += kg
+        item = event.get("item")
+        if item is not None:
+            self.kg_by_item[item] = self.kg_by_item.get(item, 0.0) + kg
+
+    def merge(self, other: "EventSummary") -> None:
+        self.count += other.count
+        self.total_kg += other.total_kg
+        self.wrong_bin_kg += other.wrong_bin_kg
+        for item, kg in other.kg_by_item.items():
+            self.kg_by_item[item] = self.kg_by_item.get(item, 0.0) + kg
+
+
+def summarize(events: Iterable[Dict[str, Any]]) -> EventSummary:
+    s = EventSummary()
+    for e in events:
+        s.add(e)
+    return s
+
+
+class SummaryIndex:
+    # Running per-day aggregates of an event log, kept in a small sidecar
+    # file ("<stem>.summary.json") and updated on every committed batch, so
+    # dashboard totals cost O(days) no matter how many events there are.
+
+    # Days rolled into the Parquet archive keep their totals in `archived`;
+    # late events for such a day still land in `days`, and a day's total is
+    # the sum of both.
+
+    def __init__(
+        self,
+        days: Optional[Dict[str, EventSummary]] = None,
+        archived: Optional[Dict[str, EventSummary]] = None,
+    ):
+        self.days: Dict[str, EventSummary] = days or {}
+        self.archived: Dict[str, EventSummary] = archived or {}
+
+    def apply(self, events: Iterable[Dict[str, Any]]) -> None:
+        for e in events:
+            day = event_day(e)
+            s = self.days.get(day)
+            if s is None:
+                s = self.days[day] = EventSummary()
+            s.add(e)
+
+    def apply_archived(self, events: Iterable[Dict[str, Any]]) -> None:
+        for e in events:
+            day = event_day(e)
+            s = self.archived.get(day)
+            if s is None:
+                s = self.archived[day] = EventSummary()
+            s.add(e)
+
+    def drop_day(self, day: str) -> None:
+        # the live part only; an archived day keeps its archived totals
+        self.days.pop(day, None)
+
+    def archive_day(self, day: str) -> None:
+        s = self.days.pop(day, None)
+        if s is not None:
+            self.archived.setdefault(day, EventSummary()).merge(s)
+
+    def all_days(self) -> List[str]:
+        return sorted(set(self.days) | set(self.archived))
+
+    def day(self, day: str) -> EventSummary:
+        return self.total(day, day)
+
+    def total(self, since: Optional[str] = None, until: Optional[str] = None) -> EventSummary:
+        out = EventSummary()
+        for part in (self.archived, self.days):
+            for day, s in part.items():
+                if (since is None or day >= since) and (until is None or day <= until):
+                    out.merge(s)
+        return out
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "days": {day: asdict(s) for day, s in sorted(self.days.items())},
+            "archived": {day: asdict(s) for day, s in sorted(self.archived.items())},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SummaryIndex":
+        return cls(
+            {day: EventSummary(**s) for day, s in data.get("days", {}).items()},
+            {day: EventSummary(**s) for day, s in data.get("archived", {}).items()},
+        )
+
+
+def summary_path(path: str) -> str:
+    stem, _ = os.path.splitext(path)
+    return stem + ".summary.json"
+
+
+def read_index(path: str) -> Optional[SummaryIndex]:
+    sidecar = summary_path(path)
+    if not os.path.exists(sidecar):
+        return None
+    try:
+        with open(sidecar, "r", encoding="utf-8") as f:
+            return SummaryIndex.from_dict(json.load(f))
+    except (OSError, ValueError, TypeError):
+        return None
+
+
+def write_index(path: str, index: SummaryIndex) -> None:
+    sidecar = summary_path(path)
+    tmp = sidecar + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index.to_dict(), f, separators=(",", ":"))
+    os.replace(tmp, sidecar)
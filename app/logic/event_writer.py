@@ -0,0 +1,99 @@
+import atexit
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Single writer thread for bin_storage. Streamlit runs each session in its own
+# thread; appends from all of them are queued here and committed in batches,
+# one commit(path, events) call per path per batch, so a burst of "Save"
+# clicks costs one locked write + fsync instead of one each.
+
+MAX_BATCH = 512
+# no artificial wait by default: under load, batches form from whatever
+# queued up while the previous commit was running
+LINGER_S = 0.0
+
+_Job = Tuple[str, List[Dict[str, Any]], Future]
+
+
+class EventWriter:
+    def __init__(
+        self,
+        commit: Callable[[str, List[Dict[str, Any]]], None],
+        max_batch: int = MAX_BATCH,
+        linger_s: float = LINGER_S,
+    ):
+        self.commit = commit
+        self.max_batch = max_batch
+        self.linger_s = linger_s
+        self._queue: "queue.Queue[_Job]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, path: str, events: List[Dict[str, Any]]) -> Future:
+        fut: Future = Future()
+        self._ensure_started()
+        self._queue.put((path, list(events), fut))
+        return fut
+
+    def write(self, path: str, events: List[Dict[str, Any]]) -> None:
+        self.submit(path, events).result()
+
+    def flush(self) -> None:
+        self._queue.join()
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="bin-storage-writer", daemon=True)
+                self._thread.start()
+
+    def _drain(self) -> List[_Job]:
+        jobs = [self._queue.get()]
+        n = len(jobs[0][1])
+        deadline = time.monotonic() + self.linger_s
+        while n < self.max_batch:
+            timeout = deadline - time.monotonic()
+            try:
+                job = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            jobs.append(job)
+            n += len(job[1])
+        return jobs
+
+    def _run(self) -> None:
+        while True:
+            jobs = self._drain()
+            by_path: Dict[str, List[_Job]] = {}
+            for job in jobs:
+                by_path.setdefault(job[0], []).append(job)
+
+            for path, path_jobs in by_path.items():
+                batch = [e for _, events, _ in path_jobs for e in events]
+                try:
+                    self.commit(path, batch)
+                except BaseException as exc:
+                    for _, _, fut in path_jobs:
+                        fut.set_exception(exc)
+                else:
+                    for _, _, fut in path_jobs:
+                        fut.set_result(None)
+
+            for _ in jobs:
+                self._queue.task_done()
+
+
+def _flush_on_exit(writer: EventWriter) -> None:
+    if writer._thread is not None and writer._thread.is_alive():
+        writer.flush()
+
+
+def start_writer(commit: Callable[[str, List[Dict[str, Any]]], None]) -> EventWriter:
+    writer = EventWriter(commit)
+    atexit.register(_flush_on_exit, writer)
+    return writer
@@ -1,84 +1,82 @@
 import os
-import random
 from datetime import date, timedelta
 import csv
 
+import numpy as np
+
 WEATHER = ["Sunny", "Cloudy", "Rainy", "Storm"]
 DAY_TYPE = ["Weekday", "Weekend", "Holiday"]
 EVENT = ["None", "Medium", "High"]
 
-def clamp(x, lo, hi):
-    return max(lo, min(hi, x))
+WEATHER_P = [0.45, 0.30, 0.20, 0.05]
+EVENT_P = [0.70, 0.22, 0.08]
+
+
+def generate_arrays(days=60, seed=42, start=None):
+    # Column-wise version of the old day-by-day loop. One numpy Generator per
+    # seed, fixed draw order: same (days, seed, start) -> same arrays.
+    rng = np.random.default_rng(seed)
+    if start is None:
+        start = date.today() - timedelta(days=days-1)
+    dates = np.datetime64(start.isoformat(), "D") + np.arange(days)
+
+    weekday = (dates.astype("int64") + 3) % 7  # 1970-01-01 was a Thursday
+    day_code = np.where(weekday >= 5, 1, 0)
+    # sometimes mark a holiday
+    day_code = np.where(rng.random(days) < 0.06, 2, day_code)
+
+    weather_code = rng.choice(len(WEATHER), size=days, p=WEATHER_P)
+    event_code = rng.choice(len(EVENT), size=days, p=EVENT_P)
+
+    is_weekend = day_code == 1
+    is_holiday = day_code == 2
+    is_high = event_code == 2
+
+    # occupancy
+    base_occ = rng.uniform(0.45, 0.95, days)
+    base_occ += np.where(is_weekend | is_holiday, rng.uniform(0.05, 0.12, days), 0.0)
+    base_occ += np.where(is_high, rng.uniform(0.05, 0.10, days), 0.0)
+    occupancy_rate = np.clip(base_occ, 0.30, 0.98)
+
+    # expected guests (roughly proportional)
+    expected_guests = np.maximum(0, np.round(120 + occupancy_rate * 320 + rng.uniform(-30, 30, days)))
+
+    # baseline: kitchens tend to overproduce
+    # demand factor
+    day_factor = 1.0 + 0.08 * is_weekend + 0.12 * is_holiday
+    event_factor = 1.0 + 0.06 * (event_code == 1) + 0.12 * is_high
+    weather_factor = 1.0 - 0.04 * (weather_code == 2) - 0.08 * (weather_code == 3)
+
+    true_need = np.maximum(10, np.round(expected_guests * 0.85 * day_factor * event_factor * weather_factor))
+
+    baseline_portions = np.maximum(10, np.round(true_need * (1.12 + rng.uniform(-0.03, 0.05, days))))  # ~12% over
+
+    # recommended: closer to true need, with small safety buffer
+    recommended_portions = np.maximum(10, np.round(true_need * (1.03 + rng.uniform(-0.02, 0.03, days))))
+
+    # actual: sometimes follows recommendation, sometimes not
+    follows = rng.random(days) < 0.72
+    drift = np.where(follows, rng.uniform(-0.02, 0.03, days), rng.uniform(0.04, 0.12, days))
+    actual_cooked = np.maximum(10, np.round(recommended_portions * (1 + drift)))
+
+    return {
+        "date": dates,
+        "expected_guests": expected_guests.astype(int),
+        "occupancy_rate": np.round(occupancy_rate, 2),
+        "weather": np.array(WEATHER)[weather_code],
+        "day_type": np.array(DAY_TYPE)[day_code],
+        "event_level": np.array(EVENT)[event_code],
+        "baseline_portions": baseline_portions.astype(int),
+        "recommended_portions": recommended_portions.astype(int),
+        "actual_cooked": actual_cooked.astype(int),
+    }
 
-def pick_day_type(d: date) -> str:
-    if d.weekday() in (5, 6):  # Sat/Sun
-        return "Weekend"
-    return "Weekday"
 
 def generate_rows(days=60, seed=42):
-    rng = random.Random(seed)
-    rows = []
-    start = date.today() - timedelta(days=days-1)
-
-    for i in range(days):
-        d = start + timedelta(days=i)
-        day_type = pick_day_type(d)
-
-        # sometimes mark a holiday
-        if rng.random() < 0.06:
-            day_type = "Holiday"
-
-        weather = rng.choices(WEATHER, weights=[0.45, 0.30, 0.20, 0.05])[0]
-        event_level = rng.choices(EVENT, weights=[0.70, 0.22, 0.08])[0]
-
-        # occupancy
-        base_occ = rng.uniform(0.45, 0.95)
-        if day_type in ("Weekend", "Holiday"):
-            base_occ += rng.uniform(0.05, 0.12)
-        if event_level == "High":
-            base_occ += rng.uniform(0.05, 0.10)
-        occupancy_rate = clamp(base_occ, 0.30, 0.98)
-
-        # expected guests (roughly proportional)
-        expected_guests = int(round(120 + occupancy_rate * 320 + rng.uniform(-30, 30)))
-        expected_guests = max(0, expected_guests)
-
-        # baseline: kitchens tend to overproduce
-        # demand factor
-        day_factor = 1.0 + (0.08 if day_type == "Weekend" else 0.0) + (0.12 if day_type == "Holiday" else 0.0)
-        event_factor = 1.0 + (0.06 if event_level == "Medium" else 0.0) + (0.12 if event_level == "High" else 0.0)
-        weather_factor = 1.0 - (0.04 if weather == "Rainy" else 0.0) - (0.08 if weather == "Storm" else 0.0)
-
-        true_need = int(round(expected_guests * 0.85 * day_factor * event_factor * weather_factor))
-        true_need = max(10, true_need)
-
-        baseline_portions = int(round(true_need * (1.12 + rng.uniform(-0.03, 0.05))))  # ~12% over
-        baseline_portions = max(10, baseline_portions)
-
-        # recommended: closer to true need, with small safety buffer
-        recommended_portions = int(round(true_need * (1.03 + rng.uniform(-0.02, 0.03))))
-        recommended_portions = max(10, recommended_portions)
-
-        # actual: sometimes follows recommendation, sometimes not
-        if rng.random() < 0.72:
-            actual_cooked = int(round(recommended_portions * (1 + rng.uniform(-0.02, 0.03))))
-        else:
-            actual_cooked = int(round(recommended_portions * (1 + rng.uniform(0.04, 0.12))))
-        actual_cooked = max(10, actual_cooked)
-
-        rows.append({
-            "date": d.isoformat(),
-            "expected_guests": expected_guests,
-            "occupancy_rate": round(occupancy_rate, 2),
-            "weather": weather,
-            "day_type": day_type,
-            "event_level": event_level,
-            "baseline_portions": baseline_portions,
-            "recommended_portions": recommended_portions,
-            "actual_cooked": actual_cooked,
-        })
-
-    return rows
+    cols = generate_arrays(days=days, seed=seed)
+    cols["date"] = cols["date"].astype(str)
+    names = list(cols.keys())
+    return [dict(zip(names, values)) for values in zip(*(cols[n].tolist() for n in names))]
 
 def main():
     base_dir = os.path.join(os.path.dirname(__file__), "app", "data")
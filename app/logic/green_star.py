@@ -30,3 +30,13 @@ def evaluate_green_star(
         reason = "Green Star not active yet: increase reduction and/or maintain consistent usage."
 
     return GreenStarResult(is_active=is_active, score=score, reason=reason)
+
+
+def next_streak(streak: int, day_status: str) -> int:
+    # End-of-Day outcome: COUNTED extends the streak, NEUTRAL keeps it, anything else resets it
+    if day_status == "COUNTED":
+        return int(streak) + 1
+    if day_status == "NEUTRAL":
+        return int(streak)
+    return 0
+
@@ -0,0 +1,308 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from logic.bin_storage import append_events, now_iso
+from logic.file_lock import lock_for
+from logic.routing_rules import evaluate_events
+from logic.smart_bin import classify_batch
+
+# asyncio ingestion for continuous Smart Bin readings (camera + scale).
+# Producers await submit(); the bounded queue is the backpressure: when the
+# writers fall behind, submit() waits (or try_submit() refuses) instead of
+# buffering without limit. Worker tasks pull micro-batches (up to
+# batch_size readings, or whatever arrived within linger_s), classify each
+# batch with one classify_batch call in a thread, evaluate it, and append
+# each property's events in one bin_storage call. A failed write is
+# retried; readings that still can't be stored are logged and appended to
+# a dead-letter JSONL file, from which replay_dead_letters() re-ingests them.
+
+log = logging.getLogger(__name__)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
+DEAD_LETTER_PATH = os.path.join(DATA_DIR, "ingest_dead_letter.jsonl")
+QUEUE_SIZE = 10000
+BATCH_SIZE = 256
+LINGER_S = 0.05
+WORKERS = 2
+RETRIES = 2
+RETRY_BACKOFF_S = 0.1
+
+
+@dataclass
+class Reading:
+    bin_id: str
+    events_path: str
+    item: str
+    bin_used: str
+    weight_kg: float
+    timestamp: Optional[str] = None
+
+
+@dataclass
+class IngestStats:
+    received: int = 0
+    written: int = 0
+    dropped: int = 0
+    failed: int = 0
+    batches: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+
+    def rate(self) -> float:
+        elapsed = time.monotonic() - self.started_at
+        return self.written / elapsed if elapsed > 0 else 0.0
+
+
+def readings_to_events(readings: List[Reading]) -> List[Dict[str, Any]]:
+    pred, conf = classify_batch([r.item for r in readings])
+    timestamps = [r.timestamp or now_iso() for r in readings]
+    required, correct = evaluate_events(pred.tolist(), [r.bin_used for r in readings], [t[:10] for t in timestamps])
+    return [
+        {
+            "timestamp": timestamps[i],
+            "item": pred_item,
+            "confidence": c,
+            "weight_kg": float(r.weight_kg),
+            "bin_used": r.bin_used,
+            "recommended_bin": required[i],
+            "is_correct_bin": correct[i],
+            "bin_id": r.bin_id,
+        }
+        for i, (r, pred_item, c) in enumerate(zip(readings, pred.tolist(), conf.tolist()))
+    ]
+
+
+def process_batch(
+    readings: List[Reading],
+    write: Callable[[str, List[Dict[str, Any]]], None] = append_events,
+    retries: int = RETRIES,
+    backoff_s: float = RETRY_BACKOFF_S,
+) -> Tuple[int, List[Reading]]:
+    # (written, failed): each path is written on its own and retried, so a
+    # failing property log doesn't take the others' readings with it, and a
+    # retry never duplicates a path that was already written
+    by_path: Dict[str, List[Tuple[Reading, Dict[str, Any]]]] = {}
+    for r, event in zip(readings, readings_to_events(readings)):
+        by_path.setdefault(r.events_path, []).append((r, event))
+    written, failed = 0, []
+    for path, rows in by_path.items():
+        for attempt in range(retries + 1):
+            try:
+                write(path, [e for _, e in rows])
+            except Exception:
+                if attempt == retries:
+                    log.exception("ingest: giving up on %d reading(s) for %s", len(rows), path)
+                    failed.extend(r for r, _ in rows)
+                else:
+                    time.sleep(backoff_s * 2 ** attempt)
+            else:
+                written += len(rows)
+                break
+    return written, failed
+
+
+def dead_letter(path: str, readings: List[Reading], error: str) -> None:
+    failed_at = now_iso()
+    lines = "".join(
+        json.dumps({**asdict(r), "error": error, "failed_at": failed_at}, ensure_ascii=False) + "\n"
+        for r in readings
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with lock_for(os.path.splitext(path)[0] + ".lock"):
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+
+def replay_dead_letters(
+    path: str = DEAD_LETTER_PATH,
+    write: Callable[[str, List[Dict[str, Any]]], None] = append_events,
+) -> Tuple[int, int]:
+    # (replayed, still failing). The file is only rewritten, with the
+    # readings that failed again, once the replay is done, so a crash
+    # mid-replay can duplicate readings but never lose them.
+    fields = set(Reading.__dataclass_fields__)
+    with lock_for(os.path.splitext(path)[0] + ".lock"):
+        if not os.path.exists(path):
+            return 0, 0
+        with open(path, "r", encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        written, failed = 0, []
+        for i in range(0, len(rows), BATCH_SIZE):
+            chunk = rows[i:i + BATCH_SIZE]
+            batch = [Reading(**{k: v for k, v in row.items() if k in fields}) for row in chunk]
+            try:
+                n, bad = process_batch(batch, write)
+            except Exception:
+                log.exception("ingest: replay of %d reading(s) failed", len(batch))
+                n, bad = 0, batch
+            written += n
+            bad_ids = {id(r) for r in bad}
+            failed.extend(row for row, r in zip(chunk, batch) if id(r) in bad_ids)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(row, ensure_ascii=False) + "\n" for row in failed)
+        os.replace(tmp, path)
+    return written, len(failed)
+
+
+class IngestPipeline:
+    def __init__(
+        self,
+        queue_size: int = QUEUE_SIZE,
+        batch_size: int = BATCH_SIZE,
+        linger_s: float = LINGER_S,
+        workers: int = WORKERS,
+        write: Callable[[str, List[Dict[str, Any]]], None] = append_events,
+        dead_letter_path: str = DEAD_LETTER_PATH,
+    ):
+        self.batch_size = batch_size
+        self.linger_s = linger_s
+        self.workers = workers
+        self.write = write
+        self.dead_letter_path = dead_letter_path
+        self.stats = IngestStats()
+        self._queue: Optional["asyncio.Queue[Reading]"] = None
+        self._queue_size = queue_size
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self) -> "IngestPipeline":
+        # the queue is created here so it binds to the running loop
+        self._queue = asyncio.Queue(maxsize=self._queue_size)
+        self.stats = IngestStats()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        return self
+
+    async def submit(self, reading: Reading) -> None:
+        await self._queue.put(reading)
+        self.stats.received += 1
+
+    def try_submit(self, reading: Reading) -> bool:
+        try:
+            self._queue.put_nowait(reading)
+        except asyncio.QueueFull:
+            self.stats.dropped += 1
+            return False
+        self.stats.received += 1
+        return True
+
+    def backlog(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def drain(self) -> None:
+        await self._queue.join()
+
+    async def stop(self) -> None:
+        await self.drain()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _next_batch(self) -> List[Reading]:
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.linger_s
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+        return batch
+
+    async def _worker(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            try:
+                try:
+                    n, failed = await asyncio.to_thread(process_batch, batch, self.write)
+                    error = "write failed after retries"
+                except Exception as exc:
+                    log.exception("ingest: batch of %d reading(s) failed", len(batch))
+                    n, failed, error = 0, batch, repr(exc)
+                self.stats.written += n
+                self.stats.batches += 1
+                if failed:
+                    self.stats.failed += len(failed)
+                    await asyncio.to_thread(dead_letter, self.dead_letter_path, failed, error)
+            except Exception:
+                # not even the dead-letter file could be written
+                log.exception("ingest: lost %d reading(s)", len(batch))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+
+async def simulate(
+    source_path: str,
+    events_path: str,
+    rate: float = 500.0,
+    bins: int = 8,
+    duration_s: float = 10.0,
+    pipeline: Optional[IngestPipeline] = None,
+) -> IngestStats:
+    # replay bin_events.json-shaped events as readings from `bins` bins at
+    # roughly `rate` readings/s in total (0 = as fast as the pipeline takes them)
+    from logic.bin_storage import load_events
+
+    source = load_events(source_path) or [{"item": "Rice", "bin_used": "Compost", "weight_kg": 0.25}]
+    pipeline = pipeline or IngestPipeline()
+    await pipeline.start()
+
+    async def produce(bin_no: int) -> None:
+        interval = bins / rate if rate > 0 else 0.0
+        start = time.monotonic()
+        i = bin_no
+        n = 0
+        while time.monotonic() - start < duration_s:
+            e = source[i % len(source)]
+            await pipeline.submit(Reading(
+                bin_id=f"bin-{bin_no:02d}",
+                events_path=events_path,
+                item=str(e.get("item", "Rice")),
+                bin_used=str(e.get("bin_used", "Compost")),
+                weight_kg=float(e.get("weight_kg", 0.25)),
+            ))
+            i += bins
+            n += 1
+            delay = start + n * interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            elif n % 64 == 0:
+                await asyncio.sleep(0)
+
+    await asyncio.gather(*(produce(b) for b in range(bins)))
+    await pipeline.stop()
+    return pipeline.stats
+
+
+def main():
+    # run from app/: python -m logic.ingest [rate] [bins] [seconds] [target.json]
+    #            or: python -m logic.ingest replay [dead_letter.jsonl]
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == "replay":
+        written, failed = replay_dead_letters(sys.argv[2] if len(sys.argv) > 2 else DEAD_LETTER_PATH)
+        print(f"replayed={written} still_failing={failed}")
+        return
+    rate = float(sys.argv[1]) if len(sys.argv) > 1 else 500.0
+    bins = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 10.0
+    target = sys.argv[4] if len(sys.argv) > 4 else os.path.join(DATA_DIR, "simulated_bin_events.json")
+    stats = asyncio.run(simulate(os.path.join(DATA_DIR, "bin_events.json"), target, rate, bins, seconds))
+    print(
+        f"received={stats.received} written={stats.written} failed={stats.failed} "
+        f"batches={stats.batches} rate={stats.rate():.0f}/s -> {target}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from logic.pickups import ACCEPTED, REQUESTED, open_requests
+from logic.properties import REGISTRY as PROPERTIES, PropertyRegistry, map_properties
+from logic.recycler import Assignment, PartnerIndex, get_partner_index, schedule_requests
+
+# Consolidated multi-stop pickup runs. Open recycler requests are grouped by
+# (partner, day, ETA window); each group becomes one run that starts and ends
+# at the partner depot and visits every property with a request once, in an
+# order found by nearest neighbour + 2-opt over a haversine distance matrix.
+# Both steps are vectorized per row, so a few hundred stops take well under
+# a second on one core. plan_pickups() is the end-to-end path: ACCEPTED
+# requests keep their partner and count against its daily capacity,
+# REQUESTED ones are assigned by recycler.schedule_requests, and the runs are
+# built from those assignments.
+
+EARTH_RADIUS_KM = 6371.0
+MAX_2OPT_PASSES = 50
+
+
+@dataclass
+class PickupRun:
+    partner_id: str
+    day: str
+    eta_window: str
+    stops: List[str]
+    requests: List[Dict[str, Any]]
+    total_kg: float
+    distance_km: float
+    unlocated: List[str] = field(default_factory=list)
+
+
+def distance_matrix(coords: np.ndarray) -> np.ndarray:
+    # coords: (n, 2) lat/lon in degrees -> (n, n) great-circle km
+    lat = np.radians(coords[:, 0])[:, None]
+    lon = np.radians(coords[:, 1])[:, None]
+    dlat = lat - lat.T
+    dlon = lon - lon.T
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat) * np.cos(lat.T) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def nearest_neighbour(dist: np.ndarray, start: int = 0) -> np.ndarray:
+    n = len(dist)
+    tour = np.empty(n, dtype=np.intp)
+    visited = np.zeros(n, dtype=bool)
+    tour[0] = start
+    visited[start] = True
+    for k in range(1, n):
+        row = np.where(visited, np.inf, dist[tour[k - 1]])
+        tour[k] = int(np.argmin(row))
+        visited[tour[k]] = True
+    return tour
+
+
+def two_opt(tour: np.ndarray, dist: np.ndarray, max_passes: int = MAX_2OPT_PASSES) -> np.ndarray:
+    # closed tour with tour[0] (the depot) fixed; for each i, every j is
+    # scored at once and the best improving reversal of tour[i..j] applied
+    tour = np.array(tour, dtype=np.intp)
+    n = len(tour)
+    if n < 4:
+        return tour
+    for _ in range(max_passes):
+        improved = False
+        for i in range(1, n - 1):
+            a, b = tour[i - 1], tour[i]
+            js = np.arange(i + 1, n)
+            c = tour[js]
+            d = tour[(js + 1) % n]
+            delta = dist[a, c] + dist[b, d] - dist[a, b] - dist[c, d]
+            k = int(np.argmin(delta))
+            if delta[k] < -1e-9:
+                j = js[k]
+                tour[i:j + 1] = tour[i:j + 1][::-1].copy()
+                improved = True
+        if not improved:
+            break
+    return tour
+
+
+def tour_length(tour: np.ndarray, dist: np.ndarray) -> float:
+    return float(dist[tour, np.roll(tour, -1)].sum())
+
+
+def plan_route(depot: Tuple[float, float], stops: Sequence[Tuple[float, float]]) -> Tuple[List[int], float]:
+    # visit order as indices into `stops`, and the closed-tour length in km
+    if not stops:
+        return [], 0.0
+    dist = distance_matrix(np.array([depot, *stops], dtype=float))
+    tour = two_opt(nearest_neighbour(dist), dist)
+    return [int(t) - 1 for t in tour[1:]], tour_length(tour, dist)
+
+
+def plan_runs(
+    requests: Iterable[Dict[str, Any]],
+    index: Optional[PartnerIndex] = None,
+    registry: PropertyRegistry = PROPERTIES,
+) -> List[PickupRun]:
+    # requests need partner_id (see recycler.schedule_requests) and
+    # property_id; requests without a partner are skipped. A request runs
+    # on its pickup_day when scheduled for a later day, else the day it was made.
+    index = index or get_partner_index()
+    groups: Dict[Tuple[str, str, str], List[Dict[str, Any]]] = {}
+    for r in requests:
+        pid = r.get("partner_id")
+        if pid not in index.by_id:
+            continue
+        partner = index.by_id[pid]
+        day = str(r.get("pickup_day") or str(r.get("timestamp", ""))[:10])
+        key = (pid, day, str(r.get("eta_window") or partner.eta_window))
+        groups.setdefault(key, []).append(r)
+
+    known = set(registry.ids())
+    runs = []
+    for (pid, day, window), reqs in sorted(groups.items()):
+        partner = index.by_id[pid]
+        located, unlocated = [], []
+        for prop_id in dict.fromkeys(str(r.get("property_id", "default")) for r in reqs):
+            prop = registry.get(prop_id) if prop_id in known else None
+            if prop is None or prop.lat is None or prop.lon is None or partner.lat is None or partner.lon is None:
+                unlocated.append(prop_id)
+            else:
+                located.append((prop_id, (prop.lat, prop.lon)))
+        order, km = plan_route((partner.lat, partner.lon), [c for _, c in located]) if located else ([], 0.0)
+        runs.append(PickupRun(
+            partner_id=pid,
+            day=day,
+            eta_window=window,
+            stops=[located[i][0] for i in order],
+            requests=reqs,
+            total_kg=float(sum(float(r.get("estimated_kg", 0.0)) for r in reqs)),
+            distance_km=km,
+            unlocated=unlocated,
+        ))
+    return runs
+
+
+def collect_open_requests(
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    registry: PropertyRegistry = PROPERTIES,
+) -> List[Dict[str, Any]]:
+    # REQUESTED / ACCEPTED pickups from every property's status index
+    def load(p) -> List[Dict[str, Any]]:
+        rows = []
+        for req in open_requests(p.recycler_requests_path):
+            day = req.requested_at[:10]
+            if (since is None or day >= since) and (until is None or day <= until):
+                rows.append({**asdict(req), "timestamp": req.requested_at, "property_id": req.property_id or p.property_id})
+        return rows
+
+    per_property = map_properties(load, registry=registry)
+    return [r for rows in per_property.values() for r in rows]
+
+
+def committed_kg(requests: Iterable[Dict[str, Any]]) -> Dict[Tuple[str, str], float]:
+    # (partner_id, day) -> estimated kg of the ACCEPTED requests
+    out: Dict[Tuple[str, str], float] = {}
+    for r in requests:
+        if r.get("status") == ACCEPTED and r.get("partner_id"):
+            key = (str(r["partner_id"]), str(r.get("timestamp", ""))[:10])
+            out[key] = out.get(key, 0.0) + float(r.get("estimated_kg", 0.0))
+    return out
+
+
+@dataclass
+class PickupPlan:
+    assignments: List[Assignment]
+    runs: List[PickupRun]
+
+    def unassigned(self) -> List[Assignment]:
+        return [a for a in self.assignments if a.partner_id is None]
+
+
+def plan_pickups(
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    index: Optional[PartnerIndex] = None,
+    registry: PropertyRegistry = PROPERTIES,
+) -> PickupPlan:
+    # partner capacity is shared by every property, so the whole open queue
+    # is scheduled at once
+    index = index or get_partner_index()
+    requests = collect_open_requests(since, until, registry)
+    accepted = [r for r in requests if r.get("status") == ACCEPTED]
+    assignments = schedule_requests(
+        [r for r in requests if r.get("status") == REQUESTED], index, assigned_kg=committed_kg(accepted)
+    )
+    scheduled = [
+        {**a.request, "partner_id": a.partner_id, "eta_window": a.eta_window, "pickup_day": a.day}
+        for a in assignments
+        if a.partner_id is not None
+    ]
+    return PickupPlan(assignments=assignments, runs=plan_runs(accepted + scheduled, index, registry))
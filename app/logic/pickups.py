@@ -0,0 +1,408 @@
+import json
+import os
+import threading
+import uuid
+import zlib
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+from logic.bin_storage import append_event, index_version, iter_events, load_events_for_day, now_iso
+from logic.file_lock import lock_for
+
+# Pickup request lifecycle: REQUESTED -> ACCEPTED -> COLLECTED -> WEIGHED.
+# The request log stays append-only: creating a request appends a record
+# with status REQUESTED, every transition appends
+#     {"request_id": ..., "status": <new>, "from_status": <old>, "transition": true, ...}
+# and the current state of each request is the fold of its records. The
+# fold is kept next to the log as a snapshot, "<stem>.pickups.json", plus an
+# append-only delta, "<stem>.pickups.delta.jsonl": each write through this
+# module appends one line (the record and the log's index_version after
+# it), and every COMPACT_EVERY lines the snapshot is rewritten under a new
+# generation, which retires the delta. Processes cache the fold and only
+# read delta lines past their last offset, so a write costs one short line,
+# not a rewrite of the whole history. Any other change to the log (e.g.
+# deleting a day) leaves the stamp stale, which triggers one rebuild.
+# Status and partner lookups read the in-memory by_status index, so open
+# queues don't scan history.
+
+REQUESTED = "REQUESTED"
+ACCEPTED = "ACCEPTED"
+COLLECTED = "COLLECTED"
+WEIGHED = "WEIGHED"
+STATUSES = (REQUESTED, ACCEPTED, COLLECTED, WEIGHED)
+OPEN_STATUSES = (REQUESTED, ACCEPTED)
+TRANSITIONS = {REQUESTED: (ACCEPTED,), ACCEPTED: (COLLECTED,), COLLECTED: (WEIGHED,), WEIGHED: ()}
+COMPACT_EVERY = 256
+
+
+class TransitionError(ValueError):
+    pass
+
+
+@dataclass
+class PickupRequest:
+    request_id: str
+    status: str
+    requested_at: str
+    updated_at: str
+    property_id: Optional[str] = None
+    partner_id: Optional[str] = None
+    partner_name: Optional[str] = None
+    waste_stream: Optional[str] = None
+    estimated_kg: float = 0.0
+    eta_window: Optional[str] = None
+    note: str = ""
+    collected_kg: Optional[float] = None
+    weighed_kg: Optional[float] = None
+    status_at: Dict[str, str] = field(default_factory=dict)
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+def _legacy_id(record: Dict[str, Any]) -> str:
+    # records written before request ids existed
+    raw = json.dumps(record, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return f"legacy-{zlib.crc32(raw):08x}"
+
+
+def _record_id(record: Dict[str, Any]) -> str:
+    return str(record.get("request_id") or _legacy_id(record))
+
+
+def _apply(requests: Dict[str, PickupRequest], record: Dict[str, Any]) -> bool:
+    # False for a transition whose request hasn't been folded in yet
+    ts = str(record.get("timestamp", ""))
+    if record.get("transition"):
+        req = requests.get(str(record.get("request_id")))
+        if req is None:
+            return False
+        req.status = str(record["status"])
+        req.updated_at = ts
+        req.status_at[req.status] = ts
+        for key in ("collected_kg", "weighed_kg"):
+            if record.get(key) is not None:
+                setattr(req, key, float(record[key]))
+        return True
+    rid = _record_id(record)
+    requests[rid] = PickupRequest(
+        request_id=rid,
+        status=str(record.get("status", REQUESTED)),
+        requested_at=ts,
+        updated_at=ts,
+        property_id=record.get("property_id"),
+        partner_id=record.get("partner_id"),
+        partner_name=record.get("partner_name"),
+        waste_stream=record.get("waste_stream"),
+        estimated_kg=float(record.get("estimated_kg", 0.0)),
+        eta_window=record.get("eta_window"),
+        note=str(record.get("note", "")),
+        status_at={str(record.get("status", REQUESTED)): ts},
+    )
+    return True
+
+
+class PickupIndex:
+    def __init__(self, requests: Optional[Dict[str, PickupRequest]] = None):
+        self.requests: Dict[str, PickupRequest] = requests or {}
+        self.by_status: Dict[str, Dict[str, List[str]]] = {}
+        # transitions seen before their request (segments replay in day
+        # order, and older logs stamped transitions with the wall clock)
+        self.orphans: Dict[str, List[Dict[str, Any]]] = {}
+        for req in self.requests.values():
+            self._add(req)
+
+    def _add(self, req: PickupRequest) -> None:
+        self.by_status.setdefault(req.status, {}).setdefault(req.partner_id or "", []).append(req.request_id)
+
+    def _remove(self, req: PickupRequest) -> None:
+        self.by_status.get(req.status, {}).get(req.partner_id or "", []).remove(req.request_id)
+
+    def apply(self, records: Iterable[Dict[str, Any]]) -> None:
+        for record in records:
+            rid = _record_id(record)
+            old = self.requests.get(rid)
+            if old is not None:
+                # also dedupes identical legacy records, which share an id
+                self._remove(old)
+            if not _apply(self.requests, record):
+                self.orphans.setdefault(rid, []).append(record)
+                continue
+            if not record.get("transition"):
+                for orphan in self.orphans.pop(rid, []):
+                    _apply(self.requests, orphan)
+            self._add(self.requests[rid])
+
+    def get(self, request_id: str) -> Optional[PickupRequest]:
+        return self.requests.get(request_id)
+
+    def with_status(self, *statuses: str, partner_id: Optional[str] = None) -> List[PickupRequest]:
+        out = []
+        for status in statuses:
+            by_partner = self.by_status.get(status, {})
+            ids = by_partner.get(partner_id or "", []) if partner_id is not None else [
+                rid for rids in by_partner.values() for rid in rids
+            ]
+            out.extend(self.requests[rid] for rid in ids)
+        return sorted(out, key=lambda r: r.requested_at)
+
+    def counts(self) -> Dict[str, int]:
+        return {s: sum(len(v) for v in self.by_status.get(s, {}).values()) for s in STATUSES}
+
+    def to_dict(self, stamp: Any, generation: int) -> Dict[str, Any]:
+        return {
+            "stamp": list(stamp),
+            "generation": generation,
+            "requests": {rid: asdict(r) for rid, r in self.requests.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, raw: Dict[str, Any]) -> "PickupIndex":
+        return cls({rid: PickupRequest(**r) for rid, r in raw.get("requests", {}).items()})
+
+
+def index_path(path: str) -> str:
+    return os.path.splitext(path)[0] + ".pickups.json"
+
+
+def delta_path(path: str) -> str:
+    return os.path.splitext(path)[0] + ".pickups.delta.jsonl"
+
+
+def _lock(path: str):
+    return lock_for(os.path.splitext(path)[0] + ".pickups.lock")
+
+
+@dataclass
+class _Fold:
+    index: PickupIndex
+    generation: int
+    stamp: List[Any]
+    snapshot_sig: Optional[tuple]
+    offset: int = 0
+    n_delta: int = 0
+
+
+_CACHE: Dict[str, _Fold] = {}
+_CACHE_LOCK = threading.Lock()
+
+
+def _sig(file: str) -> Optional[tuple]:
+    try:
+        st = os.stat(file)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _atomic_json(file: str, payload: Any) -> None:
+    tmp = file + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False)
+    os.replace(tmp, file)
+
+
+def _compact(path: str, fold: _Fold) -> None:
+    # caller holds _lock(path). The new generation makes readers ignore the
+    # old delta lines even if we crash before truncating the file.
+    fold.generation += 1
+    _atomic_json(index_path(path), fold.index.to_dict(fold.stamp, fold.generation))
+    with open(delta_path(path), "w", encoding="utf-8"):
+        pass
+    fold.snapshot_sig = _sig(index_path(path))
+    fold.offset = 0
+    fold.n_delta = 0
+
+
+def _read_snapshot(path: str) -> Optional[_Fold]:
+    sig = _sig(index_path(path))
+    if sig is None:
+        return None
+    try:
+        with open(index_path(path), "r", encoding="utf-8") as f:
+            raw = json.load(f)
+        return _Fold(PickupIndex.from_dict(raw), int(raw.get("generation", 0)), raw.get("stamp"), sig)
+    except (OSError, ValueError, TypeError):
+        return None
+
+
+def _read_delta(path: str, fold: _Fold) -> None:
+    # apply complete delta lines past fold.offset
+    try:
+        with open(delta_path(path), "rb") as f:
+            f.seek(fold.offset)
+            tail = f.read()
+    except FileNotFoundError:
+        return
+    end = tail.rfind(b"\n") + 1
+    for line in tail[:end].splitlines():
+        if not line.strip():
+            continue
+        entry = json.loads(line)
+        if entry.get("generation") != fold.generation:
+            continue
+        fold.index.apply([entry["record"]])
+        fold.stamp = entry["stamp"]
+        fold.n_delta += 1
+    fold.offset += end
+
+
+def _rebuild(path: str) -> _Fold:
+    # caller holds _lock(path)
+    old = _read_snapshot(path)
+    index = PickupIndex()
+    index.apply(iter_events(path))
+    fold = _Fold(index, old.generation if old else 0, list(index_version(path)), None)
+    _compact(path, fold)
+    return fold
+
+
+def rebuild_index(path: str) -> PickupIndex:
+    with _lock(path):
+        fold = _rebuild(path)
+        with _CACHE_LOCK:
+            _CACHE[index_path(path)] = fold
+    return fold.index
+
+
+def _load(path: str, stamp: List[Any]) -> _Fold:
+    # caller holds _lock(path)
+    with _CACHE_LOCK:
+        fold = _CACHE.get(index_path(path))
+    if fold is None or fold.snapshot_sig != _sig(index_path(path)):
+        fold = _read_snapshot(path)
+    if fold is not None:
+        _read_delta(path, fold)
+    if fold is None or fold.stamp != stamp:
+        # missing, unreadable or stale: the log changed outside this module
+        fold = _rebuild(path)
+    with _CACHE_LOCK:
+        _CACHE[index_path(path)] = fold
+    return fold
+
+
+def load_index(path: str) -> PickupIndex:
+    stamp = list(index_version(path))
+    with _CACHE_LOCK:
+        fold = _CACHE.get(index_path(path))
+    if fold is not None and fold.stamp == stamp:
+        return fold.index
+    with _lock(path):
+        return _load(path, list(index_version(path))).index
+
+
+def _commit(path: str, record: Dict[str, Any]) -> None:
+    # caller holds _lock(path). A write that bypasses this module while the
+    # lock is held is only picked up by the next rebuild, so lifecycle
+    # records should always go through create_request / transition.
+    fold = _load(path, list(index_version(path)))
+    append_event(path, record)
+    fold.index.apply([record])
+    fold.stamp = list(index_version(path))
+    line = json.dumps({"generation": fold.generation, "stamp": fold.stamp, "record": record}, ensure_ascii=False)
+    with open(delta_path(path), "a", encoding="utf-8") as f:
+        f.write(line + "\n")
+    fold.offset = os.path.getsize(delta_path(path))
+    fold.n_delta += 1
+    if fold.n_delta >= COMPACT_EVERY:
+        _compact(path, fold)
+
+
+def create_request(
+    path: str,
+    waste_stream: str,
+    estimated_kg: float,
+    partner_id: str,
+    partner_name: str = "",
+    eta_window: str = "",
+    note: str = "",
+    property_id: Optional[str] = None,
+    timestamp: Optional[str] = None,
+) -> PickupRequest:
+    record = {
+        "timestamp": timestamp or now_iso(),
+        "request_id": new_request_id(),
+        "property_id": property_id,
+        "waste_stream": waste_stream,
+        "estimated_kg": float(estimated_kg),
+        "partner_id": partner_id,
+        "partner_name": partner_name,
+        "eta_window": eta_window,
+        "note": note,
+        "status": REQUESTED,
+    }
+    with _lock(path):
+        _commit(path, record)
+    return load_index(path).get(record["request_id"])
+
+
+def transition(path: str, request_id: str, status: str, kg: Optional[float] = None) -> PickupRequest:
+    # kg: collected weight for COLLECTED, scale weight for WEIGHED
+    with _lock(path):
+        req = load_index(path).get(request_id)
+        if req is None:
+            raise KeyError(f"Unknown pickup request: {request_id}")
+        if status not in TRANSITIONS.get(req.status, ()):
+            raise TransitionError(f"Cannot move pickup {request_id} from {req.status} to {status}")
+        if status == WEIGHED and kg is None:
+            raise TransitionError("WEIGHED needs the weighed kg")
+        record = {
+            # never before the request itself, so the transition lands in
+            # the request's day segment (or a later one) and replays after it
+            "timestamp": max(now_iso(), req.requested_at),
+            "request_id": request_id,
+            "status": status,
+            "from_status": req.status,
+            "transition": True,
+        }
+        if kg is not None and status == COLLECTED:
+            record["collected_kg"] = float(kg)
+        if kg is not None and status == WEIGHED:
+            record["weighed_kg"] = float(kg)
+        _commit(path, record)
+    return load_index(path).get(request_id)
+
+
+def open_requests(path: str, partner_id: Optional[str] = None) -> List[PickupRequest]:
+    return load_index(path).with_status(*OPEN_STATUSES, partner_id=partner_id)
+
+
+@dataclass
+class Reconciliation:
+    waste_stream: str
+    smart_bin_kg: float
+    estimated_kg: float
+    weighed_kg: float
+    diff_kg: float
+    diff_pct: Optional[float]
+
+
+def reconcile(requests_path: str, bin_events_path: str, day: str) -> List[Reconciliation]:
+    # weighed pickups requested on `day` vs the Smart Bin kg put in each
+    # stream's bin that day
+    bin_kg: Dict[str, float] = {}
+    for e in load_events_for_day(bin_events_path, day):
+        stream = str(e.get("bin_used", ""))
+        bin_kg[stream] = bin_kg.get(stream, 0.0) + float(e.get("weight_kg", 0.0))
+    estimated: Dict[str, float] = {}
+    weighed: Dict[str, float] = {}
+    for req in load_index(requests_path).requests.values():
+        if not req.requested_at.startswith(day) or not req.waste_stream:
+            continue
+        estimated[req.waste_stream] = estimated.get(req.waste_stream, 0.0) + req.estimated_kg
+        if req.status == WEIGHED and req.weighed_kg is not None:
+            weighed[req.waste_stream] = weighed.get(req.waste_stream, 0.0) + req.weighed_kg
+    out = []
+    for stream in sorted(set(estimated) | set(weighed)):
+        sb = bin_kg.get(stream, 0.0)
+        w = weighed.get(stream, 0.0)
+        out.append(Reconciliation(
+            waste_stream=stream,
+            smart_bin_kg=sb,
+            estimated_kg=estimated.get(stream, 0.0),
+            weighed_kg=w,
+            diff_kg=w - sb,
+            diff_pct=((w - sb) / sb) if sb > 0 else None,
+        ))
+    return out
@@ -0,0 +1,253 @@
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, TypeVar
+
+import pandas as pd
+
+from logic.bin_storage import summarize_events
+from logic.encodings import EncodingRegistry, load_registry
+from logic.event_summary import EventSummary
+from logic.file_lock import lock_for
+from logic.rollups import get_store
+from logic.savings import estimate_savings
+
+# Registry of the properties (hotels) one deployment serves, in
+# app/data/properties.json:
+#     {"properties": [{"property_id": "bkk-riverside", "name": "...", ...}]}
+# Each property owns an isolated partition app/data/properties/<id>/ with
+# its own event logs, rollups and menu costs, so hotels never contend on the
+# same files or locks. "default" is the original single-hotel layout
+# directly under app/data/ and is always registered. Cross-property
+# aggregates fan out over partitions on a thread pool; every partition read
+# is a sidecar / rollup lookup, so they are IO-bound and parallelize well.
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+REGISTRY_PATH = os.path.join(DATA_DIR, "properties.json")
+PROPERTIES_DIR = os.path.join(DATA_DIR, "properties")
+SHARED_MENU_COSTS = os.path.join(DATA_DIR, "sample_menu_costs.csv")
+DEFAULT_PROPERTY = "default"
+MAX_WORKERS = 8
+
+_ID_RE = re.compile(r"^[a-z0-9][a-z0-9_-]{0,63}$")
+
+
+@dataclass
+class Property:
+    property_id: str
+    name: str
+    city: str = ""
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+    settings: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def data_dir(self) -> str:
+        if self.property_id == DEFAULT_PROPERTY:
+            return DATA_DIR
+        return os.path.join(PROPERTIES_DIR, self.property_id)
+
+    @property
+    def bin_events_path(self) -> str:
+        return os.path.join(self.data_dir, "bin_events.json")
+
+    @property
+    def recycler_requests_path(self) -> str:
+        return os.path.join(self.data_dir, "recycler_requests.json")
+
+    @property
+    def rollups_path(self) -> str:
+        return os.path.join(self.data_dir, "daily_rollups.json")
+
+    @property
+    def encodings_path(self) -> str:
+        return os.path.join(self.data_dir, "encodings.json")
+
+    def encodings(self) -> EncodingRegistry:
+        # the property's categorical factors; DEFAULT_SPEC without an encodings.json
+        return load_registry(self.encodings_path)
+
+    @property
+    def menu_costs_path(self) -> str:
+        # a property without its own menu_costs.csv uses the shared sample
+        path = os.path.join(self.data_dir, "menu_costs.csv")
+        return path if os.path.exists(path) else SHARED_MENU_COSTS
+
+
+DEFAULT = Property(property_id=DEFAULT_PROPERTY, name="Bangkok Demo Hotel", city="Bangkok", lat=13.7460, lon=100.5340)
+
+
+def validate_property_id(property_id: str) -> str:
+    if not _ID_RE.match(property_id or ""):
+        raise ValueError(
+            f"Invalid property id: {property_id!r} (lowercase letters, digits, '-' and '_', max 64 chars)"
+        )
+    return property_id
+
+
+class PropertyRegistry:
+    def __init__(self, path: str = REGISTRY_PATH):
+        self.path = path
+        self._lock = lock_for(os.path.splitext(path)[0] + ".lock")
+        self._cache: Optional[tuple] = None
+        self._cache_lock = threading.Lock()
+
+    def _read(self) -> Dict[str, Property]:
+        props = {DEFAULT_PROPERTY: DEFAULT}
+        if not os.path.exists(self.path):
+            return props
+        mtime = os.stat(self.path).st_mtime_ns
+        with self._cache_lock:
+            if self._cache is not None and self._cache[0] == mtime:
+                return self._cache[1]
+        with open(self.path, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+        for row in raw.get("properties", []):
+            p = Property(**row)
+            props[validate_property_id(p.property_id)] = p
+        with self._cache_lock:
+            self._cache = (mtime, props)
+        return props
+
+    def list(self) -> List[Property]:
+        return list(self._read().values())
+
+    def ids(self) -> List[str]:
+        return list(self._read())
+
+    def get(self, property_id: str) -> Property:
+        try:
+            return self._read()[property_id]
+        except KeyError:
+            raise KeyError(f"Unknown property: {property_id}") from None
+
+    def register(self, prop: Property) -> Property:
+        validate_property_id(prop.property_id)
+        with self._lock:
+            props = dict(self._read())
+            props[prop.property_id] = prop
+            os.makedirs(prop.data_dir, exist_ok=True)
+            raw = {"properties": [asdict(p) for pid, p in props.items() if pid != DEFAULT_PROPERTY or p != DEFAULT]}
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(raw, f, indent=2)
+            os.replace(tmp, self.path)
+        return prop
+
+
+REGISTRY = PropertyRegistry()
+
+T = TypeVar("T")
+
+
+def map_properties(
+    fn: Callable[[Property], T],
+    property_ids: Optional[Sequence[str]] = None,
+    registry: PropertyRegistry = REGISTRY,
+    max_workers: int = MAX_WORKERS,
+) -> Dict[str, T]:
+    props = registry.list() if property_ids is None else [registry.get(pid) for pid in property_ids]
+    if len(props) <= 1:
+        return {p.property_id: fn(p) for p in props}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(props))) as pool:
+        results = list(pool.map(fn, props))
+    return {p.property_id: r for p, r in zip(props, results)}
+
+
+@dataclass
+class GroupWaste:
+    by_property: Dict[str, EventSummary]
+    total: EventSummary
+
+
+def group_waste(
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    property_ids: Optional[Sequence[str]] = None,
+    registry: PropertyRegistry = REGISTRY,
+) -> GroupWaste:
+    by_property = map_properties(
+        lambda p: summarize_events(p.bin_events_path, since, until), property_ids, registry
+    )
+    total = EventSummary()
+    for s in by_property.values():
+        total.merge(s)
+    return GroupWaste(by_property=by_property, total=total)
+
+
+@dataclass
+class PropertySavings:
+    property_id: str
+    days: int
+    savings_thb: float
+    avoided_waste_kg: float
+
+
+def _average_cost(path: str) -> float:
+    df = pd.read_csv(path)
+    return float(df["cost_thb_per_portion"].mean()) if len(df) else 0.0
+
+
+def property_savings(prop: Property, since: Optional[str] = None, until: Optional[str] = None) -> PropertySavings:
+    # savings over the property's submitted End-of-Day results, priced at
+    # its average menu cost per portion
+    cost = _average_cost(prop.menu_costs_path)
+    days = savings = avoided = 0.0
+    for r in get_store(prop.rollups_path).days(prop.property_id, since, until):
+        if r.recommended is None or r.baseline is None:
+            continue
+        out = estimate_savings(r.recommended, r.baseline, cost)
+        days += 1
+        savings += out.estimated_savings_thb
+        avoided += out.estimated_avoided_waste_kg
+    return PropertySavings(prop.property_id, int(days), savings, avoided)
+
+
+def group_savings(
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    property_ids: Optional[Sequence[str]] = None,
+    registry: PropertyRegistry = REGISTRY,
+) -> Dict[str, PropertySavings]:
+    return map_properties(lambda p: property_savings(p, since, until), property_ids, registry)
+
+
+def group_frame(
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    registry: PropertyRegistry = REGISTRY,
+) -> pd.DataFrame:
+    waste = group_waste(since, until, registry=registry)
+    saved = group_savings(since, until, registry=registry)
+    rows = []
+    for p in registry.list():
+        w = waste.by_property[p.property_id]
+        s = saved[p.property_id]
+        rows.append({
+            "property_id": p.property_id,
+            "name": p.name,
+            "events": w.count,
+            "waste_kg": round(w.total_kg, 2),
+            "wrong_bin_kg": round(w.wrong_bin_kg, 2),
+            "eod_days": s.days,
+            "savings_thb": round(s.savings_thb, 2),
+            "avoided_waste_kg": round(s.avoided_waste_kg, 2),
+        })
+    return pd.DataFrame(rows)
+
+
+def main():
+    # run from app/: python -m logic.properties [<id> <name> [city]]
+    import sys
+
+    if len(sys.argv) >= 3:
+        REGISTRY.register(Property(property_id=sys.argv[1], name=sys.argv[2], city=sys.argv[3] if len(sys.argv) > 3 else ""))
+    print(group_frame().to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,12 @@
-from dataclasses import dataclass
-from typing import List, Dict
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import json
+import os
+import threading
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+PARTNERS_PATH = os.path.join(BASE_DIR, "data", "recycler_partners.json")
 
 @dataclass
 class RecyclerPartner:
@@ -8,6 +15,9 @@ class RecyclerPartner:
     accepts: List[str]
     eta_window: str
     notes: str
+    capacity_kg: float = 500.0
+    lat: Optional[float] = None
+    lon: Optional[float] = None
 
 def get_demo_partners() -> List[RecyclerPartner]:
     return [
@@ -17,6 +27,9 @@ def get_demo_partners() -> List[RecyclerPartner]:
             accepts=["Compost"],
             eta_window="18:00–20:00",
             notes="Accepts veg/fruit scraps, bread, rice. No plastics.",
+            capacity_kg=400.0,
+            lat=13.7563,
+            lon=100.5018,
         ),
         RecyclerPartner(
             id="R2",
@@ -24,6 +37,9 @@ def get_demo_partners() -> List[RecyclerPartner]:
             accepts=["Biogas"],
             eta_window="16:00–19:00",
             notes="Accepts meat/fish leftovers. Sealed bags required.",
+            capacity_kg=600.0,
+            lat=13.7200,
+            lon=100.5600,
         ),
         RecyclerPartner(
             id="R3",
@@ -31,12 +47,120 @@ def get_demo_partners() -> List[RecyclerPartner]:
             accepts=["Recycle"],
             eta_window="10:00–12:00",
             notes="Accepts clean bottles/packaging. No organic waste.",
+            capacity_kg=300.0,
+            lat=13.8000,
+            lon=100.5500,
         ),
     ]
 
+def parse_window(eta_window: str) -> Tuple[int, int]:
+    # "18:00–20:00" (en dash or hyphen) -> minutes since midnight
+    start, end = eta_window.replace("–", "-").split("-")
+    to_min = lambda t: int(t.split(":")[0]) * 60 + int(t.split(":")[1])
+    return to_min(start.strip()), to_min(end.strip())
+
+@dataclass
+class PartnerIndex:
+    partners: List[RecyclerPartner]
+    by_id: Dict[str, RecyclerPartner] = field(init=False)
+    by_stream: Dict[str, List[RecyclerPartner]] = field(init=False)
+    windows: Dict[str, Tuple[int, int]] = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.by_id = {p.id: p for p in self.partners}
+        self.by_stream = {}
+        for p in self.partners:
+            for stream in p.accepts:
+                self.by_stream.setdefault(stream, []).append(p)
+        self.windows = {p.id: parse_window(p.eta_window) for p in self.partners}
+
+    def for_stream(self, waste_stream: str) -> List[RecyclerPartner]:
+        return self.by_stream.get(waste_stream, [])
+
+    def choose(self, waste_stream: str) -> RecyclerPartner:
+        candidates = self.by_stream.get(waste_stream)
+        return candidates[0] if candidates else self.partners[0]
+
+def load_partners(path: str = PARTNERS_PATH) -> List[RecyclerPartner]:
+    # app/data/recycler_partners.json ([{...RecyclerPartner fields...}]) if present, else the demo list
+    if not os.path.exists(path):
+        return get_demo_partners()
+    with open(path, "r", encoding="utf-8") as f:
+        return [RecyclerPartner(**row) for row in json.load(f)]
+
+_INDEX: Dict[str, Tuple[Optional[float], PartnerIndex]] = {}
+_INDEX_LOCK = threading.Lock()
+
+def get_partner_index(path: str = PARTNERS_PATH) -> PartnerIndex:
+    mtime = os.path.getmtime(path) if os.path.exists(path) else None
+    with _INDEX_LOCK:
+        hit = _INDEX.get(path)
+        if hit is not None and hit[0] == mtime:
+            return hit[1]
+    index = PartnerIndex(load_partners(path))
+    with _INDEX_LOCK:
+        _INDEX[path] = (mtime, index)
+    return index
+
 def choose_partner(waste_stream: str) -> RecyclerPartner:
-    partners = get_demo_partners()
-    for p in partners:
-        if waste_stream in p.accepts:
-            return p
-    return partners[0]
+    return get_partner_index().choose(waste_stream)
+
+
+@dataclass
+class Assignment:
+    request: Dict[str, Any]
+    day: str
+    partner_id: Optional[str]
+    eta_window: Optional[str]
+    reason: str
+
+def _ready(request: Dict[str, Any]) -> Tuple[date, int]:
+    # (day, minute since midnight) the request was made; a request without a
+    # valid ISO timestamp can't be placed on any day's window
+    ts = request.get("timestamp")
+    try:
+        dt = datetime.fromisoformat(str(ts))
+    except ValueError:
+        raise ValueError(f"Invalid request timestamp: {ts!r} (expected ISO 8601)") from None
+    return dt.date(), dt.hour * 60 + dt.minute
+
+def schedule_requests(
+    requests: Iterable[Dict[str, Any]],
+    index: Optional[PartnerIndex] = None,
+    assigned_kg: Optional[Dict[Tuple[str, str], float]] = None,
+) -> List[Assignment]:
+    # Greedy first-fit decreasing per day: heaviest requests first; each goes
+    # to a partner for its stream whose window has not closed by the time the
+    # request was made and whose remaining daily capacity covers it, earliest
+    # window first (the partner already on the request wins ties). A request
+    # that fits nowhere that day rolls over to the next day's windows.
+    # assigned_kg: (partner_id, day) -> kg already committed.
+    index = index or get_partner_index()
+    load = dict(assigned_kg or {})
+    reqs = sorted(requests, key=lambda r: -float(r.get("estimated_kg", 0.0)))
+    ready = [_ready(r) for r in reqs]  # validate the whole batch up front
+    out = []
+    for r, (made_on, made_at) in zip(reqs, ready):
+        kg = float(r.get("estimated_kg", 0.0))
+        partners = index.for_stream(str(r.get("waste_stream", "")))
+        best = None
+        for day, not_before in ((made_on, made_at), (made_on + timedelta(days=1), 0)):
+            day = day.isoformat()
+            for p in partners:
+                start, end = index.windows[p.id]
+                if end <= not_before or load.get((p.id, day), 0.0) + kg > p.capacity_kg:
+                    continue
+                key = (start, p.id != r.get("partner_id"), load.get((p.id, day), 0.0))
+                if best is None or key < best[0]:
+                    best = (key, p, day)
+            if best is not None:
+                break
+        if best is None:
+            reason = "no partner accepts this stream" if not partners else "no partner window/capacity left"
+            out.append(Assignment(request=r, day=made_on.isoformat(), partner_id=None, eta_window=None, reason=reason))
+            continue
+        _, p, day = best
+        load[(p.id, day)] = load.get((p.id, day), 0.0) + kg
+        reason = "assigned" if day == made_on.isoformat() else "assigned (next day)"
+        out.append(Assignment(request=r, day=day, partner_id=p.id, eta_window=p.eta_window, reason=reason))
+    return out
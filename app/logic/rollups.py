@@ -0,0 +1,271 @@
+import json
+import os
+import threading
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+from logic.bin_storage import index_version, load_summary_index
+from logic.file_lock import lock_for
+from logic.green_star import next_streak
+from logic.routing_rules import RULES_DIR, active_version, wrong_bin_by_day
+
+# Materialized per-property, per-day rollups: measured and wrong-bin kg from
+# the Smart Bin log, plus the End-of-Day portions and day_status. Each
+# property's event totals are stamped with its log's index_version; reads of
+# a tracked property (track_events) compare the stamp first and, when any
+# process has written to the log since, re-sync just the days whose totals
+# differ. EOD results are written by record_eod, and each EOD row
+# carries the Green Star streak as of that day, so proof and streak views
+# are lookups that survive restarts. restate() re-derives wrong-bin kg under
+# a routing rules version (see logic/routing_rules.py); a restated day keeps
+# that version when later events arrive for it. Days rolled into the Parquet
+# archive keep their totals and are flagged `archived`.
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+ROLLUPS_PATH = os.path.join(BASE_DIR, "data", "daily_rollups.json")
+DEFAULT_PROPERTY = "default"
+
+
+@dataclass
+class DailyRollup:
+    property_id: str
+    day: str
+    measured_kg: float = 0.0
+    wrong_bin_kg: float = 0.0
+    event_count: int = 0
+    recommended: Optional[int] = None
+    baseline: Optional[int] = None
+    actual: Optional[int] = None
+    day_status: Optional[str] = None
+    streak: Optional[int] = None
+    rules_version: Optional[int] = None
+    archived: bool = False
+    updated_at: Optional[str] = None
+
+
+class RollupStore:
+    def __init__(self, path: str = ROLLUPS_PATH, rules_dir: str = RULES_DIR):
+        self.path = path
+        # where restated days' rules versions live; later syncs of those
+        # days re-evaluate under the same directory
+        self.rules_dir = rules_dir
+        self._lock = lock_for(os.path.splitext(path)[0] + ".lock")
+        self._cache: Optional[tuple] = None
+        self._cache_lock = threading.Lock()
+        self._sources: Dict[str, str] = {}
+
+    def _load(self) -> tuple:
+        # (rollups, stamps); stamps: property_id -> index_version of its log
+        if not os.path.exists(self.path):
+            return {}, {}
+        st = os.stat(self.path)
+        sig = (st.st_mtime_ns, st.st_size)
+        with self._cache_lock:
+            if self._cache is not None and self._cache[0] == sig:
+                return self._cache[1]
+        with open(self.path, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+        data = {
+            pid: {day: DailyRollup(**row) for day, row in days.items()}
+            for pid, days in raw.get("properties", {}).items()
+        }
+        loaded = (data, raw.get("stamps", {}))
+        with self._cache_lock:
+            self._cache = (sig, loaded)
+        return loaded
+
+    def _read(self) -> Dict[str, Dict[str, DailyRollup]]:
+        return self._load()[0]
+
+    def _write(self, data: Dict[str, Dict[str, DailyRollup]], stamps: Optional[Dict[str, list]] = None) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        raw = {
+            "properties": {
+                pid: {day: asdict(r) for day, r in sorted(days.items())}
+                for pid, days in data.items()
+            },
+            "stamps": self._load()[1] if stamps is None else stamps,
+        }
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(raw, f, indent=1)
+        os.replace(tmp, self.path)
+
+    def _mutable(self) -> Dict[str, Dict[str, DailyRollup]]:
+        # copy of the cached state to edit under the lock
+        return {pid: {d: DailyRollup(**asdict(r)) for d, r in days.items()} for pid, days in self._read().items()}
+
+    def track(self, property_id: str, events_path: str) -> None:
+        self._sources[property_id] = events_path
+        self.refresh(property_id)
+
+    def refresh(self, property_id: str) -> None:
+        # re-sync a tracked property if its log changed since the last sync
+        events_path = self._sources.get(property_id)
+        if events_path is None:
+            return
+        stamp = list(index_version(events_path))
+        if self._load()[1].get(property_id) == stamp:
+            return
+        index = load_summary_index(events_path)
+        rows = self._read().get(property_id, {})
+        known = set(index.all_days())
+        changed = set()
+        for day in known:
+            s = index.day(day)
+            r = rows.get(day)
+            if r is None or (r.event_count, r.measured_kg) != (s.count, s.total_kg) or (
+                r.archived != (day in index.archived)
+            ) or (r.rules_version is None and r.wrong_bin_kg != s.wrong_bin_kg):
+                changed.add(day)
+        changed |= {d for d, r in rows.items() if r.event_count and d not in known}
+        self.sync_events(property_id, events_path, changed, stamp)
+
+    def get(self, property_id: str, day: str) -> DailyRollup:
+        self.refresh(property_id)
+        r = self._read().get(property_id, {}).get(day)
+        return r if r is not None else DailyRollup(property_id=property_id, day=day)
+
+    def days(self, property_id: str, since: Optional[str] = None, until: Optional[str] = None) -> List[DailyRollup]:
+        self.refresh(property_id)
+        rows = self._read().get(property_id, {})
+        return [
+            rows[d] for d in sorted(rows)
+            if (since is None or d >= since) and (until is None or d <= until)
+        ]
+
+    def current_streak(self, property_id: str, before: Optional[str] = None) -> int:
+        # streak of the latest End-of-Day result strictly before `before`
+        self.refresh(property_id)
+        rows = self._read().get(property_id, {})
+        for d in sorted(rows, reverse=True):
+            if before is not None and d >= before:
+                continue
+            if rows[d].streak is not None:
+                return int(rows[d].streak)
+        return 0
+
+    def sync_events(
+        self,
+        property_id: str,
+        events_path: str,
+        days: Optional[Set[str]] = None,
+        stamp: Optional[list] = None,
+    ) -> None:
+        # stamp is taken before the index is read, so a write racing this
+        # sync leaves the stamp stale and the next refresh picks it up
+        stamp = list(index_version(events_path)) if stamp is None else stamp
+        index = load_summary_index(events_path)
+        now = datetime.now().isoformat(timespec="seconds")
+        with self._lock:
+            data = self._mutable()
+            stamps = dict(self._load()[1])
+            rows = data.setdefault(property_id, {})
+            if days is None:
+                days = set(index.all_days()) | {d for d, r in rows.items() if r.event_count}
+            restated: Dict[int, Set[str]] = {}
+            for day in days:
+                s = index.day(day)
+                r = rows.get(day)
+                if r is None:
+                    if s.count == 0:
+                        continue
+                    r = rows[day] = DailyRollup(property_id=property_id, day=day)
+                r.measured_kg = s.total_kg
+                r.wrong_bin_kg = s.wrong_bin_kg
+                r.event_count = s.count
+                r.archived = day in index.archived
+                r.updated_at = now
+                if r.rules_version is not None:
+                    restated.setdefault(r.rules_version, set()).add(day)
+            for version, vdays in restated.items():
+                wrong = wrong_bin_by_day(events_path, version, days=vdays, rules_dir=self.rules_dir, max_workers=1)
+                for day, kg in wrong.items():
+                    rows[day].wrong_bin_kg = kg
+            stamps[property_id] = stamp
+            self._write(data, stamps)
+
+    def restate(
+        self,
+        property_id: str,
+        events_path: str,
+        version: Optional[int] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+    ) -> List[str]:
+        # the parallel scan runs outside the lock; only the merge holds it
+        version = active_version(self.rules_dir) if version is None else int(version)
+        wrong = wrong_bin_by_day(events_path, version, since=since, until=until, rules_dir=self.rules_dir)
+        now = datetime.now().isoformat(timespec="seconds")
+        with self._lock:
+            data = self._mutable()
+            rows = data.setdefault(property_id, {})
+            for day, kg in wrong.items():
+                r = rows.get(day)
+                if r is None:
+                    r = rows[day] = DailyRollup(property_id=property_id, day=day)
+                r.wrong_bin_kg = kg
+                r.rules_version = version
+                r.updated_at = now
+            self._write(data)
+        return sorted(wrong)
+
+    def record_eod(
+        self,
+        property_id: str,
+        day: str,
+        recommended: int,
+        baseline: int,
+        actual: int,
+        day_status: str,
+    ) -> DailyRollup:
+        with self._lock:
+            data = self._mutable()
+            rows = data.setdefault(property_id, {})
+            r = rows.get(day) or DailyRollup(property_id=property_id, day=day)
+            r.recommended = int(recommended)
+            r.baseline = int(baseline)
+            r.actual = int(actual)
+            r.day_status = day_status
+            r.updated_at = datetime.now().isoformat(timespec="seconds")
+            rows[day] = r
+            _restreak(rows, since=day)
+            self._write(data)
+            return r
+
+
+def _restreak(rows: Dict[str, DailyRollup], since: str) -> None:
+    # recompute the materialized streak from `since` onwards (a past day can
+    # be resubmitted); O(days after since)
+    streak = 0
+    for d in sorted(rows):
+        r = rows[d]
+        if r.day_status is None:
+            continue
+        if d < since:
+            streak = int(r.streak or 0)
+            continue
+        streak = next_streak(streak, r.day_status)
+        r.streak = streak
+
+
+_STORES: Dict[str, RollupStore] = {}
+_STORES_LOCK = threading.Lock()
+
+
+def get_store(path: str = ROLLUPS_PATH, rules_dir: str = RULES_DIR) -> RollupStore:
+    key = (os.path.abspath(path), os.path.abspath(rules_dir))
+    with _STORES_LOCK:
+        store = _STORES.get(key)
+        if store is None:
+            store = _STORES[key] = RollupStore(path, rules_dir)
+        return store
+
+
+def track_events(events_path: str, property_id: str = DEFAULT_PROPERTY, rollups_path: str = ROLLUPS_PATH) -> RollupStore:
+    # keep this property's rollups in step with its Smart Bin log, whichever
+    # process writes to it; the first sync backfills every day the log has
+    store = get_store(rollups_path)
+    store.track(property_id, events_path)
+    return store
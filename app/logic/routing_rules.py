@@ -0,0 +1,254 @@
+import json
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from logic import archive, bin_storage
+from logic.smart_bin import BINS, ITEM_TO_BIN, RoutingTable, compile_routing, evaluate_bins
+
+# Routing rules (item -> bin) as versioned data:
+#     app/data/routing_rules/rules_vNNNN.json
+# A version applies from its effective_from day (all days when unset). New
+# events are evaluated against the latest version in effect on their own
+# timestamp's day (evaluate_events), so a backdated reading gets the rules
+# of its day. When the rules change, restating history does not touch the
+# raw log:
+# wrong_bin_by_day() re-evaluates stored events (live log + the property's
+# Parquet archive) against a version in parallel day chunks, skipping days
+# before its effective_from, and RollupStore.restate() writes the result
+# into the daily rollups.
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+RULES_DIR = os.path.join(BASE_DIR, "data", "routing_rules")
+CHUNK_DAYS = 31
+MAX_WORKERS = os.cpu_count() or 1
+
+_RULES_RE = re.compile(r"^rules_v(\d{4,})\.json$")
+
+
+@dataclass
+class RoutingRules:
+    version: int
+    item_to_bin: Dict[str, str]
+    bins: List[str]
+    default_bin: str = "Landfill"
+    effective_from: Optional[str] = None
+    created_at: Optional[str] = None
+    note: str = ""
+
+    def table(self) -> RoutingTable:
+        return compile_routing(self.item_to_bin, self.bins, self.default_bin)
+
+    def in_effect(self, day: str) -> bool:
+        return self.effective_from is None or self.effective_from[:10] <= day
+
+
+BUILTIN = RoutingRules(version=1, item_to_bin=dict(ITEM_TO_BIN), bins=list(BINS), note="Built-in demo rules")
+
+
+def list_versions(rules_dir: str = RULES_DIR) -> List[int]:
+    if not os.path.isdir(rules_dir):
+        return []
+    return sorted(int(m.group(1)) for m in map(_RULES_RE.match, os.listdir(rules_dir)) if m)
+
+
+def rules_path(version: int, rules_dir: str = RULES_DIR) -> str:
+    return os.path.join(rules_dir, f"rules_v{version:04d}.json")
+
+
+def save_rules(
+    item_to_bin: Dict[str, str],
+    bins: Sequence[str],
+    default_bin: str = "Landfill",
+    effective_from: Optional[str] = None,
+    note: str = "",
+    rules_dir: str = RULES_DIR,
+) -> RoutingRules:
+    compile_routing(item_to_bin, bins, default_bin)  # validate before publishing
+    os.makedirs(rules_dir, exist_ok=True)
+    versions = list_versions(rules_dir)
+    rules = RoutingRules(
+        version=(versions[-1] + 1) if versions else 1,
+        item_to_bin=dict(item_to_bin),
+        bins=list(bins),
+        default_bin=default_bin,
+        effective_from=effective_from,
+        created_at=datetime.now().isoformat(timespec="seconds"),
+        note=note,
+    )
+    path = rules_path(rules.version, rules_dir)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(asdict(rules), f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+    return rules
+
+
+_LOADED: Dict[str, Tuple[float, RoutingRules, RoutingTable]] = {}
+_LOADED_LOCK = threading.Lock()
+
+
+def _load(path: str) -> Tuple[RoutingRules, RoutingTable]:
+    mtime = os.path.getmtime(path)
+    with _LOADED_LOCK:
+        hit = _LOADED.get(path)
+        if hit is not None and hit[0] == mtime:
+            return hit[1], hit[2]
+    with open(path, "r", encoding="utf-8") as f:
+        rules = RoutingRules(**json.load(f))
+    table = rules.table()
+    with _LOADED_LOCK:
+        _LOADED[path] = (mtime, rules, table)
+    return rules, table
+
+
+def load_rules(version: Optional[int] = None, rules_dir: str = RULES_DIR, day: Optional[str] = None) -> RoutingRules:
+    # version None = the latest version in effect on `day` (default today);
+    # with no rules files (or none in effect yet), the built-in v1
+    versions = list_versions(rules_dir)
+    if version is None:
+        day = day or date.today().isoformat()
+        for v in reversed(versions):
+            rules = _load(rules_path(v, rules_dir))[0]
+            if rules.in_effect(day):
+                return rules
+        return BUILTIN
+    if version not in versions:
+        if not versions and version == BUILTIN.version:
+            return BUILTIN
+        raise KeyError(f"Unknown routing rules version: {version}")
+    return _load(rules_path(version, rules_dir))[0]
+
+
+def load_table(version: Optional[int] = None, rules_dir: str = RULES_DIR, day: Optional[str] = None) -> RoutingTable:
+    rules = load_rules(version, rules_dir, day)
+    if rules is BUILTIN:
+        return _BUILTIN_TABLE
+    return _load(rules_path(rules.version, rules_dir))[1]
+
+
+_BUILTIN_TABLE = BUILTIN.table()
+
+
+def active_version(rules_dir: str = RULES_DIR, day: Optional[str] = None) -> int:
+    return load_rules(None, rules_dir, day).version
+
+
+def evaluate_events(
+    items: Sequence[str],
+    bins_used: Sequence[str],
+    days: Sequence[str],
+    rules_dir: str = RULES_DIR,
+) -> Tuple[List[str], List[bool]]:
+    # (recommended_bin, is_correct_bin) per event, each under the rules in
+    # effect on its day; one vectorized pass per distinct day
+    required: List[str] = [""] * len(items)
+    correct: List[bool] = [False] * len(items)
+    by_day: Dict[str, List[int]] = {}
+    for i, day in enumerate(days):
+        by_day.setdefault(day, []).append(i)
+    for day, idx in by_day.items():
+        res = evaluate_bins([items[i] for i in idx], [bins_used[i] for i in idx], load_table(None, rules_dir, day))
+        for i, req, ok in zip(idx, res.required_bins().tolist(), res.is_correct_bin.tolist()):
+            required[i] = req
+            correct[i] = ok
+    return required, correct
+
+
+# --- restatement ---
+
+_RESTATE_COLUMNS = ["timestamp", "item", "bin_used", "weight_kg"]
+
+
+def _wrong_bin_chunk(
+    events_path: str,
+    days: List[str],
+    rules: RoutingRules,
+    archive_dir: str,
+    backend: str,
+) -> Dict[str, float]:
+    # runs in a worker process: one contiguous day range, one vectorized pass
+    bin_storage.set_backend(backend)
+    df = bin_storage.read_events_frame(events_path, days[0], days[-1], _RESTATE_COLUMNS, archive_dir)
+    out = {d: 0.0 for d in days}
+    if df.empty:
+        return out
+    day = df["timestamp"].astype(str).str.slice(0, 10)
+    keep = day.isin(out).to_numpy()
+    res = evaluate_bins(
+        df["item"].astype(str).to_numpy()[keep],
+        df["bin_used"].astype(str).to_numpy()[keep],
+        rules.table(),
+    )
+    kg = pd.to_numeric(df["weight_kg"], errors="coerce").fillna(0.0).to_numpy()[keep]
+    wrong = pd.Series(np.where(res.is_correct_bin, 0.0, kg)).groupby(day.to_numpy()[keep]).sum()
+    out.update({d: float(v) for d, v in wrong.items()})
+    return out
+
+
+def stored_days(events_path: str, archive_dir: str = archive.ARCHIVE_DIR) -> List[str]:
+    name = archive.archive_name(events_path)
+    return sorted(set(bin_storage.list_days(events_path)) | set(archive.list_partitions(name, "day", archive_dir)))
+
+
+def wrong_bin_by_day(
+    events_path: str,
+    version: Optional[int] = None,
+    days: Optional[Iterable[str]] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    rules_dir: str = RULES_DIR,
+    archive_dir: str = archive.ARCHIVE_DIR,
+    max_workers: int = MAX_WORKERS,
+    chunk_days: int = CHUNK_DAYS,
+) -> Dict[str, float]:
+    # wrong-bin kg per day under rules `version` (None = the version in
+    # effect today), for the days on or after its effective_from
+    rules = load_rules(version, rules_dir)  # fail fast on an unknown version
+    if days is None:
+        days = stored_days(events_path, archive_dir)
+    days = sorted(
+        d for d in set(days)
+        if (since is None or d >= since) and (until is None or d <= until) and rules.in_effect(d)
+    )
+    if not days:
+        return {}
+    chunks = [days[i:i + chunk_days] for i in range(0, len(days), chunk_days)]
+    args = (rules, archive_dir, bin_storage.STORAGE_BACKEND)
+    if len(chunks) == 1 or max_workers <= 1:
+        results = [_wrong_bin_chunk(events_path, c, *args) for c in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(chunks))) as pool:
+            results = list(pool.map(_wrong_bin_chunk, [events_path] * len(chunks), chunks, *[[a] * len(chunks) for a in args]))
+    out: Dict[str, float] = {}
+    for r in results:
+        out.update(r)
+    return out
+
+
+def main():
+    # run from app/: python -m logic.routing_rules [version] [since] [until]
+    # restates every property's wrong-bin rollups under `version`
+    import sys
+
+    from logic.properties import REGISTRY
+    from logic.rollups import get_store
+
+    version = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    since = sys.argv[2] if len(sys.argv) > 2 else None
+    until = sys.argv[3] if len(sys.argv) > 3 else None
+    for prop in REGISTRY.list():
+        days = get_store(prop.rollups_path).restate(prop.property_id, prop.bin_events_path, version, since, until)
+        print(f"{prop.property_id}: restated {len(days)} day(s)")
+    print(f"Routing rules v{active_version() if version is None else version}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,7 @@
 from dataclasses import dataclass
+from typing import Sequence, Tuple
+
+import numpy as np
 
 
 @dataclass
@@ -51,3 +54,101 @@ def estimate_savings(
         estimated_avoided_waste_kg=avoided_waste_kg,
         notes=notes,
     )
+
+
+# Vectorized what-if mode. Every argument broadcasts with NumPy rules, so a
+# grid is just arrays with different axes, e.g. menus on axis 0 and
+# assumption values on axis 1. Same arithmetic as estimate_savings.
+
+@dataclass
+class SavingsGrid:
+    estimated_waste_reduction_pct: np.ndarray
+    estimated_savings_thb: np.ndarray
+    estimated_avoided_waste_kg: np.ndarray
+
+
+def estimate_savings_grid(
+    recommended_portions,
+    baseline_portions,
+    cost_thb_per_portion,
+    typical_overproduction_pct=0.10,
+    target_reduction_low=0.08,
+    target_reduction_high=0.15,
+    grams_per_portion_waste_equivalent=180.0,
+) -> SavingsGrid:
+    baseline = np.maximum(1, np.trunc(np.asarray(baseline_portions, dtype=float)))
+    rec = np.maximum(1, np.trunc(np.asarray(recommended_portions, dtype=float)))
+    cost = np.maximum(0.0, np.asarray(cost_thb_per_portion, dtype=float))
+    low = np.asarray(target_reduction_low, dtype=float)
+    high = np.asarray(target_reduction_high, dtype=float)
+
+    delta = (baseline - rec) / baseline
+    reduction_pct = np.where(rec >= baseline, low * 0.6, np.minimum(high, np.maximum(low, delta + 0.03)))
+
+    avoided_wasted_portions = baseline * np.asarray(typical_overproduction_pct, dtype=float) * reduction_pct
+    return SavingsGrid(
+        estimated_waste_reduction_pct=reduction_pct,
+        estimated_savings_thb=avoided_wasted_portions * cost,
+        estimated_avoided_waste_kg=avoided_wasted_portions * np.asarray(grams_per_portion_waste_equivalent, dtype=float) / 1000.0,
+    )
+
+
+@dataclass
+class SavingsBands:
+    percentiles: Tuple[float, ...]
+    # each array has shape (len(percentiles), *broadcast shape of the inputs)
+    estimated_waste_reduction_pct: np.ndarray
+    estimated_savings_thb: np.ndarray
+    estimated_avoided_waste_kg: np.ndarray
+
+    def band(self, p: float) -> SavingsGrid:
+        i = self.percentiles.index(p)
+        return SavingsGrid(
+            self.estimated_waste_reduction_pct[i],
+            self.estimated_savings_thb[i],
+            self.estimated_avoided_waste_kg[i],
+        )
+
+
+MC_SAMPLES = 2000
+MC_CHUNK_ELEMENTS = 4_000_000
+
+
+def simulate_savings(
+    recommended_portions,
+    baseline_portions,
+    cost_thb_per_portion,
+    overproduction_range: Tuple[float, float] = (0.07, 0.13),
+    target_low_range: Tuple[float, float] = (0.06, 0.10),
+    target_high_range: Tuple[float, float] = (0.12, 0.18),
+    grams_range: Tuple[float, float] = (150.0, 210.0),
+    n_samples: int = MC_SAMPLES,
+    percentiles: Sequence[float] = (5.0, 50.0, 95.0),
+    seed: int = 42,
+) -> SavingsBands:
+    # Monte Carlo over the benchmark assumptions (uniform within each range);
+    # the same n_samples draws are shared by every scenario, and scenarios are
+    # processed in chunks so n_scenarios * n_samples never has to fit at once
+    rng = np.random.default_rng(seed)
+    draws = [rng.uniform(lo, hi, n_samples) for lo, hi in
+             (overproduction_range, target_low_range, target_high_range, grams_range)]
+    rec, base, cost = np.broadcast_arrays(
+        np.asarray(recommended_portions, dtype=float),
+        np.asarray(baseline_portions, dtype=float),
+        np.asarray(cost_thb_per_portion, dtype=float),
+    )
+    shape = rec.shape
+    rec, base, cost = rec.reshape(-1), base.reshape(-1), cost.reshape(-1)
+    pcts = tuple(float(p) for p in percentiles)
+    out = np.empty((3, len(pcts), rec.size))
+    step = max(1, MC_CHUNK_ELEMENTS // max(1, n_samples))
+    over, low, high, grams = (d[None, :] for d in draws)
+    for start in range(0, rec.size, step):
+        sl = slice(start, start + step)
+        g = estimate_savings_grid(
+            rec[sl, None], base[sl, None], cost[sl, None], over, low, np.maximum(low, high), grams
+        )
+        for k, arr in enumerate((g.estimated_waste_reduction_pct, g.estimated_savings_thb, g.estimated_avoided_waste_kg)):
+            out[k, :, sl] = np.percentile(arr, pcts, axis=1)
+    out = out.reshape(3, len(pcts), *shape)
+    return SavingsBands(pcts, out[0], out[1], out[2])
@@ -1,6 +1,13 @@
 from dataclasses import dataclass
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Protocol, Sequence, Tuple
+import importlib
+import os
 import random
+import threading
+import zlib
+
+import numpy as np
+import pandas as pd
 
 @dataclass
 class SmartBinResult:
@@ -21,9 +28,13 @@ ITEM_TO_BIN: Dict[str, str] = {
 
 BINS = ["Compost", "Biogas", "Recycle", "Landfill"]
 
+def stable_hash(value: str) -> int:
+    # same value in every process, unlike hash() under PYTHONHASHSEED
+    return zlib.crc32(str(value).encode("utf-8"))
+
 def classify_demo(selected_item: str, seed: int = 42) -> Tuple[str, float]:
     # Demo: çoğu zaman doğru, bazen karıştırır (jüriye gerçekçilik)
-    rng = random.Random(seed + hash(selected_item) % 10000)
+    rng = random.Random(seed + stable_hash(selected_item) % 10000)
     if rng.random() < 0.85:
         return selected_item, round(rng.uniform(0.78, 0.96), 2)
     # yanlış tahmin: başka bir item seç
@@ -31,21 +42,190 @@ def classify_demo(selected_item: str, seed: int = 42) -> Tuple[str, float]:
     wrong = rng.choice(other_items)
     return wrong, round(rng.uniform(0.45, 0.75), 2)
 
+
+# Batch classification. A backend takes N items (the label the camera saw,
+# or what the operator picked in the demo) and optionally an (N, k) feature
+# matrix, and returns (predicted items, confidences) as arrays of length N.
+# The result for an item must not depend on the rest of the batch, so
+# readings can be sharded across processes and batched freely.
+
+class Classifier(Protocol):
+    def classify(
+        self, items: Sequence[str], features: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]: ...
+
+
+class DemoClassifier:
+    def __init__(self, seed: int = 42):
+        self.seed = seed
+
+    def classify(self, items: Sequence[str], features: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        # the demo result only depends on (seed, item): classify each
+        # distinct item once and scatter back. A missing item (None/NaN,
+        # factorized to -1) is unrecognized: "" with confidence 0, which
+        # routes to the default bin; the appended last slot is what -1 picks.
+        inverse, uniq = pd.factorize(np.asarray(items, dtype=object).reshape(-1))
+        results = [classify_demo(str(u), self.seed) for u in uniq] + [("", 0.0)]
+        pred = np.array([r[0] for r in results], dtype=object)
+        conf = np.array([r[1] for r in results], dtype=float)
+        return pred[inverse], conf[inverse]
+
+
+# FOODSAVE_CLASSIFIER="package.module:factory" plugs in a real model; the
+# factory is called with no arguments and must return a Classifier.
+CLASSIFIER_ENV = "FOODSAVE_CLASSIFIER"
+_CLASSIFIER: Optional[Classifier] = None
+_CLASSIFIER_LOCK = threading.Lock()
+
+
+def set_classifier(classifier: Optional[Classifier]) -> None:
+    global _CLASSIFIER
+    with _CLASSIFIER_LOCK:
+        _CLASSIFIER = classifier
+
+
+def get_classifier() -> Classifier:
+    global _CLASSIFIER
+    with _CLASSIFIER_LOCK:
+        if _CLASSIFIER is None:
+            spec = os.environ.get(CLASSIFIER_ENV)
+            if spec:
+                module, _, attr = spec.partition(":")
+                if not attr:
+                    raise ValueError(f"{CLASSIFIER_ENV} must look like 'package.module:factory', got {spec!r}")
+                _CLASSIFIER = getattr(importlib.import_module(module), attr)()
+            else:
+                _CLASSIFIER = DemoClassifier()
+        return _CLASSIFIER
+
+
+def classify_batch(items: Sequence[str], features: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    return get_classifier().classify(items, features)
+
+def _message(predicted_item: str, required_bin: str, chosen_bin: str, ok: bool) -> str:
+    if ok:
+        return f"✅ Correct bin. {predicted_item} → {required_bin}"
+    return f"🔴 Wrong bin! Detected {predicted_item} → should go to {required_bin} (not {chosen_bin})"
+
 def evaluate_bin(predicted_item: str, chosen_bin: str) -> SmartBinResult:
     required_bin = ITEM_TO_BIN.get(predicted_item, "Landfill")
     ok = (required_bin == chosen_bin)
+    return SmartBinResult(
+        predicted_item=predicted_item,
+        confidence=1.0,
+        is_correct_bin=ok,
+        message=_message(predicted_item, required_bin, chosen_bin, ok),
+    )
 
-    if ok:
+
+# Compiled routing: items and bins as integer codes and one item code -> bin
+# code array, so thousands of events are evaluated with a few numpy ops.
+# Item code len(items) is "unknown item" and routes to default_bin; bin code
+# len(bins) is "unknown bin" and never matches.
+
+@dataclass
+class RoutingTable:
+    items: Tuple[str, ...]
+    bins: Tuple[str, ...]
+    required: np.ndarray
+    default_bin: str = "Landfill"
+
+    def __post_init__(self) -> None:
+        self._item_codes = {item: i for i, item in enumerate(self.items)}
+        self._bin_codes = {b: i for i, b in enumerate(self.bins)}
+
+    def _codes(self, values: Sequence[str], lookup: Dict[str, int], unknown: int) -> np.ndarray:
+        # hash-factorize, then one dict lookup per distinct value. None/NaN
+        # factorize to -1, which picks the appended `unknown` code.
+        inverse, uniq = pd.factorize(np.asarray(values, dtype=object).reshape(-1))
+        codes = np.fromiter((lookup.get(u, unknown) for u in uniq), dtype=np.intp, count=len(uniq))
+        return np.append(codes, unknown)[inverse]
+
+    def item_codes(self, items: Sequence[str]) -> np.ndarray:
+        return self._codes(items, self._item_codes, len(self.items))
+
+    def bin_codes(self, bins: Sequence[str]) -> np.ndarray:
+        return self._codes(bins, self._bin_codes, len(self.bins))
+
+    def bin_labels(self, codes: np.ndarray) -> np.ndarray:
+        return np.asarray(self.bins + ("",), dtype=object)[codes]
+
+
+def compile_routing(item_to_bin: Dict[str, str], bins: Sequence[str], default_bin: str = "Landfill") -> RoutingTable:
+    bins = tuple(bins)
+    missing = sorted({b for b in item_to_bin.values() if b not in bins} | ({default_bin} - set(bins)))
+    if missing:
+        raise ValueError(f"Routing rules use unknown bins: {', '.join(missing)}")
+    items = tuple(item_to_bin)
+    required = np.array([bins.index(item_to_bin[i]) for i in items] + [bins.index(default_bin)], dtype=np.intp)
+    return RoutingTable(items=items, bins=bins, required=required, default_bin=default_bin)
+
+
+ROUTING = compile_routing(ITEM_TO_BIN, BINS)
+
+
+@dataclass
+class BinBatchResult:
+    items: np.ndarray
+    chosen_bins: np.ndarray
+    required_codes: np.ndarray
+    chosen_codes: np.ndarray
+    is_correct_bin: np.ndarray
+    table: RoutingTable
+
+    def __len__(self) -> int:
+        return len(self.is_correct_bin)
+
+    def required_bins(self) -> np.ndarray:
+        return self.table.bin_labels(self.required_codes)
+
+    def message(self, i: int) -> str:
+        # rendered on demand, for the rows that are actually displayed
+        return _message(
+            str(self.items[i]),
+            self.table.bins[self.required_codes[i]],
+            str(self.chosen_bins[i]),
+            bool(self.is_correct_bin[i]),
+        )
+
+    def result(self, i: int) -> SmartBinResult:
         return SmartBinResult(
-            predicted_item=predicted_item,
+            predicted_item=str(self.items[i]),
             confidence=1.0,
-            is_correct_bin=True,
-            message=f"✅ Correct bin. {predicted_item} → {required_bin}",
+            is_correct_bin=bool(self.is_correct_bin[i]),
+            message=self.message(i),
         )
 
-    return SmartBinResult(
-        predicted_item=predicted_item,
-        confidence=1.0,
-        is_correct_bin=False,
-        message=f"🔴 Wrong bin! Detected {predicted_item} → should go to {required_bin} (not {chosen_bin})",
+
+def evaluate_bins(
+    predicted_items: Sequence[str],
+    chosen_bins: Sequence[str],
+    table: Optional[RoutingTable] = None,
+) -> BinBatchResult:
+    table = table or ROUTING
+    items = np.asarray(predicted_items, dtype=object).reshape(-1)
+    chosen = np.asarray(chosen_bins, dtype=object).reshape(-1)
+    if len(items) != len(chosen):
+        raise ValueError(f"{len(items)} items but {len(chosen)} bins")
+    required = table.required[table.item_codes(items)]
+    chosen_codes = table.bin_codes(chosen)
+    return BinBatchResult(
+        items=items,
+        chosen_bins=chosen,
+        required_codes=required,
+        chosen_codes=chosen_codes,
+        is_correct_bin=required == chosen_codes,
+        table=table,
     )
+
+
+def backfill_correctness(events, table: Optional[RoutingTable] = None):
+    # events: a DataFrame with "item" and "bin_used" columns; returns a copy
+    # with recommended_bin / is_correct_bin re-evaluated in one pass
+    out = events.copy()
+    if len(out) == 0:
+        return out
+    res = evaluate_bins(out["item"].astype(str).to_numpy(), out["bin_used"].astype(str).to_numpy(), table)
+    out["recommended_bin"] = res.required_bins()
+    out["is_correct_bin"] = res.is_correct_bin
+    return out
@@ -0,0 +1,195 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from logic.event_log import get_log
+from logic.event_summary import event_day
+
+# Optional SQLite backend for bin_storage (FOODSAVE_STORAGE=sqlite). Each
+# "<stem>.json" handle maps to "<stem>.sqlite3" in WAL mode. The full event
+# dict is kept as JSON; the fields we filter and aggregate on are copied into
+# indexed columns.
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    day TEXT NOT NULL,
+    timestamp TEXT,
+    item TEXT,
+    bin_used TEXT,
+    status TEXT,
+    weight_kg REAL NOT NULL DEFAULT 0,
+    is_correct_bin INTEGER,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_events_day ON events(day);
+CREATE INDEX IF NOT EXISTS idx_events_timestamp ON events(timestamp);
+CREATE INDEX IF NOT EXISTS idx_events_item ON events(item);
+CREATE INDEX IF NOT EXISTS idx_events_bin_used ON events(bin_used);
+CREATE INDEX IF NOT EXISTS idx_events_status ON events(status);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# set once the JSONL log has been carried over; an empty table after that
+# means the events were deleted, not that the import is still pending
+_MIGRATED_KEY = "jsonl_migrated_at"
+
+_INSERT = """
+INSERT INTO events (day, timestamp, item, bin_used, status, weight_kg, is_correct_bin, payload)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def db_path(path: str) -> str:
+    stem, _ = os.path.splitext(path)
+    return stem + ".sqlite3"
+
+
+def _row(event: Dict[str, Any]) -> tuple:
+    correct = event.get("is_correct_bin")
+    return (
+        event_day(event),
+        event.get("timestamp"),
+        event.get("item"),
+        event.get("bin_used"),
+        event.get("status"),
+        float(event.get("weight_kg", 0.0) or 0.0),
+        None if correct is None else int(bool(correct)),
+        json.dumps(event, ensure_ascii=False),
+    )
+
+
+def _range_clause(since: Optional[str], until: Optional[str]) -> tuple:
+    where, args = [], []
+    if since is not None:
+        where.append("day >= ?")
+        args.append(since)
+    if until is not None:
+        where.append("day <= ?")
+        args.append(until)
+    return (" WHERE " + " AND ".join(where)) if where else "", args
+
+
+class SqliteEventStore:
+    def __init__(self, path: str):
+        self.path = path
+        self.db = db_path(path)
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._ready = False
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db)), exist_ok=True)
+            conn = sqlite3.connect(self.db, timeout=30.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        if not self._ready:
+            self._ensure(conn)
+        return conn
+
+    def _ensure(self, conn: sqlite3.Connection) -> None:
+        with self._init_lock:
+            if self._ready:
+                return
+            conn.executescript(_SCHEMA)
+            # BEGIN IMMEDIATE: one process migrates, the others see the marker
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                done = conn.execute("SELECT 1 FROM meta WHERE key = ?", (_MIGRATED_KEY,)).fetchone()
+                if done is None:
+                    (n,) = conn.execute("SELECT COUNT(*) FROM events").fetchone()
+                    if n == 0:
+                        # first switch from the JSONL backend: carry existing data over
+                        conn.executemany(_INSERT, [_row(e) for e in get_log(self.path).read_all()])
+                    conn.execute(
+                        "INSERT INTO meta (key, value) VALUES (?, ?)",
+                        (_MIGRATED_KEY, datetime.now().isoformat(timespec="seconds")),
+                    )
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            self._ready = True
+
+    def _select(self, sql: str, args: Iterable[Any] = ()) -> List[Dict[str, Any]]:
+        return [json.loads(p) for (p,) in self._conn().execute(sql, list(args))]
+
+    def read_all(self) -> List[Dict[str, Any]]:
+        return self._select("SELECT payload FROM events ORDER BY id")
+
+    def days(self) -> List[str]:
+        return [d for (d,) in self._conn().execute("SELECT DISTINCT day FROM events ORDER BY day")]
+
+    def read_day(self, day: str) -> List[Dict[str, Any]]:
+        return self._select("SELECT payload FROM events WHERE day = ? ORDER BY id", (day,))
+
+    def read_range(self, since: Optional[str] = None, until: Optional[str] = None) -> List[Dict[str, Any]]:
+        where, args = _range_clause(since, until)
+        return self._select("SELECT payload FROM events" + where + " ORDER BY id", args)
+
+    def iter_range(self, since: Optional[str] = None, until: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        where, args = _range_clause(since, until)
+        cur = self._conn().execute("SELECT payload FROM events" + where + " ORDER BY id", args)
+        while True:
+            rows = cur.fetchmany(1000)
+            if not rows:
+                return
+            for (p,) in rows:
+                yield json.loads(p)
+
+    def read_recent(self, limit: int) -> List[Dict[str, Any]]:
+        rows = self._select("SELECT payload FROM events ORDER BY id DESC LIMIT ?", (int(limit),))
+        return rows[::-1]
+
+    def delete_day(self, day: str) -> None:
+        with self._conn() as conn:
+            conn.execute("DELETE FROM events WHERE day = ?", (day,))
+
+    def append(self, event: Dict[str, Any]) -> None:
+        self.append_many([event])
+
+    def append_many(self, events: Iterable[Dict[str, Any]]) -> None:
+        with self._conn() as conn:
+            conn.executemany(_INSERT, [_row(e) for e in events])
+
+    def rewrite(self, events: Iterable[Dict[str, Any]]) -> None:
+        with self._conn() as conn:
+            conn.execute("DELETE FROM events")
+            conn.executemany(_INSERT, [_row(e) for e in events])
+
+    def version(self, since: Optional[str] = None, until: Optional[str] = None) -> tuple:
+        self._conn()
+        sig = []
+        for f in (self.db, self.db + "-wal"):
+            if os.path.exists(f):
+                st = os.stat(f)
+                sig.append((st.st_mtime_ns, st.st_size))
+        return tuple(sig)
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+_STORES: Dict[str, SqliteEventStore] = {}
+_STORES_LOCK = threading.Lock()
+
+
+def get_sqlite_store(path: str) -> SqliteEventStore:
+    key = os.path.abspath(path)
+    with _STORES_LOCK:
+        store = _STORES.get(key)
+        if store is None:
+            store = _STORES[key] = SqliteEventStore(path)
+        return store
@@ -0,0 +1,353 @@
+import csv
+import json
+import os
+import re
+import threading
+from dataclasses import asdict, dataclass, replace
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from logic import archive
+from logic.demo_ml import RidgeState, _fit_ridge, _predict, downdate_ridge, ridge_state, update_ridge
+from logic.encodings import REGISTRY
+from logic.file_lock import lock_for
+
+# Offline training on app/data/training_history.csv plus its archived months
+# (see history_rows). Run from app/:
+#     python -m logic.train_model
+# Each run writes a new data/models/demand_ridge_vNNNN.json; the app loads the
+# highest version at startup and predicts with a dot product. Artifacts are
+# immutable once written. End-of-Day feedback goes to a local, untracked
+# demand_ridge_vNNNN.feedback.json: the RLS state (weights and precision)
+# after every submission so far, plus the observations keyed by
+# "<property_id>/<day>". A submission is one O(d^2) update (apply_feedback);
+# a resubmit first retracts the earlier observation for that property and
+# day (retract_feedback). Loading reads the stored state, no replay.
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))
+HISTORY_PATH = os.path.join(BASE_DIR, "data", "training_history.csv")
+MODELS_DIR = os.path.join(BASE_DIR, "data", "models")
+
+FEATURES = ["expected_guests", "occupancy_rate", "weather", "day_type", "event_level"]
+TARGET = "actual_cooked"
+_ARTIFACT_RE = re.compile(r"^demand_ridge_v(\d+)\.json$")
+
+
+@dataclass
+class DemandModel:
+    version: int
+    weights: List[float]
+    features: List[str]
+    encodings: Dict[str, Dict[str, float]]
+    lam: float
+    n_rows: int
+    holdout_r2: float
+    holdout_mae: float
+    trained_at: str
+    source: str
+    precision: Optional[List[List[float]]] = None
+    n_updates: int = 0
+    updated_at: Optional[str] = None
+
+
+def default_encodings() -> Dict[str, Dict[str, float]]:
+    return {name: REGISTRY[name].table("ml") for name in ("weather", "day_type", "event_level")}
+
+
+def _encode_row(row: Dict[str, str], encodings: Dict[str, Dict[str, float]]) -> List[float]:
+    return [
+        float(row["expected_guests"]),
+        float(row["occupancy_rate"]),
+        encodings["weather"].get(row["weather"], 1.0),
+        encodings["day_type"].get(row["day_type"], 1.0),
+        encodings["event_level"].get(row["event_level"], 1.0),
+    ]
+
+
+def history_rows(path: str = HISTORY_PATH, archive_dir: str = archive.ARCHIVE_DIR) -> List[Dict[str, object]]:
+    # months rolled into the Parquet archive (python -m logic.archive) are
+    # read from there, the rest from the CSV, so the CSV can be trimmed to
+    # the open months; rows come back in date order
+    name = archive.archive_name(path)
+    months = set(archive.list_partitions(name, "month", archive_dir))
+    rows: List[Dict[str, object]] = []
+    if months:
+        rows.extend(archive.read_training_history(name, archive_dir=archive_dir).to_dict("records"))
+    if os.path.exists(path):
+        with open(path, "r", newline="", encoding="utf-8") as f:
+            rows.extend(r for r in csv.DictReader(f) if r["date"][:7] not in months)
+    return sorted(rows, key=lambda r: str(r["date"]))
+
+
+def load_history(
+    path: str = HISTORY_PATH,
+    encodings: Optional[Dict[str, Dict[str, float]]] = None,
+    archive_dir: str = archive.ARCHIVE_DIR,
+) -> Tuple[np.ndarray, np.ndarray]:
+    encodings = encodings or default_encodings()
+    X, y = [], []
+    for row in history_rows(path, archive_dir):
+        X.append(_encode_row(row, encodings))
+        y.append(float(row[TARGET]))
+    return np.array(X, dtype=float).reshape(-1, len(FEATURES)), np.array(y, dtype=float)
+
+
+def train_from_history(path: str = HISTORY_PATH, lam: float = 1.0, holdout: float = 0.2) -> DemandModel:
+    encodings = default_encodings()
+    X, y = load_history(path, encodings)
+    if len(y) < 5:
+        raise ValueError(f"Not enough history rows to train on: {len(y)} in {path}")
+
+    # chronological holdout: the CSV is in date order, validate on the latest days
+    split = max(1, min(len(y) - 1, int(round(len(y) * (1.0 - holdout)))))
+    w_tr = _fit_ridge(X[:split], y[:split], lam=lam)
+    yhat = _predict(w_tr, X[split:])
+    yva = y[split:]
+    mae = float(np.mean(np.abs(yhat - yva)))
+    ss_res = float(np.sum((yva - yhat) ** 2))
+    ss_tot = float(np.sum((yva - np.mean(yva)) ** 2)) + 1e-9
+
+    state = ridge_state(X, y, lam=lam)
+
+    return DemandModel(
+        version=0,
+        weights=state.weights.tolist(),
+        features=list(FEATURES),
+        encodings=encodings,
+        lam=float(lam),
+        n_rows=int(len(y)),
+        holdout_r2=1.0 - ss_res / ss_tot,
+        holdout_mae=mae,
+        trained_at=datetime.now().isoformat(timespec="seconds"),
+        source=os.path.basename(path),
+        precision=state.precision.tolist(),
+    )
+
+
+def _base_model(path: str) -> DemandModel:
+    with open(path, "r", encoding="utf-8") as f:
+        return DemandModel(**json.load(f))
+
+
+def list_versions(models_dir: str = MODELS_DIR) -> List[int]:
+    if not os.path.isdir(models_dir):
+        return []
+    return sorted(int(m.group(1)) for m in map(_ARTIFACT_RE.match, os.listdir(models_dir)) if m)
+
+
+def artifact_path(version: int, models_dir: str = MODELS_DIR) -> str:
+    return os.path.join(models_dir, f"demand_ridge_v{version:04d}.json")
+
+
+def _write_artifact(model: DemandModel, path: str) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(asdict(model), f, indent=2)
+    os.replace(tmp, path)
+
+
+def save_model(model: DemandModel, models_dir: str = MODELS_DIR) -> str:
+    os.makedirs(models_dir, exist_ok=True)
+    versions = list_versions(models_dir)
+    model.version = (versions[-1] + 1) if versions else 1
+    path = artifact_path(model.version, models_dir)
+    _write_artifact(model, path)
+    return path
+
+
+def load_model(path: str) -> DemandModel:
+    model = _base_model(path)
+    if model.precision is None:
+        return model
+    state = read_feedback(model.version, os.path.dirname(path))["state"]
+    return model if state is None else replace(model, **state)
+
+
+_LOADED: Dict[str, Tuple[tuple, DemandModel]] = {}
+_LOADED_LOCK = threading.Lock()
+
+
+def _mtime(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def load_latest_model(models_dir: str = MODELS_DIR) -> Optional[DemandModel]:
+    versions = list_versions(models_dir)
+    if not versions:
+        return None
+    path = artifact_path(versions[-1], models_dir)
+    sig = (_mtime(path), _mtime(feedback_path(versions[-1], models_dir)))
+    with _LOADED_LOCK:
+        hit = _LOADED.get(path)
+        if hit is not None and hit[0] == sig:
+            return hit[1]
+    model = load_model(path)
+    with _LOADED_LOCK:
+        _LOADED[path] = (sig, model)
+    return model
+
+
+def encode_features(
+    model: DemandModel,
+    expected_guests: int,
+    occupancy_rate: float,
+    weather: str,
+    day_type: str,
+    event_level: str,
+) -> List[float]:
+    return _encode_row(
+        {
+            "expected_guests": expected_guests,
+            "occupancy_rate": occupancy_rate,
+            "weather": weather,
+            "day_type": day_type,
+            "event_level": event_level,
+        },
+        model.encodings,
+    )
+
+
+def _rls_step(model: DemandModel, step, x: List[float], y: float) -> DemandModel:
+    # step: update_ridge (add an observation) or downdate_ridge (remove one)
+    if model.precision is None:
+        raise ValueError(f"Model v{model.version} has no precision matrix; retrain it with python -m logic.train_model")
+    state = RidgeState(
+        weights=np.array(model.weights, dtype=float),
+        precision=np.array(model.precision, dtype=float),
+        n_obs=model.n_rows + model.n_updates,
+    )
+    state = step(state, np.array(x, dtype=float), float(y))
+    return replace(
+        model,
+        weights=state.weights.tolist(),
+        precision=state.precision.tolist(),
+        n_updates=state.n_obs - model.n_rows,
+        updated_at=datetime.now().isoformat(timespec="seconds"),
+    )
+
+
+def apply_feedback(
+    model: DemandModel,
+    expected_guests: int,
+    occupancy_rate: float,
+    weather: str,
+    day_type: str,
+    event_level: str,
+    actual_cooked: int,
+) -> DemandModel:
+    x = encode_features(model, expected_guests, occupancy_rate, weather, day_type, event_level)
+    return _rls_step(model, update_ridge, x, actual_cooked)
+
+
+def retract_feedback(
+    model: DemandModel,
+    expected_guests: int,
+    occupancy_rate: float,
+    weather: str,
+    day_type: str,
+    event_level: str,
+    actual_cooked: int,
+) -> DemandModel:
+    # removes an observation added by apply_feedback
+    x = encode_features(model, expected_guests, occupancy_rate, weather, day_type, event_level)
+    return _rls_step(model, downdate_ridge, x, actual_cooked)
+
+
+def feedback_path(version: int, models_dir: str = MODELS_DIR) -> str:
+    return os.path.join(models_dir, f"demand_ridge_v{version:04d}.feedback.json")
+
+
+_STATE_FIELDS = ("weights", "precision", "n_updates", "updated_at")
+
+
+def read_feedback(version: int, models_dir: str = MODELS_DIR) -> Dict[str, Any]:
+    # {"state": DemandModel fields after the last submission, or None,
+    #  "observations": {"<property_id>/<day>": apply_feedback kwargs}}
+    path = feedback_path(version, models_dir)
+    if not os.path.exists(path):
+        return {"state": None, "observations": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        raw = json.load(f)
+    return {"state": raw.get("state"), "observations": raw.get("observations", {})}
+
+
+def save_feedback(
+    version: int,
+    property_id: str,
+    day: str,
+    expected_guests: int,
+    occupancy_rate: float,
+    weather: str,
+    day_type: str,
+    event_level: str,
+    actual_cooked: int,
+    models_dir: str = MODELS_DIR,
+) -> DemandModel:
+    # one observation per property and day; a retrain creates the next
+    # version, which starts with no feedback
+    path = feedback_path(version, models_dir)
+    with lock_for(os.path.splitext(path)[0] + ".lock"):
+        feedback = read_feedback(version, models_dir)
+        model = _base_model(artifact_path(version, models_dir))
+        if feedback["state"] is not None:
+            model = replace(model, **feedback["state"])
+        key = f"{property_id}/{day}"
+        old = feedback["observations"].get(key)
+        if old is not None:
+            model = retract_feedback(model, **old)
+        obs = {
+            "expected_guests": int(expected_guests),
+            "occupancy_rate": float(occupancy_rate),
+            "weather": weather,
+            "day_type": day_type,
+            "event_level": event_level,
+            "actual_cooked": int(actual_cooked),
+        }
+        model = apply_feedback(model, **obs)
+        feedback["observations"][key] = obs
+        payload = {
+            "version": version,
+            "state": {name: getattr(model, name) for name in _STATE_FIELDS},
+            "observations": feedback["observations"],
+        }
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2)
+        os.replace(tmp, path)
+    return model
+
+
+def predict_model(
+    model: DemandModel,
+    expected_guests: int,
+    occupancy_rate: float,
+    weather: str,
+    day_type: str,
+    event_level: str,
+) -> int:
+    w = model.weights
+    enc = model.encodings
+    pred = (
+        w[0]
+        + w[1] * float(expected_guests)
+        + w[2] * float(occupancy_rate)
+        + w[3] * enc["weather"].get(weather, 1.0)
+        + w[4] * enc["day_type"].get(day_type, 1.0)
+        + w[5] * enc["event_level"].get(event_level, 1.0)
+    )
+    return max(10, int(round(pred)))
+
+
+def main():
+    model = train_from_history()
+    path = save_model(model)
+    print("Wrote:", path, "rows:", model.n_rows, f"holdout R2={model.holdout_r2:.3f} MAE={model.holdout_mae:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import asyncio
+import json
+
+import pytest
+
+import api
+from logic import properties
+from logic.properties import Property, PropertyRegistry
+
+
+def _call(method, path, body=None, query=""):
+    # drive the ASGI app directly: one request, collect status and JSON body
+    raw = json.dumps(body).encode("utf-8") if body is not None else b""
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": raw, "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": method, "path": path, "query_string": query.encode("latin-1")}
+    asyncio.run(api.app(scope, receive, send))
+    return sent[0]["status"], json.loads(sent[1]["body"])
+
+
+@pytest.fixture
+def prop(tmp_path, monkeypatch):
+    monkeypatch.setattr(properties, "PROPERTIES_DIR", str(tmp_path / "properties"))
+    registry = PropertyRegistry(str(tmp_path / "properties.json"))
+    monkeypatch.setattr(api, "PROPERTIES", registry)
+    return registry.register(Property(property_id="test-hotel", name="Test Hotel"))
+
+
+def _event(**overrides):
+    event = {"timestamp": "2024-01-01T12:00:00", "item": "Rice", "weight_kg": 1.5, "bin_used": "Compost"}
+    event.update(overrides)
+    return event
+
+
+def test_event_roundtrip(prop):
+    status, body = _call("POST", "/properties/test-hotel/events", _event())
+    assert status == 200
+    assert body["accepted"] == 1 and body["event"]["recommended_bin"] == "Compost"
+
+    status, body = _call("GET", "/properties/test-hotel/summary", query="since=2024-01-01&until=2024-01-01")
+    assert (status, body["count"], body["total_kg"]) == (200, 1, 1.5)
+
+
+@pytest.mark.parametrize("path", ["/properties/test-hotel/events", "/properties/test-hotel/readings"])
+@pytest.mark.parametrize("weight", [-1, "heavy", "nan", None])
+def test_invalid_weights_are_refused(prop, path, weight):
+    payload = _event(weight_kg=weight, bin_id="b1")
+    if path.endswith("readings"):
+        payload = {"readings": [payload]}
+    status, body = _call("POST", path, payload)
+    assert status == 400, body
+    assert "weight_kg" in body["error"]
+    assert _call("GET", "/properties/test-hotel/summary")[1]["count"] == 0
+
+
+def test_bad_requests(prop):
+    assert _call("POST", "/properties/test-hotel/events", _event(timestamp="../../x"))[0] == 400
+    assert _call("POST", "/properties/test-hotel/events", {"item": "Rice"})[0] == 400
+    assert _call("GET", "/health", query="")[0] == 200
+    assert _call("DELETE", "/health")[0] == 405
+
+
+def test_unknown_resources_are_404(prop):
+    assert _call("GET", "/properties/nope/summary")[0] == 404
+    assert _call("GET", "/no/such/route")[0] == 404
+    status, _ = _call("POST", "/properties/test-hotel/pickups/missing/transition", {"status": "ACCEPTED"})
+    assert status == 404
+
+
+def test_pickup_state_conflict_is_409(prop):
+    status, req = _call("POST", "/properties/test-hotel/pickups", {"waste_stream": "Compost", "estimated_kg": 4})
+    assert status == 200
+    path = f"/properties/test-hotel/pickups/{req['request_id']}/transition"
+
+    assert _call("POST", path, {"status": "WEIGHED", "kg": 4})[0] == 409
+    status, body = _call("POST", path, {"status": "ACCEPTED"})
+    assert (status, body["status"]) == (200, "ACCEPTED")
+    assert _call("POST", path, {"status": "ACCEPTED"})[0] == 409
+
+
+def test_schedule_refuses_bad_timestamps():
+    request = {"waste_stream": "Compost", "estimated_kg": 5, "timestamp": "bad"}
+    status, body = _call("POST", "/recyclers/schedule", {"requests": [request]})
+    assert status == 400 and "timestamp" in body["error"]
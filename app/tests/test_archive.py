@@ -0,0 +1,107 @@
+import csv
+import os
+
+import pytest
+
+from logic import archive
+from logic.archive import archive_training_history, list_partitions
+from logic.bin_storage import (
+    append_events,
+    archive_closed_days,
+    list_days,
+    read_events_frame,
+    summarize_events,
+)
+from logic.event_summary import summary_path
+from logic.rollups import RollupStore
+from logic.train_model import load_history
+
+pytest.importorskip("pyarrow")
+
+
+def _event(day, kg=1.0, item="Rice", correct=True):
+    return {"timestamp": f"{day}T12:00:00", "item": item, "weight_kg": kg, "is_correct_bin": correct}
+
+
+@pytest.fixture
+def archive_dir(tmp_path, monkeypatch):
+    out = str(tmp_path / "archive")
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", out)
+    return out
+
+
+@pytest.fixture
+def archived(events_path, archive_dir):
+    append_events(events_path, [
+        _event("2024-01-01", 1.0),
+        _event("2024-01-01", 3.0, correct=False),
+        _event("2024-01-02", 2.0),
+    ])
+    assert archive_closed_days(events_path, before="2024-01-02", archive_dir=archive_dir) == ["2024-01-01"]
+    return events_path
+
+
+def test_archiving_keeps_summary_totals(archived, archive_dir):
+    assert list_days(archived) == ["2024-01-02"]
+    day = summarize_events(archived, "2024-01-01", "2024-01-01")
+    assert (day.count, day.total_kg, day.wrong_bin_kg) == (2, pytest.approx(4.0), pytest.approx(3.0))
+    assert summarize_events(archived).total_kg == pytest.approx(6.0)
+    assert read_events_frame(archived, archive_dir=archive_dir)["weight_kg"].sum() == pytest.approx(6.0)
+
+
+def test_late_events_for_an_archived_day_add_to_its_totals(archived, archive_dir):
+    append_events(archived, [_event("2024-01-01", 0.5)])
+    assert summarize_events(archived, "2024-01-01", "2024-01-01").total_kg == pytest.approx(4.5)
+
+    archive_closed_days(archived, before="2024-01-02", archive_dir=archive_dir)
+
+    assert list_days(archived) == ["2024-01-02"]
+    assert summarize_events(archived, "2024-01-01", "2024-01-01").total_kg == pytest.approx(4.5)
+    frame = read_events_frame(archived, "2024-01-01", "2024-01-01", archive_dir=archive_dir)
+    assert frame["weight_kg"].sum() == pytest.approx(4.5)
+
+
+def test_lost_sidecar_is_rebuilt_with_archived_days(archived):
+    os.remove(summary_path(archived))
+    s = summarize_events(archived, "2024-01-01", "2024-01-01")
+    assert (s.count, s.total_kg, s.wrong_bin_kg) == (2, pytest.approx(4.0), pytest.approx(3.0))
+
+
+def test_rollups_keep_archived_days(events_path, archive_dir, tmp_path):
+    append_events(events_path, [_event("2024-01-01", 3.0, correct=False), _event("2024-01-02", 2.0)])
+    store = RollupStore(str(tmp_path / "rollups.json"))
+    store.track("p1", events_path)
+    assert store.get("p1", "2024-01-01").measured_kg == pytest.approx(3.0)
+
+    archive_closed_days(events_path, before="2024-01-02", archive_dir=archive_dir)
+
+    r = store.get("p1", "2024-01-01")
+    assert (r.measured_kg, r.wrong_bin_kg, r.archived) == (pytest.approx(3.0), pytest.approx(3.0), True)
+    assert store.get("p1", "2024-01-02").archived is False
+
+
+def test_training_reads_archived_months(tmp_path, archive_dir):
+    path = str(tmp_path / "training_history.csv")
+    fields = ["date", "expected_guests", "occupancy_rate", "weather", "day_type", "event_level", "actual_cooked"]
+    rows = [
+        ["2024-01-30", 300, 0.6, "Sunny", "Weekday", "None", 280],
+        ["2024-01-31", 320, 0.7, "Rainy", "Weekend", "Conference", 310],
+        ["2024-02-01", 340, 0.8, "Sunny", "Weekday", "None", 330],
+    ]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(fields)
+        w.writerows(rows)
+    X_csv, y_csv = load_history(path, archive_dir=archive_dir)
+
+    archive_training_history(path, archive_dir)
+    assert list_partitions(archive.archive_name(path), "month", archive_dir) == ["2024-01", "2024-02"]
+    # trim the archived January rows from the CSV
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(fields)
+        w.writerow(rows[2])
+
+    X, y = load_history(path, archive_dir=archive_dir)
+    assert X.tolist() == X_csv.tolist()
+    assert y.tolist() == y_csv.tolist()
@@ -0,0 +1,80 @@
+import os
+
+import pytest
+
+from logic import bin_storage
+from logic.bin_storage import (
+    append_events,
+    delete_day,
+    iter_events,
+    list_days,
+    load_events,
+    load_events_for_day,
+    load_events_range,
+    summarize_events,
+)
+from logic.event_summary import summarize
+
+
+def _event(day, kg=1.0, item="Rice", correct=True):
+    return {"timestamp": f"{day}T12:00:00", "item": item, "weight_kg": kg, "is_correct_bin": correct}
+
+
+@pytest.fixture(params=["jsonl", "sqlite"])
+def backend(request, monkeypatch):
+    monkeypatch.setattr(bin_storage, "STORAGE_BACKEND", request.param)
+    return request.param
+
+
+def test_append_then_read_back(backend, events_path):
+    events = [_event("2024-01-01"), _event("2024-01-02", 2.0), _event("2024-01-01", 0.5, "Bread")]
+    append_events(events_path, events)
+
+    assert load_events_for_day(events_path, "2024-01-01") == [events[0], events[2]]
+    assert load_events_for_day(events_path, "2024-01-03") == []
+    assert list_days(events_path) == ["2024-01-01", "2024-01-02"]
+    assert sorted(e["weight_kg"] for e in load_events(events_path)) == [0.5, 1.0, 2.0]
+    assert load_events_range(events_path, "2024-01-02", "2024-01-02") == [events[1]]
+
+
+def test_delete_day_drops_events_and_totals(backend, events_path):
+    append_events(events_path, [_event("2024-01-01", 1.0, correct=False), _event("2024-01-02", 2.0)])
+    assert summarize_events(events_path).total_kg == pytest.approx(3.0)
+
+    delete_day(events_path, "2024-01-01")
+
+    assert load_events_for_day(events_path, "2024-01-01") == []
+    assert list_days(events_path) == ["2024-01-02"]
+    s = summarize_events(events_path)
+    assert (s.count, s.total_kg, s.wrong_bin_kg) == (1, pytest.approx(2.0), 0.0)
+    # the sidecar agrees with a full scan of what's left
+    assert summarize(load_events(events_path)).total_kg == pytest.approx(s.total_kg)
+
+
+def test_delete_then_append_same_day(backend, events_path):
+    append_events(events_path, [_event("2024-01-01")])
+    delete_day(events_path, "2024-01-01")
+    append_events(events_path, [_event("2024-01-01", 4.0)])
+
+    assert [e["weight_kg"] for e in load_events_for_day(events_path, "2024-01-01")] == [4.0]
+    assert summarize_events(events_path, "2024-01-01", "2024-01-01").total_kg == pytest.approx(4.0)
+
+
+@pytest.mark.parametrize("timestamp", ["../../../x", "2024-13-01T00:00:00", "2024/01/01"])
+def test_rejects_timestamps_that_are_not_days(events_path, timestamp):
+    with pytest.raises(ValueError):
+        append_events(events_path, [{"timestamp": timestamp, "weight_kg": 1.0}])
+    assert list_days(events_path) == []
+    with pytest.raises(ValueError):
+        load_events_for_day(events_path, "../x")
+
+
+def test_iter_range_skips_a_segment_deleted_mid_stream(events_path):
+    append_events(events_path, [_event(f"2024-01-0{d}") for d in (1, 2, 3)])
+    it = iter_events(events_path)
+    assert next(it)["timestamp"].startswith("2024-01-01")
+
+    delete_day(events_path, "2024-01-02")
+
+    assert [e["timestamp"][:10] for e in it] == ["2024-01-03"]
+    assert not os.path.exists(os.path.join(os.path.splitext(events_path)[0] + ".log", "2024-01-02.jsonl"))
@@ -0,0 +1,78 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from logic.demand_engine import BATCH_COLUMNS, DemandInputs, estimate_portions, estimate_portions_batch
+from logic.encodings import DEFAULT_SPEC, REGISTRY, EncodingRegistry
+
+MEALS = ["Breakfast", "Lunch buffet", "Dinner"]
+WEATHER = ["Sunny", "rainy", "Storm", "Hail"]
+DAY_TYPES = ["Weekday", "Holiday", "Unknown"]
+EVENTS = ["None", "High"]
+GUESTS = [0, 5, 120, 480]
+OCCUPANCY = [-0.2, 0.0, 0.55, 1.0, 1.4]
+
+
+def _grid() -> pd.DataFrame:
+    rows = itertools.product(MEALS, GUESTS, OCCUPANCY, WEATHER, DAY_TYPES, EVENTS)
+    return pd.DataFrame(list(rows), columns=list(BATCH_COLUMNS))
+
+
+def _scalar(row, registry=REGISTRY):
+    return estimate_portions(DemandInputs(**row), registry)
+
+
+def test_batch_matches_scalar_estimate():
+    df = _grid()
+    batch = estimate_portions_batch(df)
+
+    assert len(batch) == len(df)
+    for i, row in enumerate(df.to_dict("records")):
+        one = _scalar(row)
+        out = batch.output(i, explain=True)
+        assert (out.recommended_portions, out.baseline_portions) == (one.recommended_portions, one.baseline_portions)
+        assert out.demand_multiplier == pytest.approx(one.demand_multiplier)
+        assert out.explanation == one.explanation
+
+
+def test_explanations_are_lazy():
+    batch = estimate_portions_batch(_grid().head(3))
+    assert batch.output(0).explanation == []
+    assert batch.explanation(0)[0].startswith("Baseline")
+
+
+def test_scalars_broadcast_and_codes_match_labels():
+    labels = estimate_portions_batch({
+        "target_meal": "Lunch",
+        "expected_guests": [100, 200, 300],
+        "occupancy_rate": 0.8,
+        "weather": ["Sunny", "Rainy", "Storm"],
+        "day_type": "Weekend",
+        "event_level": "Medium",
+    })
+    codes = estimate_portions_batch({
+        "target_meal": 1,
+        "expected_guests": np.array([100, 200, 300]),
+        "occupancy_rate": 0.8,
+        "weather": np.array([0, 2, 3]),
+        "day_type": 1,
+        "event_level": 1,
+    }, n=3)
+    assert labels.recommended_portions.tolist() == codes.recommended_portions.tolist()
+    assert len(labels) == 3
+
+
+def test_property_registry_changes_the_factors():
+    spec = {**DEFAULT_SPEC, "weather": {**DEFAULT_SPEC["weather"], "factors": {
+        "demand": [1.2, 1.2, 1.2, 1.2], "ml": [1.0, 1.0, 1.0, 1.0],
+    }}}
+    registry = EncodingRegistry(spec)
+    row = {"target_meal": "Lunch", "expected_guests": 200, "occupancy_rate": 0.5,
+           "weather": "Rainy", "day_type": "Weekday", "event_level": "None"}
+
+    batch = estimate_portions_batch(pd.DataFrame([row]), registry=registry)
+
+    assert batch.recommended_portions[0] == _scalar(row, registry).recommended_portions
+    assert batch.recommended_portions[0] > _scalar(row).recommended_portions
@@ -0,0 +1,108 @@
+import asyncio
+import json
+
+import pytest
+
+from logic.bin_storage import summarize_events
+from logic.ingest import IngestPipeline, Reading, process_batch, replay_dead_letters
+
+
+def _reading(path, i=0, kg=0.25):
+    return Reading(f"bin-{i % 3}", path, "Rice", "Compost", kg, timestamp="2024-01-01T12:00:00")
+
+
+@pytest.fixture
+def dead_letter_path(tmp_path):
+    return str(tmp_path / "ingest_dead_letter.jsonl")
+
+
+class FlakyWrite:
+    # records every write; fails the first `failures` calls (all calls when None)
+    def __init__(self, failures=0, bad_path=None):
+        self.failures = failures
+        self.bad_path = bad_path
+        self.calls = []
+
+    def __call__(self, path, events):
+        self.calls.append((path, len(events)))
+        if path == self.bad_path or self.failures is None or len(self.calls) <= self.failures:
+            raise OSError("disk full")
+
+
+def _run(pipeline, readings):
+    async def go():
+        await pipeline.start()
+        for r in readings:
+            await pipeline.submit(r)
+        await pipeline.stop()
+        return pipeline.stats
+
+    return asyncio.run(go())
+
+
+def test_readings_are_written_in_micro_batches(events_path, dead_letter_path):
+    pipeline = IngestPipeline(batch_size=4, linger_s=0.01, workers=1, dead_letter_path=dead_letter_path)
+    stats = _run(pipeline, [_reading(events_path, i) for i in range(10)])
+
+    assert (stats.received, stats.written, stats.failed) == (10, 10, 0)
+    assert stats.batches >= 3
+    s = summarize_events(events_path)
+    assert (s.count, s.total_kg) == (10, pytest.approx(2.5))
+
+
+def test_batches_never_exceed_batch_size(events_path, dead_letter_path):
+    write = FlakyWrite()
+    pipeline = IngestPipeline(batch_size=4, linger_s=0.05, workers=2, write=write, dead_letter_path=dead_letter_path)
+    _run(pipeline, [_reading(events_path, i) for i in range(25)])
+
+    assert sum(n for _, n in write.calls) == 25
+    assert max(n for _, n in write.calls) <= 4
+
+
+def test_full_queue_pushes_back():
+    async def go():
+        # no workers: nothing drains the queue
+        pipeline = await IngestPipeline(queue_size=2, workers=0).start()
+        assert pipeline.try_submit(_reading("x")) and pipeline.try_submit(_reading("x"))
+        assert not pipeline.try_submit(_reading("x"))
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(pipeline.submit(_reading("x")), 0.05)
+        return pipeline
+
+    pipeline = asyncio.run(go())
+    assert (pipeline.stats.received, pipeline.stats.dropped, pipeline.backlog()) == (2, 1, 2)
+
+
+def test_a_failed_write_is_retried(events_path):
+    write = FlakyWrite(failures=1)
+    written, failed = process_batch([_reading(events_path, i) for i in range(3)], write, retries=2, backoff_s=0)
+    assert (written, failed) == (3, [])
+    assert write.calls == [(events_path, 3), (events_path, 3)]
+
+
+def test_a_failing_log_does_not_take_other_logs_down(tmp_path):
+    good, bad = str(tmp_path / "good.json"), str(tmp_path / "bad.json")
+    write = FlakyWrite(bad_path=bad)
+    readings = [_reading(good, 0), _reading(bad, 1), _reading(good, 2)]
+
+    written, failed = process_batch(readings, write, retries=1, backoff_s=0)
+
+    assert written == 2
+    assert failed == [readings[1]]
+    assert write.calls.count((good, 2)) == 1
+
+
+def test_dead_letters_are_kept_and_replayed(events_path, dead_letter_path):
+    write = FlakyWrite(failures=None)
+    pipeline = IngestPipeline(batch_size=8, linger_s=0.01, workers=1, write=write, dead_letter_path=dead_letter_path)
+    stats = _run(pipeline, [_reading(events_path, i, kg=1.0) for i in range(5)])
+
+    assert (stats.written, stats.failed) == (0, 5)
+    with open(dead_letter_path, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f]
+    assert len(rows) == 5 and all(row["error"] and row["events_path"] == events_path for row in rows)
+
+    assert replay_dead_letters(dead_letter_path) == (5, 0)
+    assert summarize_events(events_path).total_kg == pytest.approx(5.0)
+    with open(dead_letter_path, encoding="utf-8") as f:
+        assert f.read() == ""
@@ -0,0 +1,133 @@
+import pytest
+
+from logic import pickups
+from logic.bin_storage import delete_day
+from logic.pickups import (
+    ACCEPTED,
+    COLLECTED,
+    REQUESTED,
+    WEIGHED,
+    PickupIndex,
+    TransitionError,
+    create_request,
+    load_index,
+    open_requests,
+    rebuild_index,
+    transition,
+)
+
+
+@pytest.fixture
+def requests_path(tmp_path):
+    return str(tmp_path / "recycler_requests.json")
+
+
+def _create(path, day="2024-01-01", kg=5.0, partner="R1"):
+    return create_request(path, "Compost", kg, partner, timestamp=f"{day}T09:00:00")
+
+
+def _fresh(path):
+    # what another process sees: no cached fold, only the files on disk
+    pickups._CACHE.clear()
+    return load_index(path)
+
+
+def test_full_lifecycle(requests_path):
+    req = _create(requests_path)
+    assert req.status == REQUESTED
+
+    transition(requests_path, req.request_id, ACCEPTED)
+    transition(requests_path, req.request_id, COLLECTED, kg=4.5)
+    done = transition(requests_path, req.request_id, WEIGHED, kg=4.2)
+
+    assert (done.status, done.collected_kg, done.weighed_kg) == (WEIGHED, 4.5, 4.2)
+    assert set(done.status_at) == {REQUESTED, ACCEPTED, COLLECTED, WEIGHED}
+    assert open_requests(requests_path) == []
+
+
+@pytest.mark.parametrize("steps, bad", [
+    ([], COLLECTED),
+    ([], WEIGHED),
+    ([ACCEPTED], REQUESTED),
+    ([ACCEPTED], ACCEPTED),
+])
+def test_invalid_transitions_are_refused(requests_path, steps, bad):
+    req = _create(requests_path)
+    for status in steps:
+        transition(requests_path, req.request_id, status)
+    with pytest.raises(TransitionError):
+        transition(requests_path, req.request_id, bad)
+    assert load_index(requests_path).get(req.request_id).status == (steps[-1] if steps else REQUESTED)
+
+
+def test_weighed_needs_kg(requests_path):
+    req = _create(requests_path)
+    transition(requests_path, req.request_id, ACCEPTED)
+    transition(requests_path, req.request_id, COLLECTED)
+    with pytest.raises(TransitionError):
+        transition(requests_path, req.request_id, WEIGHED)
+
+
+def test_unknown_request(requests_path):
+    _create(requests_path)
+    with pytest.raises(KeyError):
+        transition(requests_path, "nope", ACCEPTED)
+
+
+def test_status_index_by_partner(requests_path):
+    a = _create(requests_path, partner="R1")
+    b = _create(requests_path, partner="R2")
+    transition(requests_path, b.request_id, ACCEPTED)
+
+    index = load_index(requests_path)
+    assert [r.request_id for r in index.with_status(REQUESTED)] == [a.request_id]
+    assert [r.request_id for r in index.with_status(REQUESTED, ACCEPTED, partner_id="R2")] == [b.request_id]
+    assert index.counts() == {REQUESTED: 1, ACCEPTED: 1, COLLECTED: 0, WEIGHED: 0}
+
+
+def test_delta_and_compaction_match_a_rebuild(requests_path, monkeypatch):
+    monkeypatch.setattr(pickups, "COMPACT_EVERY", 4)
+    ids = [_create(requests_path, day=f"2024-01-0{1 + i % 3}").request_id for i in range(9)]
+    for rid in ids[:5]:
+        transition(requests_path, rid, ACCEPTED)
+
+    seen = {rid: r.status for rid, r in _fresh(requests_path).requests.items()}
+    rebuilt = {rid: r.status for rid, r in rebuild_index(requests_path).requests.items()}
+    assert seen == rebuilt
+    assert sum(s == ACCEPTED for s in seen.values()) == 5
+
+
+def test_log_changed_outside_the_module_triggers_a_rebuild(requests_path):
+    _create(requests_path, day="2024-01-01")
+    keep = _create(requests_path, day="2024-01-02")
+    load_index(requests_path)
+
+    delete_day(requests_path, "2024-01-01")
+
+    assert [r.request_id for r in load_index(requests_path).with_status(REQUESTED)] == [keep.request_id]
+
+
+def test_transition_on_a_future_dated_request_survives_a_rebuild(requests_path):
+    req = _create(requests_path, day="2099-01-01")
+    transition(requests_path, req.request_id, ACCEPTED)
+
+    assert rebuild_index(requests_path).get(req.request_id).status == ACCEPTED
+    assert _fresh(requests_path).get(req.request_id).status == ACCEPTED
+
+
+def test_fold_buffers_transitions_replayed_before_their_request():
+    index = PickupIndex()
+    index.apply([
+        {"timestamp": "2024-01-01T10:00:00", "request_id": "r1", "status": ACCEPTED, "transition": True},
+        {"timestamp": "2024-01-02T09:00:00", "request_id": "r1", "status": REQUESTED, "partner_id": "R1"},
+    ])
+    assert index.get("r1").status == ACCEPTED
+    assert index.counts() == {REQUESTED: 0, ACCEPTED: 1, COLLECTED: 0, WEIGHED: 0}
+
+
+def test_duplicate_legacy_records_are_indexed_once():
+    legacy = {"timestamp": "2024-01-01T09:00:00", "waste_stream": "Compost", "estimated_kg": 2.0}
+    index = PickupIndex()
+    index.apply([dict(legacy), dict(legacy)])
+    assert len(index.requests) == 1
+    assert len(index.with_status(REQUESTED)) == 1
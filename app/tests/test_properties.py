@@ -0,0 +1,63 @@
+import pytest
+
+from logic import properties
+from logic.bin_storage import append_events, summarize_events
+from logic.properties import DEFAULT_PROPERTY, Property, PropertyRegistry, group_waste, map_properties
+
+
+def _event(day, kg, correct=True):
+    return {"timestamp": f"{day}T12:00:00", "item": "Rice", "weight_kg": kg, "is_correct_bin": correct}
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    monkeypatch.setattr(properties, "DATA_DIR", str(tmp_path / "data"))
+    monkeypatch.setattr(properties, "PROPERTIES_DIR", str(tmp_path / "data" / "properties"))
+    registry = PropertyRegistry(str(tmp_path / "properties.json"))
+    registry.register(Property(property_id="north", name="North"))
+    registry.register(Property(property_id="south", name="South", city="Phuket"))
+    return registry
+
+
+def test_registry_roundtrip(registry):
+    fresh = PropertyRegistry(registry.path)
+    assert fresh.ids() == [DEFAULT_PROPERTY, "north", "south"]
+    assert fresh.get("south").city == "Phuket"
+    with pytest.raises(KeyError, match="Unknown property"):
+        fresh.get("west")
+
+
+@pytest.mark.parametrize("property_id", ["", "Upper", "../etc", "-lead", "x" * 65])
+def test_invalid_ids_are_refused(registry, property_id):
+    with pytest.raises(ValueError):
+        registry.register(Property(property_id=property_id, name="Bad"))
+
+
+def test_partitions_are_isolated(registry):
+    north, south = registry.get("north"), registry.get("south")
+    assert north.bin_events_path != south.bin_events_path
+
+    append_events(north.bin_events_path, [_event("2024-01-01", 2.0)])
+
+    assert summarize_events(north.bin_events_path).count == 1
+    assert summarize_events(south.bin_events_path).count == 0
+
+
+def test_group_waste_totals_the_partitions(registry):
+    append_events(registry.get("north").bin_events_path, [_event("2024-01-01", 2.0), _event("2024-01-02", 1.0, False)])
+    append_events(registry.get("south").bin_events_path, [_event("2024-01-01", 3.5, False)])
+    append_events(registry.get(DEFAULT_PROPERTY).bin_events_path, [_event("2024-01-03", 0.5)])
+
+    group = group_waste(registry=registry)
+    assert set(group.by_property) == {DEFAULT_PROPERTY, "north", "south"}
+    assert (group.total.count, group.total.total_kg, group.total.wrong_bin_kg) == (4, pytest.approx(7.0), pytest.approx(4.5))
+
+    subset = group_waste(since="2024-01-01", until="2024-01-01", property_ids=["north", "south"], registry=registry)
+    assert set(subset.by_property) == {"north", "south"}
+    assert subset.total.total_kg == pytest.approx(5.5)
+
+
+def test_map_properties_keeps_registry_order(registry):
+    assert list(map_properties(lambda p: p.name, registry=registry, max_workers=2).values()) == [
+        properties.DEFAULT.name, "North", "South",
+    ]
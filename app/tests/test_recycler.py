@@ -0,0 +1,101 @@
+import pytest
+
+from logic.recycler import PartnerIndex, RecyclerPartner, schedule_requests
+
+
+@pytest.fixture
+def index():
+    return PartnerIndex([
+        RecyclerPartner("P1", "Early", ["Compost"], "10:00-12:00", "", capacity_kg=100.0),
+        RecyclerPartner("P2", "Late", ["Compost"], "18:00-20:00", "", capacity_kg=50.0),
+        RecyclerPartner("P3", "Glass", ["Recycle"], "09:00-17:00", "", capacity_kg=10.0),
+    ])
+
+
+def _req(kg, stream="Compost", ts="2024-01-01T08:00:00", partner=None):
+    return {"waste_stream": stream, "estimated_kg": kg, "timestamp": ts, "partner_id": partner}
+
+
+def _load(assignments):
+    out = {}
+    for a in assignments:
+        if a.partner_id:
+            out[(a.partner_id, a.day)] = out.get((a.partner_id, a.day), 0.0) + a.request["estimated_kg"]
+    return out
+
+
+def test_never_exceeds_daily_capacity(index):
+    assignments = schedule_requests([_req(kg) for kg in (60, 50, 40, 30, 20)], index)
+
+    load = _load(assignments)
+    assert all(kg <= index.by_id[pid].capacity_kg for (pid, _), kg in load.items())
+    # first-fit decreasing: 60+40 fill P1, 50 fills P2; 30 and 20 don't fit
+    # that day and roll over to the next day's earliest window
+    assert [(a.request["estimated_kg"], a.partner_id, a.day) for a in assignments] == [
+        (60, "P1", "2024-01-01"), (50, "P2", "2024-01-01"), (40, "P1", "2024-01-01"),
+        (30, "P1", "2024-01-02"), (20, "P1", "2024-01-02"),
+    ]
+
+
+def test_nothing_left_on_either_day(index):
+    assignments = schedule_requests([_req(8, stream="Recycle") for _ in range(3)], index)
+    assert [(a.partner_id, a.day) for a in assignments] == [
+        ("P3", "2024-01-01"), ("P3", "2024-01-02"), (None, "2024-01-01"),
+    ]
+    assert assignments[2].reason == "no partner window/capacity left"
+
+
+def test_capacity_is_per_day(index):
+    assignments = schedule_requests([_req(100, ts="2024-01-01T08:00:00"), _req(100, ts="2024-01-02T08:00:00")], index)
+    assert [a.partner_id for a in assignments] == ["P1", "P1"]
+
+
+def test_assigned_kg_counts_against_capacity(index):
+    assignments = schedule_requests([_req(30)], index, assigned_kg={("P1", "2024-01-01"): 80.0})
+    assert assignments[0].partner_id == "P2"
+
+
+def test_closed_windows_are_skipped(index):
+    assignments = schedule_requests([_req(10, ts="2024-01-01T13:00:00")], index)
+    assert (assignments[0].partner_id, assignments[0].eta_window) == ("P2", "18:00-20:00")
+
+
+def test_request_after_the_last_window_rolls_over(index):
+    assignments = schedule_requests([_req(10, ts="2024-01-01T21:00:00")], index)
+    a = assignments[0]
+    assert (a.partner_id, a.day, a.eta_window, a.reason) == ("P1", "2024-01-02", "10:00-12:00", "assigned (next day)")
+
+
+@pytest.mark.parametrize("ts", ["bad", "", None, "2024-13-01T08:00:00"])
+def test_invalid_timestamps_are_refused(index, ts):
+    with pytest.raises(ValueError):
+        schedule_requests([_req(1), _req(1, ts=ts)], index)
+
+
+def test_stream_without_partner(index):
+    assignments = schedule_requests([_req(1, stream="Biogas")], index)
+    assert assignments[0].partner_id is None
+    assert assignments[0].reason == "no partner accepts this stream"
+
+
+def test_plan_pickups_counts_accepted_load(index, tmp_path, monkeypatch):
+    from logic import pickups, properties
+    from logic.pickup_runs import plan_pickups
+
+    monkeypatch.setattr(properties, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(properties, "PROPERTIES_DIR", str(tmp_path / "properties"))
+    registry = properties.PropertyRegistry(str(tmp_path / "properties.json"))
+    a = registry.register(properties.Property("a", "A", lat=13.75, lon=100.50))
+    b = registry.register(properties.Property("b", "B", lat=13.76, lon=100.52))
+
+    accepted = pickups.create_request(a.recycler_requests_path, "Compost", 80.0, "P1", property_id="a",
+                                      timestamp="2024-01-01T08:00:00")
+    pickups.transition(a.recycler_requests_path, accepted.request_id, pickups.ACCEPTED)
+    pickups.create_request(b.recycler_requests_path, "Compost", 40.0, "P1", property_id="b",
+                           timestamp="2024-01-01T08:00:00")
+
+    plan = plan_pickups(index=index, registry=registry)
+
+    # P1 has 20 kg left after the accepted 80, so b's 40 kg goes to P2
+    assert [(x.request["property_id"], x.partner_id) for x in plan.assignments] == [("b", "P2")]
+    assert sorted((r.partner_id, r.total_kg) for r in plan.runs) == [("P1", 80.0), ("P2", 40.0)]
@@ -0,0 +1,80 @@
+import pytest
+
+from logic.bin_storage import append_events, delete_day
+from logic.rollups import RollupStore
+
+
+def _event(day, kg=1.0, correct=True):
+    return {"timestamp": f"{day}T12:00:00", "item": "Rice", "weight_kg": kg, "is_correct_bin": correct}
+
+
+@pytest.fixture
+def rollups_path(tmp_path):
+    return str(tmp_path / "daily_rollups.json")
+
+
+@pytest.fixture
+def store(rollups_path, events_path):
+    append_events(events_path, [_event("2024-01-01", 2.0), _event("2024-01-01", 1.0, correct=False)])
+    store = RollupStore(rollups_path)
+    store.track("p1", events_path)
+    return store
+
+
+def test_track_backfills_existing_days(store):
+    r = store.get("p1", "2024-01-01")
+    assert (r.event_count, r.measured_kg, r.wrong_bin_kg) == (2, pytest.approx(3.0), pytest.approx(1.0))
+
+
+def test_refresh_picks_up_writes_made_elsewhere(store, events_path):
+    # appended straight to the log, as another process would, not through the store
+    append_events(events_path, [_event("2024-01-01", 0.5), _event("2024-01-02", 4.0, correct=False)])
+
+    assert store.get("p1", "2024-01-01").measured_kg == pytest.approx(3.5)
+    r = store.get("p1", "2024-01-02")
+    assert (r.measured_kg, r.wrong_bin_kg) == (pytest.approx(4.0), pytest.approx(4.0))
+
+
+def test_deleted_day_resyncs_to_zero(store, events_path):
+    delete_day(events_path, "2024-01-01")
+    r = store.get("p1", "2024-01-01")
+    assert (r.event_count, r.measured_kg, r.wrong_bin_kg) == (0, 0.0, 0.0)
+
+
+def test_only_changed_days_are_resynced(store, events_path, monkeypatch):
+    synced = []
+    sync = store.sync_events
+
+    def spy(property_id, events_path, days=None, stamp=None):
+        synced.append(set(days))
+        sync(property_id, events_path, days, stamp)
+
+    monkeypatch.setattr(store, "sync_events", spy)
+    append_events(events_path, [_event("2024-01-03")])
+
+    assert store.get("p1", "2024-01-03").event_count == 1
+    assert synced == [{"2024-01-03"}]
+    store.get("p1", "2024-01-03")
+    assert len(synced) == 1  # stamp is current: no second sync
+
+
+def test_rollups_and_streak_survive_a_restart(store, rollups_path, events_path):
+    store.record_eod("p1", "2024-01-01", recommended=90, baseline=100, actual=85, day_status="COUNTED")
+    store.record_eod("p1", "2024-01-02", recommended=90, baseline=100, actual=90, day_status="NEUTRAL")
+    store.record_eod("p1", "2024-01-03", recommended=90, baseline=100, actual=80, day_status="COUNTED")
+
+    fresh = RollupStore(rollups_path)
+    fresh.track("p1", events_path)
+    assert fresh.current_streak("p1") == 2
+    assert fresh.current_streak("p1", before="2024-01-03") == 1
+    assert fresh.get("p1", "2024-01-01").measured_kg == pytest.approx(3.0)
+
+
+def test_resubmitting_a_past_day_restreaks_later_days(store):
+    for day in ("2024-01-01", "2024-01-02", "2024-01-03"):
+        store.record_eod("p1", day, recommended=90, baseline=100, actual=85, day_status="COUNTED")
+    assert store.current_streak("p1") == 3
+
+    store.record_eod("p1", "2024-01-02", recommended=90, baseline=100, actual=120, day_status="RESET")
+
+    assert [r.streak for r in store.days("p1")] == [1, 0, 1]
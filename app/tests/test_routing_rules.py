@@ -0,0 +1,81 @@
+from functools import partial
+
+import numpy as np
+import pytest
+
+from logic import ingest
+from logic.bin_storage import append_events
+from logic.ingest import Reading, readings_to_events
+from logic.rollups import RollupStore
+from logic.routing_rules import (
+    BUILTIN,
+    active_version,
+    evaluate_events,
+    load_table,
+    save_rules,
+    wrong_bin_by_day,
+)
+
+
+@pytest.fixture
+def rules_dir(tmp_path):
+    out = str(tmp_path / "routing_rules")
+    save_rules(BUILTIN.item_to_bin, BUILTIN.bins, rules_dir=out)
+    # v2: rice goes to Landfill from February on
+    save_rules({**BUILTIN.item_to_bin, "Rice": "Landfill"}, BUILTIN.bins, effective_from="2024-02-01", rules_dir=out)
+    return out
+
+
+def _event(day, kg=1.0):
+    # logged under v1, where rice in Compost is correct
+    return {"timestamp": f"{day}T12:00:00", "item": "Rice", "weight_kg": kg, "bin_used": "Compost", "is_correct_bin": True}
+
+
+def test_version_in_effect_by_day(rules_dir):
+    assert active_version(rules_dir, "2024-01-31") == 1
+    assert active_version(rules_dir, "2024-02-01") == 2
+    assert load_table(None, rules_dir, "2024-02-01") is not load_table(None, rules_dir, "2024-01-31")
+
+
+def test_events_are_judged_by_the_rules_of_their_own_day(rules_dir):
+    required, correct = evaluate_events(
+        ["Rice", "Rice"], ["Compost", "Compost"], ["2024-01-15", "2024-02-15"], rules_dir
+    )
+    assert required == ["Compost", "Landfill"]
+    assert correct == [True, False]
+
+
+def test_ingest_uses_the_reading_day(rules_dir, monkeypatch):
+    # a camera that always gets it right, and the test's rules
+    monkeypatch.setattr(ingest, "classify_batch", lambda items: (np.array(items, dtype=object), np.ones(len(items))))
+    monkeypatch.setattr(ingest, "evaluate_events", partial(evaluate_events, rules_dir=rules_dir))
+    readings = [
+        Reading("b1", "unused.json", "Rice", "Compost", 1.0, timestamp="2024-01-15T10:00:00"),
+        Reading("b1", "unused.json", "Rice", "Compost", 1.0, timestamp="2024-02-15T10:00:00"),
+    ]
+    events = readings_to_events(readings)
+    assert [e["is_correct_bin"] for e in events] == [True, False]
+
+
+def test_restatement_skips_days_before_effective_from(events_path, rules_dir):
+    append_events(events_path, [_event("2024-01-15", kg=2.0), _event("2024-02-15", kg=3.0)])
+    assert wrong_bin_by_day(events_path, 2, rules_dir=rules_dir, max_workers=1) == {"2024-02-15": 3.0}
+    assert wrong_bin_by_day(events_path, 1, rules_dir=rules_dir, max_workers=1) == {
+        "2024-01-15": 0.0, "2024-02-15": 0.0,
+    }
+
+
+def test_restated_days_stay_restated_under_the_stores_rules_dir(events_path, rules_dir, tmp_path):
+    append_events(events_path, [_event("2024-02-15", kg=3.0)])
+    store = RollupStore(str(tmp_path / "rollups.json"), rules_dir=rules_dir)
+    store.track("p1", events_path)
+    assert store.get("p1", "2024-02-15").wrong_bin_kg == 0.0
+
+    assert store.restate("p1", events_path, 2) == ["2024-02-15"]
+    r = store.get("p1", "2024-02-15")
+    assert (r.wrong_bin_kg, r.rules_version) == (3.0, 2)
+
+    # a late event on a restated day is re-evaluated under v2, from rules_dir
+    append_events(events_path, [_event("2024-02-15", kg=1.0)])
+    r = store.get("p1", "2024-02-15")
+    assert (r.measured_kg, r.wrong_bin_kg) == (pytest.approx(4.0), pytest.approx(4.0))
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from logic.savings import estimate_savings, estimate_savings_grid
+
+RECOMMENDED = [0, 1, 50, 90, 99, 100, 120, 249.7]
+BASELINE = [1, 100, 100.9, 250]
+COSTS = [-5.0, 0.0, 35.5]
+
+
+def test_grid_matches_scalar_estimate():
+    rec, base, cost = np.meshgrid(RECOMMENDED, BASELINE, COSTS, indexing="ij")
+    grid = estimate_savings_grid(rec, base, cost)
+
+    assert grid.estimated_savings_thb.shape == rec.shape
+    for idx in np.ndindex(rec.shape):
+        one = estimate_savings(rec[idx], base[idx], cost[idx])
+        assert grid.estimated_waste_reduction_pct[idx] == pytest.approx(one.estimated_waste_reduction_pct)
+        assert grid.estimated_savings_thb[idx] == pytest.approx(one.estimated_savings_thb)
+        assert grid.estimated_avoided_waste_kg[idx] == pytest.approx(one.estimated_avoided_waste_kg)
+
+
+@pytest.mark.parametrize("overproduction, low, high, grams", [(0.05, 0.05, 0.20, 150.0), (0.25, 0.10, 0.12, 220.0)])
+def test_grid_matches_scalar_with_assumptions(overproduction, low, high, grams):
+    rec = np.array(RECOMMENDED)[:, None]
+    base = np.array(BASELINE)[None, :]
+    grid = estimate_savings_grid(rec, base, 40.0, overproduction, low, high, grams)
+
+    for i, r in enumerate(RECOMMENDED):
+        for j, b in enumerate(BASELINE):
+            one = estimate_savings(r, b, 40.0, overproduction, (low, high), grams)
+            assert grid.estimated_savings_thb[i, j] == pytest.approx(one.estimated_savings_thb)
+            assert grid.estimated_avoided_waste_kg[i, j] == pytest.approx(one.estimated_avoided_waste_kg)
@@ -0,0 +1,42 @@
+import numpy as np
+
+from logic.smart_bin import ITEM_TO_BIN, ROUTING, DemoClassifier, classify_demo, evaluate_bin, evaluate_bins
+
+
+def test_classifier_matches_the_scalar_path():
+    items = ["Rice", "Fish", "Rice", "Plastic Bottle", "Unknown thing"]
+    pred, conf = DemoClassifier().classify(items)
+    assert list(zip(pred.tolist(), conf.tolist())) == [classify_demo(i) for i in items]
+
+
+def test_classifier_treats_missing_items_as_unrecognized():
+    items = ["Rice", None, "Fish", np.nan]
+    pred, conf = DemoClassifier().classify(items)
+    assert (pred[1], conf[1]) == ("", 0.0)
+    assert (pred[3], conf[3]) == ("", 0.0)
+    assert (pred[2], conf[2]) == classify_demo("Fish")
+
+
+def test_classifier_empty_batch():
+    pred, conf = DemoClassifier().classify([])
+    assert (len(pred), len(conf)) == (0, 0)
+
+
+ITEMS = ["Rice", "Fish", None, "Plastic Bottle", "Unknown thing", np.nan, "Chicken", "Rice"]
+CHOSEN = ["Compost", "Compost", "Landfill", None, "Landfill", "Biogas", np.nan, "Compost"]
+
+
+def test_vectorized_routing_matches_the_scalar_path():
+    res = evaluate_bins(ITEMS, CHOSEN)
+
+    for i, (item, chosen) in enumerate(zip(ITEMS, CHOSEN)):
+        one = evaluate_bin(item, chosen)
+        assert res.required_bins()[i] == ITEM_TO_BIN.get(item, "Landfill")
+        assert bool(res.is_correct_bin[i]) == one.is_correct_bin
+        assert res.message(i) == one.message
+
+
+def test_missing_values_get_the_unknown_codes():
+    assert ROUTING.item_codes([None, "Rice", np.nan]).tolist() == [len(ROUTING.items), ROUTING.items.index("Rice"), len(ROUTING.items)]
+    assert ROUTING.bin_codes(["Landfill", None]).tolist() == [ROUTING.bins.index("Landfill"), len(ROUTING.bins)]
+    assert ROUTING.item_codes([]).tolist() == []
@@ -0,0 +1,51 @@
+import sqlite3
+
+from logic import bin_storage, sqlite_store
+from logic.bin_storage import append_events, delete_day, list_days, load_events
+from logic.sqlite_store import db_path
+
+
+def _restart():
+    # a new process: no open connections, nothing known about the database
+    for store in sqlite_store._STORES.values():
+        store.close()
+    sqlite_store._STORES.clear()
+
+
+def _event(day, kg=1.0):
+    return {"timestamp": f"{day}T08:00:00", "item": "Rice", "weight_kg": kg}
+
+
+def test_first_sqlite_use_imports_the_jsonl_log(events_path, monkeypatch):
+    append_events(events_path, [_event("2024-01-01"), _event("2024-01-02", 2.0)])
+
+    monkeypatch.setattr(bin_storage, "STORAGE_BACKEND", "sqlite")
+    _restart()
+
+    assert [e["weight_kg"] for e in load_events(events_path)] == [1.0, 2.0]
+    with sqlite3.connect(db_path(events_path)) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM meta WHERE key = ?", (sqlite_store._MIGRATED_KEY,)).fetchone() == (1,)
+
+
+def test_import_runs_once(events_path, monkeypatch):
+    append_events(events_path, [_event("2024-01-01")])
+    monkeypatch.setattr(bin_storage, "STORAGE_BACKEND", "sqlite")
+    _restart()
+    append_events(events_path, [_event("2024-01-02", 2.0)])
+
+    _restart()
+
+    assert [e["weight_kg"] for e in load_events(events_path)] == [1.0, 2.0]
+
+
+def test_cleared_table_stays_empty_after_restart(events_path, monkeypatch):
+    append_events(events_path, [_event("2024-01-01"), _event("2024-01-02")])
+    monkeypatch.setattr(bin_storage, "STORAGE_BACKEND", "sqlite")
+    _restart()
+    for day in list_days(events_path):
+        delete_day(events_path, day)
+    assert load_events(events_path) == []
+
+    _restart()
+
+    assert load_events(events_path) == []
@@ -0,0 +1,80 @@
+import csv
+
+import numpy as np
+import pytest
+
+from logic.demo_ml import ridge_state
+from logic.train_model import (
+    artifact_path,
+    encode_features,
+    load_history,
+    load_latest_model,
+    load_model,
+    save_feedback,
+    save_model,
+    train_from_history,
+)
+
+FIELDS = ["date", "expected_guests", "occupancy_rate", "weather", "day_type", "event_level", "actual_cooked"]
+
+
+def _obs(guests, occupancy, cooked, weather="Sunny"):
+    return {
+        "expected_guests": guests,
+        "occupancy_rate": occupancy,
+        "weather": weather,
+        "day_type": "Weekday",
+        "event_level": "None",
+        "actual_cooked": cooked,
+    }
+
+
+@pytest.fixture
+def trained(tmp_path):
+    rng = np.random.default_rng(0)
+    path = str(tmp_path / "training_history.csv")
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(FIELDS)
+        for i in range(30):
+            guests = int(rng.integers(200, 400))
+            w.writerow([f"2024-01-{i + 1:02d}", guests, 0.7, "Sunny", "Weekday", "None", int(guests * 0.9)])
+    models_dir = str(tmp_path / "models")
+    model = train_from_history(path)
+    save_model(model, models_dir)
+    return path, models_dir, model
+
+
+def test_feedback_matches_a_full_refit(trained):
+    path, models_dir, model = trained
+    submissions = [
+        ("p1", "2024-02-01", _obs(300, 0.8, 260)),
+        ("p2", "2024-02-01", _obs(350, 0.6, 330, weather="Rainy")),
+        ("p1", "2024-02-02", _obs(250, 0.5, 240)),
+        # resubmitting p1's first day replaces its earlier observation
+        ("p1", "2024-02-01", _obs(300, 0.8, 280)),
+    ]
+    for pid, day, obs in submissions:
+        save_feedback(model.version, pid, day, models_dir=models_dir, **obs)
+
+    kept = [submissions[1][2], submissions[2][2], submissions[3][2]]
+    X, y = load_history(path, model.encodings)
+    Xf = np.array([
+        encode_features(model, o["expected_guests"], o["occupancy_rate"], o["weather"], o["day_type"], o["event_level"])
+        for o in kept
+    ])
+    yf = np.array([o["actual_cooked"] for o in kept], dtype=float)
+    refit = ridge_state(np.vstack([X, Xf]), np.concatenate([y, yf]), lam=model.lam)
+
+    loaded = load_model(artifact_path(model.version, models_dir))
+    assert loaded.n_updates == 3
+    assert np.max(np.abs(np.array(loaded.weights) - refit.weights)) < 1e-8
+    assert np.max(np.abs(np.array(loaded.precision) - refit.precision)) < 1e-10
+    assert load_latest_model(models_dir).weights == loaded.weights
+
+
+def test_properties_keep_separate_observations_for_the_same_day(trained):
+    _, models_dir, model = trained
+    a = save_feedback(model.version, "p1", "2024-02-01", models_dir=models_dir, **_obs(300, 0.8, 260))
+    b = save_feedback(model.version, "p2", "2024-02-01", models_dir=models_dir, **_obs(300, 0.8, 260))
+    assert (a.n_updates, b.n_updates) == (1, 2)